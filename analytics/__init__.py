@@ -0,0 +1 @@
+from .rfm import RFMEngine, compute_rfm, score_customers, classify_customers
@@ -0,0 +1,3 @@
+# 只导出替身服务器：runner 经由 scenarios 导入 odoo_lib，后者会把 ODOO_ACCESS_KEY 切换为生产环境的密钥文件，
+# 测试中导入替身服务器时不应产生这个副作用。运行基准测试用 python -m bench 或 bench.runner
+from .fake_odoo import FakeOdooServer, Scale
@@ -0,0 +1,688 @@
+"""
+本地的 Odoo 替身服务器
+
+在子进程中提供 XML-RPC (/xmlrpc/2/common, /xmlrpc/2/object) 和 JSON-RPC (/jsonrpc) 接口，
+数据按记录 id 确定性地即时生成，不在内存中保存整张表，因此可以模拟 1 万到 100 万行的数据量。
+write/create 的结果保存在内存中，只在当前服务器进程内有效；write 同时更新 write_date。
+库位分两层：WH/Stock 下是货架，编号靠后的库位是货架下的储位（Bin）。
+
+支持的方法: search, search_read, search_count, read, read_group, fields_get, write, create, unlink。
+domain 中的 child_of 按 stock.location 的上级库位展开（替身数据中只有库位是层级结构）。
+每个请求可注入固定延迟和按返回记录数计算的延迟，用来模拟网络往返和服务器计算字段的开销。
+"""
+import gzip
+import json
+import math
+import multiprocessing
+import re
+import threading
+import time
+import xmlrpc.client
+import xmlrpc.server
+from socketserver import ThreadingMixIn
+from typing import Dict, Iterator, List
+
+from pydantic import BaseModel
+
+DATETIME_PATTERN = '%Y-%m-%d %H:%M:%S'
+BASE_TIME = time.mktime((2024, 1, 1, 0, 0, 0, 0, 0, -1))
+_MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+           'September', 'October', 'November', 'December']
+
+
+class Scale(BaseModel):
+    """ 合成数据的规模 """
+    orders: int = 2500
+    lines_per_order: int = 4
+    products: int = 1000
+    partners: int = 200
+    locations: int = 50
+    quants: int = 5000
+    putaway_rules: int = 500
+    pricelists: int = 5
+    pricelist_items: int = 2000
+
+    @classmethod
+    def for_rows(cls, rows: int) -> 'Scale':
+        """ 以 sale.order.line 的行数为基准，按比例得到其他表的规模 """
+        lines_per_order = 4
+        return cls(
+            orders=max(1, rows // lines_per_order),
+            lines_per_order=lines_per_order,
+            products=max(10, min(rows // 10, 20000)),
+            partners=max(10, rows // 50),
+            locations=50,
+            quants=max(10, rows // 2),
+            putaway_rules=max(1, min(rows // 20, 20000)),
+            pricelists=5,
+            pricelist_items=max(5, rows // 5),
+        )
+
+
+def _datetime(seconds) -> str:
+    return time.strftime(DATETIME_PATTERN, time.localtime(BASE_TIME + seconds))
+
+
+class SyntheticData(object):
+    """ 按 id 生成各模型的记录 """
+
+    def __init__(self, scale: Scale):
+        self.scale = scale
+        self.counts = {
+            'sale.order': scale.orders,
+            'sale.order.line': scale.orders * scale.lines_per_order,
+            'purchase.order': scale.orders,
+            'purchase.order.line': scale.orders * scale.lines_per_order,
+            'product.template': scale.products,
+            'product.product': scale.products,
+            'res.partner': scale.partners,
+            'stock.location': scale.locations,
+            'stock.quant': scale.quants,
+            'stock.putaway.rule': scale.putaway_rules,
+            'product.pricelist': scale.pricelists,
+            'product.pricelist.item': scale.pricelist_items,
+        }
+        self._generators = {
+            'sale.order': self._order,
+            'sale.order.line': self._order_line,
+            'purchase.order': self._order,
+            'purchase.order.line': self._order_line,
+            'product.template': self._product,
+            'product.product': self._product,
+            'res.partner': self._partner,
+            'stock.location': self._location,
+            'stock.quant': self._quant,
+            'stock.putaway.rule': self._putaway_rule,
+            'product.pricelist': self._pricelist,
+            'product.pricelist.item': self._pricelist_item,
+        }
+        # 写入和新建的记录: {model: {id: values}}
+        self._written: Dict[str, Dict[int, dict]] = {}
+        self._created: Dict[str, Dict[int, dict]] = {}
+        self._deleted: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------- 记录生成 ------------------------- #
+    def _product_ref(self, product_id):
+        return [product_id, f"[P{product_id:05d}] Product {product_id}"]
+
+    def _partner_ref(self, partner_id):
+        return [partner_id, f"Customer {partner_id}"]
+
+    def _location_parent(self, location_id):
+        """ 库位 1 是 WH/Stock，前一半是它下面的货架，后一半是各货架下的储位 """
+        shelves = max(1, self.scale.locations // 2)
+        if location_id == 1:
+            return False
+        if location_id <= shelves:
+            return 1
+        return 2 + (location_id - shelves - 1) % max(1, shelves - 1)
+
+    def _location_ref(self, location_id):
+        parent = self._location_parent(location_id)
+        if not parent:
+            return [location_id, "WH/Stock"]
+        if parent == 1:
+            return [location_id, f"WH/Stock/Shelf {location_id}"]
+        return [location_id, f"WH/Stock/Shelf {parent}/Bin {location_id}"]
+
+    def _order(self, i):
+        lines = self.scale.lines_per_order
+        user_id = 2 + i % 8
+        return {
+            'id': i,
+            'name': f"S{i:06d}",
+            'company_id': [1, 'My Company'],
+            'partner_id': self._partner_ref(1 + i % self.scale.partners),
+            'user_id': [user_id, f"Salesman {user_id}"],
+            'state': 'sale',
+            'date_order': _datetime(i * 3600),
+            'invoice_status': 'invoiced' if i % 3 else 'to invoice',
+            'shipping_weight': float(i % 17),
+            'amount_total': round(sum(self._price(line) for line in range((i - 1) * lines + 1, i * lines + 1)), 2),
+            'order_line': list(range((i - 1) * lines + 1, i * lines + 1)),
+            'write_date': _datetime(i * 3600 + 60),
+            'create_date': _datetime(i * 3600),
+        }
+
+    @staticmethod
+    def _price(line_id):
+        return float(1 + line_id % 97) * (1 + line_id % 5)
+
+    def _order_line(self, i):
+        order_id = (i - 1) // self.scale.lines_per_order + 1
+        product = self._product_ref(1 + i % self.scale.products)
+        partner = self._partner_ref(1 + order_id % self.scale.partners)
+        user_id = 2 + order_id % 8
+        quantity = float(1 + i % 5)
+        price_unit = float(1 + i % 97)
+        subtotal = price_unit * quantity
+        return {
+            'id': i,
+            'order_id': [order_id, f"S{order_id:06d}"],
+            'name': product[1],
+            'currency_id': [1, 'EUR'],
+            'order_partner_id': partner,
+            'partner_id': partner,
+            'salesman_id': [user_id, f"Salesman {user_id}"],
+            'product_template_id': product,
+            'product_id': product,
+            'state': 'sale',
+            'product_uom': [1, 'Units'],
+            'product_uom_qty': quantity,
+            'product_qty': quantity,
+            'price_unit': price_unit,
+            'price_subtotal': subtotal,
+            'price_tax': round(subtotal * 0.19, 2),
+            'price_total': round(subtotal * 1.19, 2),
+            'qty_to_invoice': 0.0,
+            'qty_to_deliver': 0.0,
+            'qty_received': quantity,
+            'product_type': 'product',
+            'date_order': _datetime(order_id * 3600),
+            'create_date': _datetime(order_id * 3600),
+            'write_date': _datetime(order_id * 3600 + 60),
+            'is_delivery': False,
+            'display_type': False,
+            'discount': 0.0,
+        }
+
+    def _product(self, i):
+        return {
+            'id': i,
+            'name': f"Product {i}",
+            'display_name': f"[P{i:05d}] Product {i}",
+            'default_code': f"P{i:05d}",
+            'list_price': float(1 + i % 97),
+            'standard_price': float(1 + i % 97) / 2,
+            'barcode': f"400{i:010d}" if i % 4 else False,
+            'uom_name': 'Units',
+            'active': True,
+            'volume': 0.001 * (i % 10),
+            'weight': 0.1 * (i % 10),
+            'categ_id': [1 + i % 5, f"All / Category {1 + i % 5}"],
+            'qty_available': float(i % 50),
+            'product_variant_count': 1,
+            'write_date': _datetime(i * 60),
+        }
+
+    def _partner(self, i):
+        return {'id': i, 'name': f"Customer {i}", 'email': f"customer{i}@example.com", 'phone': False,
+                'write_date': _datetime(i * 60)}
+
+    def _location(self, i):
+        name = self._location_ref(i)[1]
+        return {'id': i, 'name': name, 'complete_name': name, 'active': True, 'usage': 'internal',
+                'location_id': self._location_ref(self._location_parent(i)) if i != 1 else False,
+                'write_date': _datetime(i * 60)}
+
+    def _quant(self, i):
+        products = self.scale.products
+        quantity = float(i % 7)
+        return {
+            'id': i,
+            'product_id': self._product_ref((i - 1) % products + 1),
+            'location_id': self._location_ref((i - 1) // products % self.scale.locations + 1),
+            'quantity': quantity,
+            'reserved_quantity': 0.0,
+            'available_quantity': quantity,
+            'warehouse_id': [1, 'WH'],
+            'product_uom_id': [1, 'Units'],
+            'write_date': _datetime(i * 60),
+        }
+
+    def _putaway_rule(self, i):
+        # 规则 i: 产品 i 从 WH/Stock 上架到某个货架或储位；产品 i 的库存量分散在 WH/Stock 及其下级库位中
+        product_id = (i - 1) % self.scale.products + 1
+        return {
+            'id': i,
+            'active': True,
+            'sequence': 10,
+            'product_id': self._product_ref(product_id),
+            'location_in_id': self._location_ref(1),
+            'location_out_id': self._location_ref(2 + i % max(1, self.scale.locations - 1)),
+            'write_date': _datetime(i * 60),
+        }
+
+    def _pricelist(self, i):
+        return {'id': i, 'name': f"VIP Group {i}", 'active': True, 'company_id': [1, 'My Company'],
+                'write_date': _datetime(i * 60)}
+
+    def _pricelist_item(self, i):
+        per_pricelist = max(1, math.ceil(self.scale.pricelist_items / self.scale.pricelists))
+        pricelist_id = (i - 1) // per_pricelist + 1
+        product = self._product_ref((i - 1) % per_pricelist % self.scale.products + 1)
+        return {
+            'id': i,
+            'pricelist_id': [pricelist_id, f"VIP Group {pricelist_id} (EUR)"],
+            'company_id': [1, 'My Company'],
+            'currency_id': [1, 'EUR'],
+            # OdooPricelistOperation 按价格表名称搜索 item 的 name
+            'name': f"VIP Group {pricelist_id}",
+            'fixed_price': float(1 + i % 97),
+            'min_quantity': 1.0,
+            'product_tmpl_id': product,
+            'product_id': False,
+            'applied_on': '1_product',
+            'compute_price': 'fixed',
+            'write_date': _datetime(i * 60),
+        }
+
+    # ------------------------- 访问接口 ------------------------- #
+    def get(self, model, i) -> dict:
+        """ :return: 记录，不存在时为 None """
+        if i in self._deleted.get(model, ()):
+            return None
+        created = self._created.get(model, {})
+        if i in created:
+            return dict(created[i])
+        if not 1 <= i <= self.counts.get(model, 0):
+            return None
+        record = self._generators[model](i)
+        written = self._written.get(model, {}).get(i)
+        if written:
+            record.update(written)
+        return record
+
+    def iter_ids(self, model, start=1) -> Iterator[int]:
+        """ 按 id 升序遍历全部记录 id，从 start 开始 """
+        deleted = self._deleted.get(model, ())
+        for i in range(max(1, start), self.counts.get(model, 0) + 1):
+            if i not in deleted:
+                yield i
+        for i in sorted(self._created.get(model, {})):
+            if i >= start:
+                yield i
+
+    def _many2one_value(self, field, value):
+        """ write 中的 many2one 只给出 id，读取时与 Odoo 一样返回 [id, 名称] """
+        if not isinstance(value, int) or isinstance(value, bool) or not field.endswith('_id'):
+            return value
+        refs = {'location_id': self._location_ref, 'product_id': self._product_ref,
+                'partner_id': self._partner_ref}
+        return refs[field](value) if field in refs else [value, f"{field} {value}"]
+
+    def write(self, model, ids, values):
+        values = {field: self._many2one_value(field, value) for field, value in values.items()}
+        values['write_date'] = time.strftime(DATETIME_PATTERN)
+        with self._lock:
+            written = self._written.setdefault(model, {})
+            created = self._created.setdefault(model, {})
+            for i in ids:
+                if i in created:
+                    created[i].update(values)
+                else:
+                    written.setdefault(i, {}).update(values)
+
+    def create(self, model, values) -> int:
+        with self._lock:
+            created = self._created.setdefault(model, {})
+            i = max(created, default=self.counts.get(model, 0)) + 1
+            created[i] = dict(values, id=i, write_date=time.strftime(DATETIME_PATTERN))
+            return i
+
+    def unlink(self, model, ids):
+        with self._lock:
+            self._deleted.setdefault(model, set()).update(ids)
+
+    def fields_get(self, model) -> dict:
+        sample = self._generators[model](1)
+        fields = {}
+        for name, value in sample.items():
+            if isinstance(value, list) and len(value) == 2 and isinstance(value[1], str):
+                field_type = 'many2one'
+            elif isinstance(value, list):
+                field_type = 'one2many'
+            elif name.endswith('_id') and value is False:
+                field_type = 'many2one'
+            elif isinstance(value, bool):
+                field_type = 'boolean'
+            elif isinstance(value, float):
+                field_type = 'float'
+            elif isinstance(value, int):
+                field_type = 'integer'
+            elif name.endswith('_date') or name == 'date_order':
+                field_type = 'datetime'
+            else:
+                field_type = 'char'
+            fields[name] = {'type': field_type, 'string': name}
+        return fields
+
+
+# ----------------------------- domain ----------------------------- #
+def _compare(value, operator, operand) -> bool:
+    if operator in ('ilike', 'like', 'not ilike', 'not like'):
+        if isinstance(value, list):
+            value = value[1]
+        found = str(operand).lower() in str(value or '').lower()
+        return found if not operator.startswith('not') else not found
+    if isinstance(value, list) and len(value) == 2 and isinstance(value[1], str):
+        value = value[0]
+    if operator == '=':
+        return value == operand if operand is not False else value in (False, None)
+    if operator == '!=':
+        return value != operand
+    if operator == 'in':
+        return value in operand
+    if operator == 'not in':
+        return value not in operand
+    if operator == '>':
+        return value is not False and value > operand
+    if operator == '>=':
+        return value is not False and value >= operand
+    if operator == '<':
+        return value is not False and value < operand
+    if operator == '<=':
+        return value is not False and value <= operand
+    raise ValueError(f"Unsupported operator {operator}")
+
+
+def match(record: dict, domain: list) -> bool:
+    """ 按波兰表示法计算 domain """
+    stack = []
+    for term in reversed(domain):
+        if term in ('&', '|'):
+            first, second = stack.pop(), stack.pop()
+            stack.append(first and second if term == '&' else first or second)
+        elif term == '!':
+            stack.append(not stack.pop())
+        else:
+            field, operator, operand = term
+            stack.append(_compare(record.get(field, False), operator, operand))
+    return all(stack)
+
+
+def _id_bounds(domain: list):
+    """ 顶层 AND 条件中 id 的下界和 id in 列表，用于跳过不可能匹配的记录 """
+    start, ids = 1, None
+    if any(term in ('|', '!') for term in domain):
+        return start, ids
+    for term in domain:
+        if isinstance(term, (list, tuple)) and term[0] == 'id':
+            if term[1] == '>':
+                start = max(start, term[2] + 1)
+            elif term[1] == '>=':
+                start = max(start, term[2])
+            elif term[1] == 'in':
+                ids = sorted(set(term[2]) if ids is None else set(term[2]) & set(ids))
+            elif term[1] == '=':
+                ids = [term[2]]
+    return start, ids
+
+
+class FakeOdoo(object):
+    """ execute_kw 的实现 """
+
+    def __init__(self, data: SyntheticData, latency: float = 0.0, per_record: float = 0.0):
+        self.data = data
+        self.latency = latency
+        self.per_record = per_record
+
+    def authenticate(self, db, username, password, context):
+        return 2
+
+    def version(self):
+        return {'server_version': '17.0', 'server_serie': '17.0'}
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        kwargs = kwargs or {}
+        result = getattr(self, f'_{method}')(model, *args, **kwargs)
+        records = len(result) if isinstance(result, list) else 1
+        delay = self.latency + self.per_record * records
+        if delay:
+            time.sleep(delay)
+        return result
+
+    def _child_locations(self, operand) -> List[int]:
+        """ operand 中的库位及其全部下级库位 """
+        children: Dict[int, List[int]] = {}
+        for i in self.data.iter_ids('stock.location'):
+            parent = self.data.get('stock.location', i)['location_id']
+            if parent:
+                children.setdefault(parent[0], []).append(i)
+        result = []
+        pending = [operand] if isinstance(operand, int) else list(operand)
+        while pending:
+            location_id = pending.pop()
+            result.append(location_id)
+            pending.extend(children.get(location_id, ()))
+        return result
+
+    def _expand_child_of(self, domain) -> list:
+        if not any(isinstance(term, (list, tuple)) and term[1] == 'child_of' for term in domain):
+            return domain
+        return [(term[0], 'in', self._child_locations(term[2]))
+                if isinstance(term, (list, tuple)) and term[1] == 'child_of' else term for term in domain]
+
+    def _search_ids(self, model, domain, offset=0, limit=None, order=None) -> List[int]:
+        domain = self._expand_child_of(domain)
+        start, ids = _id_bounds(domain)
+        candidates = (i for i in ids if i >= start) if ids is not None else self.data.iter_ids(model, start)
+        descending = bool(order) and order.split()[-1].lower() == 'desc'
+        result = []
+        skipped = 0
+        for i in candidates:
+            record = self.data.get(model, i)
+            if record is None or not match(record, domain):
+                continue
+            if not descending and skipped < offset:
+                skipped += 1
+                continue
+            result.append(i)
+            if not descending and limit and len(result) >= limit:
+                break
+        if descending:
+            result.reverse()
+            result = result[offset:offset + limit] if limit else result[offset:]
+        return result
+
+    @staticmethod
+    def _pick(record, fields):
+        if not fields:
+            return record
+        picked = {field: record.get(field, False) for field in fields}
+        picked['id'] = record['id']
+        return picked
+
+    def _search(self, model, domain, offset=0, limit=None, order=None, count=False, **kwargs):
+        ids = self._search_ids(model, domain, offset, limit, order)
+        return len(ids) if count else ids
+
+    def _search_count(self, model, domain, **kwargs):
+        return len(self._search_ids(model, domain))
+
+    def _search_read(self, model, domain=None, fields=None, offset=0, limit=None, order=None, **kwargs):
+        ids = self._search_ids(model, domain or [], offset, limit, order)
+        return [self._pick(self.data.get(model, i), fields) for i in ids]
+
+    def _read(self, model, ids, fields=None, **kwargs):
+        ids = [ids] if isinstance(ids, int) else ids
+        records = (self.data.get(model, i) for i in ids)
+        return [self._pick(record, fields) for record in records if record is not None]
+
+    def _fields_get(self, model, *args, **kwargs):
+        return self.data.fields_get(model)
+
+    def _write(self, model, ids, values, **kwargs):
+        self.data.write(model, [ids] if isinstance(ids, int) else ids, values)
+        return True
+
+    def _create(self, model, values, **kwargs):
+        if isinstance(values, list):
+            return [self.data.create(model, vals) for vals in values]
+        return self.data.create(model, values)
+
+    def _unlink(self, model, ids, **kwargs):
+        self.data.unlink(model, [ids] if isinstance(ids, int) else ids)
+        return True
+
+    def _read_group(self, model, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True,
+                    **kwargs):
+        groupby = [groupby] if isinstance(groupby, str) else list(groupby)
+        if lazy:
+            groupby = groupby[:1]
+        measures = []
+        for spec in fields:
+            matched = re.match(r'^(\w+):(\w+)\((\w+)\)$', spec)
+            if matched:
+                measures.append(matched.groups())
+            else:
+                field, _, agg = spec.partition(':')
+                measures.append((field, agg or 'sum', field))
+        groups: Dict[tuple, dict] = {}
+        for i in self._search_ids(model, domain):
+            record = self.data.get(model, i)
+            key = tuple(self._group_value(record, spec) for spec in groupby)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {'__count': 0, 'values': {alias: [] for alias, _, _ in measures}}
+            group['__count'] += 1
+            for alias, _, field in measures:
+                group['values'][alias].append(record.get(field))
+        result = []
+        for key, group in groups.items():
+            row = {'__count': group['__count'], '__domain': domain, '__range': {}}
+            for spec, value in zip(groupby, key):
+                if isinstance(value, tuple) and len(value) == 3:
+                    label, start, end = value
+                    row[spec] = label
+                    row['__range'][spec] = {'from': start, 'to': end}
+                else:
+                    row[spec] = list(value) if isinstance(value, tuple) else value
+            for alias, agg, _ in measures:
+                values = [v[0] if isinstance(v, list) else v for v in group['values'][alias]]
+                if agg == 'count_distinct':
+                    row[alias] = len(set(values))
+                elif agg == 'count':
+                    row[alias] = len(values)
+                elif agg in ('min', 'max'):
+                    row[alias] = (min if agg == 'min' else max)(values)
+                elif agg == 'avg':
+                    row[alias] = sum(values) / len(values)
+                else:
+                    row[alias] = sum(v or 0 for v in values)
+            result.append(row)
+        return result[offset:offset + limit] if limit else result[offset:]
+
+    @staticmethod
+    def _group_value(record, spec):
+        field, _, interval = spec.partition(':')
+        value = record.get(field, False)
+        if isinstance(value, list):
+            return tuple(value)
+        if interval and value:
+            year, month = int(value[0:4]), int(value[5:7])
+            if interval == 'year':
+                return str(year), f"{year}-01-01 00:00:00", f"{year + 1}-01-01 00:00:00"
+            next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            return (f"{_MONTHS[month - 1]} {year}", f"{year}-{month:02d}-01 00:00:00",
+                    f"{next_year}-{next_month:02d}-01 00:00:00")
+        return value
+
+
+class _Server(ThreadingMixIn, xmlrpc.server.SimpleXMLRPCServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(xmlrpc.server.SimpleXMLRPCRequestHandler):
+    rpc_paths = ('/xmlrpc/2/common', '/xmlrpc/2/object')
+    protocol_version = "HTTP/1.1"
+    # 与 Odoo 一致，默认不压缩响应
+    encode_threshold = None
+
+    def do_POST(self):
+        if self.path != '/jsonrpc':
+            return super().do_POST()
+        body = self.rfile.read(int(self.headers['content-length']))
+        if self.headers.get('Content-Encoding', '') == 'gzip':
+            body = gzip.decompress(body)
+        request = json.loads(body)
+        params = request['params']
+        try:
+            result = getattr(self.server.odoo, params['method'])(*params['args'])
+            response = {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+        except Exception as e:
+            response = {'jsonrpc': '2.0', 'id': request.get('id'),
+                        'error': {'code': 200, 'message': 'Odoo Server Error', 'data': {'message': str(e)}}}
+        out = json.dumps(response).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if self.encode_threshold is not None and len(out) > self.encode_threshold \
+                and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            out = gzip.compress(out)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+class _Dispatcher(object):
+    def __init__(self, odoo: FakeOdoo):
+        self.odoo = odoo
+
+    def _dispatch(self, method, params):
+        try:
+            return getattr(self.odoo, method)(*params)
+        except Exception as e:
+            raise xmlrpc.client.Fault(1, str(e))
+
+
+def serve(scale: dict, latency: float, per_record: float, compress: bool, ports):
+    """ 子进程入口：启动服务器并把端口号放入 ports 队列 """
+    odoo = FakeOdoo(SyntheticData(Scale(**scale)), latency, per_record)
+    handler = type('Handler', (_Handler,), {'encode_threshold': 1400 if compress else None})
+    server = _Server(('127.0.0.1', 0), requestHandler=handler, allow_none=True, logRequests=False)
+    server.odoo = odoo
+    server.register_instance(_Dispatcher(odoo))
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+class FakeOdooServer(object):
+    """
+    在子进程中运行的替身服务器，服务器的 CPU 和内存开销不计入调用方进程:
+        with FakeOdooServer(Scale.for_rows(100000), latency=0.02) as server:
+            key = server.api_key()
+    """
+
+    def __init__(self, scale: Scale = None, latency: float = 0.0, per_record: float = 0.0,
+                 compress: bool = False):
+        """
+        :param scale: 数据规模
+        :param latency: 每个请求额外的固定延迟（秒）
+        :param per_record: 每返回一条记录额外的延迟（秒）
+        :param compress: 客户端支持时是否 gzip 压缩响应
+        """
+        self.scale = scale or Scale()
+        self.latency = latency
+        self.per_record = per_record
+        self.compress = compress
+        self.url = None
+        self._process = None
+
+    def start(self) -> 'FakeOdooServer':
+        ports = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=serve, args=(self.scale.model_dump(), self.latency, self.per_record, self.compress, ports),
+            daemon=True)
+        self._process.start()
+        self.url = f"http://127.0.0.1:{ports.get(timeout=30)}"
+        return self
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def api_key(self, protocol: str = 'xmlrpc'):
+        from rest.base import OdooAPIKey
+        return OdooAPIKey(alias='bench', db='bench', username='bench', password='bench', host=self.url,
+                          protocol=protocol)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,195 @@
+"""
+基准测试运行器
+
+    python -m bench --rows 100000 --latency 0.02 --protocol xmlrpc jsonrpc
+    python -m bench --rows 10000 --scenarios sales_pipeline --output temp/bench.json --baseline temp/bench_old.json
+    python -m bench --rows 10000 --latency 0.05 --compress
+
+--compress 让替身服务器 gzip 压缩响应、客户端 gzip 压缩超过 COMPRESS_THRESHOLD 的请求体，
+结果中的 response_raw_bytes 为解压后的大小。
+
+每个场景每次运行都启动一个新的替身服务器（写操作互不影响），先计时运行 --repeat 次取中位数，
+再在 tracemalloc 下运行一次得到调用方进程的峰值内存（tracemalloc 会拖慢执行，因此不与计时同时进行）。
+RPC 次数、耗时分位数和字节数来自客户端上的 RpcMetrics。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from typing import List, Union
+
+from pydantic import BaseModel
+
+from rest.base import OdooClient
+from rest.metrics import RpcMetrics
+from .fake_odoo import FakeOdooServer, Scale
+from .scenarios import SCENARIOS
+
+DEFAULT_OUTPUT = "temp/bench_results.json"
+# --compress 时客户端压缩请求体的阈值（字节）
+COMPRESS_THRESHOLD = 1400
+
+
+class BenchResult(BaseModel):
+    scenario: str
+    protocol: str
+    compress: bool = False
+    rows: int
+    latency_ms: float
+    seconds: float
+    records: int
+    records_per_s: float
+    rpc_calls: int
+    rpc_p50_ms: float
+    rpc_p95_ms: float
+    rpc_p99_ms: float
+    request_bytes: int
+    response_bytes: int
+    response_raw_bytes: int = 0
+    peak_mib: Union[float, None] = None
+
+
+def _run_once(scenario, server: FakeOdooServer, protocol, verbose: bool, trace: bool = False):
+    metrics = RpcMetrics()
+    client = OdooClient(server.api_key(protocol), metrics=metrics,
+                        compress_threshold=COMPRESS_THRESHOLD if server.compress else None)
+    # 登录不计入场景
+    with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+        client.login()
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            records = SCENARIOS[scenario](client)
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if trace else None
+        finally:
+            if trace:
+                tracemalloc.stop()
+            client.close()
+    return seconds, records, metrics, peak
+
+
+def run_scenario(scenario, scale: Scale, rows: int, protocol: str = 'xmlrpc', latency: float = 0.0,
+                 per_record: float = 0.0, repeat: int = 1, memory: bool = True,
+                 verbose: bool = False, compress: bool = False) -> BenchResult:
+    """
+    运行一个场景
+    :param scenario: SCENARIOS 中的名称
+    :param scale: 替身服务器的数据规模
+    :param rows: 记录在结果中的规模（sale.order.line 行数）
+    :param protocol: xmlrpc 或 jsonrpc
+    :param latency: 每个请求注入的延迟（秒）
+    :param per_record: 每条返回记录注入的延迟（秒）
+    :param repeat: 计时运行次数，取中位数
+    :param memory: 是否额外运行一次测量峰值内存
+    :param verbose: 是否显示场景中的输出
+    :param compress: 是否压缩请求和响应
+    """
+    runs = []
+    for _ in range(repeat):
+        with FakeOdooServer(scale, latency, per_record, compress) as server:
+            runs.append(_run_once(scenario, server, protocol, verbose))
+    seconds = statistics.median(run[0] for run in runs)
+    _, records, metrics, _ = runs[len(runs) // 2]
+
+    peak = None
+    if memory:
+        with FakeOdooServer(scale, latency, per_record, compress) as server:
+            peak = _run_once(scenario, server, protocol, verbose, trace=True)[3]
+
+    stats = metrics.stats()
+    calls = sum(row['calls'] for row in stats)
+    # 所有调用的耗时分位数按调用次数加权近似：取调用最多的 (模型, 方法) 的分位数
+    main = max(stats, key=lambda row: row['calls']) if stats else {}
+    return BenchResult(
+        scenario=scenario,
+        protocol=protocol,
+        compress=compress,
+        rows=rows,
+        latency_ms=latency * 1000,
+        seconds=round(seconds, 4),
+        records=records,
+        records_per_s=round(records / seconds, 1) if seconds else 0.0,
+        rpc_calls=calls,
+        rpc_p50_ms=main.get('p50_ms', 0.0),
+        rpc_p95_ms=main.get('p95_ms', 0.0),
+        rpc_p99_ms=main.get('p99_ms', 0.0),
+        request_bytes=sum(row['request_bytes'] for row in stats),
+        response_bytes=sum(row['response_bytes'] for row in stats),
+        response_raw_bytes=sum(row['response_raw_bytes'] for row in stats),
+        peak_mib=round(peak / 1024 / 1024, 2) if peak is not None else None,
+    )
+
+
+def _key(result) -> tuple:
+    return result['scenario'], result['protocol'], result['rows'], result['latency_ms']
+
+
+def print_results(results: List[BenchResult], baseline: List[dict] = None):
+    """ 打印结果表；给出 baseline 时附上耗时和峰值内存相对于 baseline 的比例 """
+    previous = {_key(row): row for row in baseline or []}
+    header = (f"{'scenario':<26} {'proto':<10} {'rows':>8} {'lat ms':>7} {'seconds':>9} {'rec/s':>10} "
+              f"{'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'KiB in':>9} {'KiB raw':>9} {'peak MiB':>9}")
+    if previous:
+        header += f" {'time x':>7} {'mem x':>6}"
+    print(header)
+    for result in results:
+        peak = f"{result.peak_mib:.1f}" if result.peak_mib is not None else '-'
+        protocol = result.protocol + ('+gz' if result.compress else '')
+        line = (f"{result.scenario:<26} {protocol:<10} {result.rows:>8} {result.latency_ms:>7.0f} "
+                f"{result.seconds:>9.3f} {result.records_per_s:>10.0f} {result.rpc_calls:>6} "
+                f"{result.rpc_p50_ms:>8.1f} {result.rpc_p95_ms:>8.1f} {result.response_bytes / 1024:>9.0f} "
+                f"{result.response_raw_bytes / 1024:>9.0f} {peak:>9}")
+        old = previous.get(_key(result.model_dump()))
+        if old:
+            time_ratio = result.seconds / old['seconds'] if old['seconds'] else float('nan')
+            mem_ratio = (result.peak_mib / old['peak_mib']
+                         if result.peak_mib and old.get('peak_mib') else float('nan'))
+            line += f" {time_ratio:>7.2f} {mem_ratio:>6.2f}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark against a local fake Odoo")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000],
+                        help="sale.order.line rows; other tables scale proportionally")
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--protocol', nargs='+', choices=['xmlrpc', 'jsonrpc'], default=['xmlrpc'])
+    parser.add_argument('--latency', type=float, default=0.0, help="injected delay per request (seconds)")
+    parser.add_argument('--per-record', type=float, default=0.0, help="injected delay per returned record (seconds)")
+    parser.add_argument('--compress', action='store_true', help="gzip request and response bodies")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc run")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', help="previous results file to compare against")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.rows:
+        scale = Scale.for_rows(rows)
+        for protocol in args.protocol:
+            for scenario in args.scenarios:
+                print(f"[Bench] {scenario} ({protocol}{'+gz' if args.compress else ''}, {rows} rows)...")
+                results.append(run_scenario(scenario, scale, rows, protocol, args.latency, args.per_record,
+                                            args.repeat, not args.no_memory, args.verbose, args.compress))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                   'latency': args.latency, 'per_record': args.per_record, 'compress': args.compress,
+                   'results': [result.model_dump() for result in results]}, f, indent=2)
+    print(f"Results saved to {args.output}")
+    return results
@@ -0,0 +1,147 @@
+"""
+基准测试场景
+
+每个场景接收一个已登录的 OdooClient（指向替身服务器），执行一次完整的提取或操作流程，
+返回处理的记录数。场景通过 odoo_lib.set_client() 和 from_client() 共用这个客户端，
+因此客户端上的 RpcMetrics 能统计到场景中的全部调用。
+"""
+from typing import Callable, Dict
+
+import pandas as pd
+
+import odoo_lib
+from rest.base import OdooClient, OdooWarehouseOperation, OdooPricelistOperation, SalesOrderClient
+
+
+def sales_orders(client: OdooClient) -> int:
+    odoo_lib.set_client(client)
+    df_orders, orderline_ids = odoo_lib.fetch_all_sales__order_details()
+    return len(df_orders)
+
+
+def sales_pipeline(client: OdooClient) -> int:
+    """ 销售订单 → 订单行，与 sales.ipynb 的下载流程相同 """
+    odoo_lib.set_client(client)
+    df_orders, orderline_ids = odoo_lib.fetch_all_sales__order_details()
+    df_lines = odoo_lib.fetch_sales_orderline_details(orderline_ids)
+    return len(df_orders) + len(df_lines)
+
+
+def sales_products(client: OdooClient) -> int:
+    """ 销售订单 → 订单行 → 产品模版，与 sales.ipynb 相同，三个阶段依次执行 """
+    odoo_lib.set_client(client)
+    df_orders, orderline_ids = odoo_lib.fetch_all_sales__order_details()
+    df_lines = odoo_lib.fetch_sales_orderline_details(orderline_ids)
+    product_ids = df_lines['product_id'].dropna().unique().tolist()
+    df_products = odoo_lib.fetch_all_product_template_details(product_ids)
+    return len(df_orders) + len(df_lines) + len(df_products)
+
+
+def sales_products_pipelined(client: OdooClient) -> int:
+    """ 与 sales_products 相同的结果，三个阶段以流水线方式重叠执行 """
+    odoo_lib.set_client(client)
+    df_orders, df_lines, df_products = odoo_lib.fetch_sales_pipeline()
+    return len(df_orders) + len(df_lines) + len(df_products)
+
+
+def purchase_pipeline(client: OdooClient) -> int:
+    odoo_lib.set_client(client)
+    df_orders, orderline_ids = odoo_lib.fetch_all_purchase_order_details()
+    df_lines = odoo_lib.fetch_all_purchase_orderline_details(orderline_ids)
+    return len(df_orders) + len(df_lines)
+
+
+def product_templates(client: OdooClient) -> int:
+    odoo_lib.set_client(client)
+    product_ids = client.search('product.template', [[]])
+    return len(odoo_lib.fetch_all_product_template_details(product_ids))
+
+
+def sales_aggregate(client: OdooClient) -> int:
+    """ 服务器端 read_group 汇总，对比 sales_pipeline 下载明细后本地分组 """
+    so = SalesOrderClient.from_client(client)
+    df = so.aggregate_order_lines(['salesman_id', 'create_date:month'],
+                                  ['price_subtotal:sum', 'order_id:count_distinct', '__count'])
+    return int(df['count'].sum())
+
+
+def warehouse_putaway(client: OdooClient) -> int:
+    """ 查找未按上架规则存放的库存量，并按目标库位批量移库 """
+    operation = OdooWarehouseOperation.from_client(client)
+    quants_to_move = operation.find_quants_match_putaway_rules()
+    operation.relocate_quants_to_putaway_location(quants_to_move)
+    return len(quants_to_move)
+
+
+def warehouse_putaway_refresh(client: OdooClient) -> int:
+    """ 移库后再次查找：索引只增量拉取变化的库存量，已移库的不再出现 """
+    operation = OdooWarehouseOperation.from_client(client)
+    quants_to_move = operation.find_quants_match_putaway_rules()
+    operation.relocate_quants_to_putaway_location(quants_to_move)
+    remaining = operation.find_quants_match_putaway_rules()
+    if remaining:
+        raise AssertionError(f"{len(remaining)} quants still violate putaway rules after relocation")
+    return len(quants_to_move)
+
+
+def warehouse_quants(client: OdooClient) -> int:
+    return len(OdooWarehouseOperation.from_client(client).list_quants_to_show())
+
+
+def pricelist_reconcile(client: OdooClient) -> int:
+    """
+    价格表同步中与 Odoo 交互的部分（不含交互确认和 xlsx 输出）:
+    读取价格表和 pricelist.item、对比合成的 VIP 价格，批量更新和新建。
+    VIP 数据中每个价格表有 1/10 的价格变化、另有 1/10 为 Odoo 中没有的产品。
+    """
+    operation = OdooPricelistOperation.from_client(client)
+
+    pricelists = client.search_read('product.pricelist', [[]], {'fields': ['id', 'name']})
+    names = [pricelist['name'] for pricelist in pricelists]
+    pricelist_details = operation._get_odoo_pricelist_details(names)
+    pricelist_items = operation._get_odoo_pricelist_items(names)
+    product_templates_map = operation._get_odoo_product_templates()
+
+    df_vip_prices = _vip_prices(pricelist_items, product_templates_map)
+    df_compare = operation._compare_vip_and_odoo_pricelist(df_vip_prices, pricelist_items, names)
+    operation._update_pricelist_items(df_compare)
+    operation._create_pricelist_items(df_compare, product_templates_map, pricelist_details)
+    return len(df_compare)
+
+
+def _vip_prices(pricelist_items, product_templates_map) -> pd.DataFrame:
+    """ 由 Odoo 中已有的 pricelist.item 构造 VIP 价格表（与 _load_and_preprocess_vip_data 的结果同构） """
+    df = pd.DataFrame.from_records([{
+        'group_name': item.pricelist_name,
+        'internal_reference': item.default_code,
+        'custom_price': item.fixed_price + (1.0 if n % 10 == 0 else 0.0),
+        'min_quantity': item.min_quantity,
+    } for n, item in enumerate(pricelist_items)], columns=['group_name', 'internal_reference',
+                                                           'custom_price', 'min_quantity'])
+    codes = sorted(product_templates_map)
+    known = set(zip(df['group_name'], df['internal_reference']))
+    extra = []
+    for group_name in df['group_name'].unique():
+        candidates = [code for code in codes if (group_name, code) not in known]
+        for code in candidates[:max(1, len(df) // 10 // max(1, df['group_name'].nunique()))]:
+            extra.append({'group_name': group_name, 'internal_reference': code, 'custom_price': 9.99,
+                          'min_quantity': 1})
+    df = pd.concat([df, pd.DataFrame(extra, columns=df.columns)], ignore_index=True)
+    df['key'] = (df['group_name'] + '_' + df['internal_reference'].astype(str)
+                 + '_' + df['min_quantity'].astype(int).astype(str))
+    return df
+
+
+SCENARIOS: Dict[str, Callable[[OdooClient], int]] = {
+    'sales_orders': sales_orders,
+    'sales_pipeline': sales_pipeline,
+    'sales_products': sales_products,
+    'sales_products_pipelined': sales_products_pipelined,
+    'purchase_pipeline': purchase_pipeline,
+    'product_templates': product_templates,
+    'sales_aggregate': sales_aggregate,
+    'warehouse_putaway': warehouse_putaway,
+    'warehouse_putaway_refresh': warehouse_putaway_refresh,
+    'warehouse_quants': warehouse_quants,
+    'pricelist_reconcile': pricelist_reconcile,
+}
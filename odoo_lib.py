@@ -1,28 +1,117 @@
-import re
+import itertools
 
-from rest.base import OdooAPIKey, OdooAPIBase
+from rest.base import OdooAPIKey, OdooClient, SESSIONS, DEFAULT_MAX_WORKERS
+from rest.metrics import RpcMetrics
+from rest.decode import RecordDecoder, extract_internal_ref, drop_unused_categories, concat_frames
+from rest.projection import PROJECTIONS
+from rest.export import DataFrameExporter, DEFAULT_EXPORT_FORMAT, DEFAULT_EXPORT_DIR
+from rest.sync import OdooMirror, SyncModel, DEFAULT_MIRROR_PATH
+from rest.pipeline import Pipeline, IdBatcher, DEFAULT_QUEUE_SIZE
 import os
+import time
 import pandas as pd
 
 # 设置环境变量
 os.environ['ODOO_ACCESS_KEY'] = 'odoo-api-prod.json'
 os.environ['ODOO_ACCESS_KEY_INDEX'] = "0"
 
-api_key = OdooAPIKey.prod()
-base = OdooAPIBase(api_key)
-cli = base.client
+# 设置 ODOO_RPC_METRICS=<文件路径> 时记录每次 RPC 调用，并在进程退出时写入该 JSON 文件
+metrics = RpcMetrics(dump_path=os.environ['ODOO_RPC_METRICS']) if os.environ.get('ODOO_RPC_METRICS') else None
+# 第一次使用时才登录，见 get_client()
+_client: OdooClient = None
 
+SALE_ORDER_DOMAIN = [('user_id', 'not in', [8, 6])]
+PURCHASE_ORDER_DOMAIN = [('partner_id', 'not in', [39, 316])]
+SALE_ORDER_FIELDS = ['id', 'name', 'company_id', 'partner_id', 'state', 'date_order', 'invoice_status',
+                     'shipping_weight', 'order_line']
+PURCHASE_ORDER_FIELDS = ['id', 'name', 'company_id', 'partner_id', 'state', 'date_order', 'invoice_status',
+                         'order_line']
+SALE_ORDER_LINE_FIELDS = ['order_id', 'name', 'currency_id', 'order_partner_id', 'salesman_id', 'product_template_id',
+                          'state', 'product_uom', 'product_uom_qty', 'product_qty', 'price_unit',
+                          'price_subtotal', 'price_tax', 'price_total', 'qty_to_invoice', 'qty_to_deliver',
+                          'product_type', 'create_date', 'is_delivery', 'display_type', 'discount'
+                          ]
+PURCHASE_ORDER_LINE_FIELDS = ['order_id', 'name', 'currency_id', 'partner_id', 'state', 'product_uom',
+                              'product_uom_qty', 'product_qty', 'price_unit', 'price_subtotal', 'price_tax',
+                              'price_total', 'qty_to_invoice', 'qty_received', 'date_order', 'product_type',
+                              'create_date', 'discount', 'display_type']
+PRODUCT_TEMPLATE_FIELDS = ['id', 'name', 'display_name', 'list_price', 'default_code', 'uom_name',
+                           'active', 'barcode', 'standard_price', 'volume', 'weight', 'categ_id']
+# 解码为 category 列的低基数字段（many2one 字段指其显示名称列）
+SALE_ORDER_CATEGORICAL = ['company_id', 'state', 'invoice_status']
+PURCHASE_ORDER_CATEGORICAL = ['company_id', 'state', 'invoice_status']
+SALE_ORDER_LINE_CATEGORICAL = ['currency_id', 'salesman_id', 'state', 'product_uom', 'product_type', 'display_type']
+PURCHASE_ORDER_LINE_CATEGORICAL = ['currency_id', 'state', 'product_uom', 'product_type', 'display_type']
+PRODUCT_TEMPLATE_CATEGORICAL = ['categ_id', 'uom_name']
 
-def __extract_internal_ref_from_product_name(product_name):
-    # 正则表达式匹配中括号内的内容
-    pattern = r'\[(.*?)\]'
-    match = re.search(pattern, product_name)
-    content = ""
-    if match:
-        content = match.group(1)
-    else:
-        print(f"No match found: {product_name}")
-    return content
+# 每个提取函数需要的字段，读取时只向服务器请求这些字段
+PROJECTIONS.register('sale_orders', 'sale.order', SALE_ORDER_FIELDS)
+PROJECTIONS.register('sale_order_lines', 'sale.order.line', SALE_ORDER_LINE_FIELDS)
+PROJECTIONS.register('purchase_orders', 'purchase.order', PURCHASE_ORDER_FIELDS)
+PROJECTIONS.register('purchase_order_lines', 'purchase.order.line', PURCHASE_ORDER_LINE_FIELDS)
+PROJECTIONS.register('product_templates', 'product.template', PRODUCT_TEMPLATE_FIELDS)
+
+# 本地镜像中保存的模型及字段，见 use_mirror()
+MIRROR_MODELS = [
+    SyncModel(model='sale.order', domain=SALE_ORDER_DOMAIN, fields=SALE_ORDER_FIELDS),
+    SyncModel(model='sale.order.line', fields=SALE_ORDER_LINE_FIELDS),
+    SyncModel(model='purchase.order', domain=PURCHASE_ORDER_DOMAIN, fields=PURCHASE_ORDER_FIELDS),
+    SyncModel(model='purchase.order.line', fields=PURCHASE_ORDER_LINE_FIELDS),
+]
+mirror: OdooMirror = None
+
+
+def get_client() -> OdooClient:
+    """ 返回已登录的客户端，第一次调用时用 OdooAPIKey.prod() 登录（与其他客户端共用 SESSIONS 中的会话） """
+    global _client
+    if _client is None:
+        _client = SESSIONS.get(OdooAPIKey.prod(), metrics=metrics)
+    return _client
+
+
+def set_client(client: OdooClient):
+    """ 使用指定的（已登录的）客户端，如测试或基准测试中指向其他服务器的客户端 """
+    global _client, mirror
+    _client = client
+    mirror = None
+    PROJECTIONS.invalidate()
+
+
+def use_mirror(path=DEFAULT_MIRROR_PATH, sync=True):
+    """
+    启用本地镜像：先按 write_date 增量同步，之后订单和订单行的 fetch_* 都从镜像读取
+    :param path: 镜像文件路径
+    :param sync: 是否先同步
+    """
+    global mirror
+    mirror = OdooMirror(get_client(), MIRROR_MODELS, path)
+    if sync:
+        mirror.sync()
+    return mirror
+
+
+def _fields(projection):
+    """ 投影中已与服务器核对过的字段 """
+    return PROJECTIONS.fields(projection, get_client())
+
+
+def _search_read(projection, domain):
+    model = PROJECTIONS.get(projection).model
+    # 镜像同步时已使用相同的 domain
+    if mirror is not None and mirror.has_model(model):
+        return mirror.iter_read(model)
+    return get_client().iter_search_read(model, domain, _fields(projection))
+
+
+def _read(projection, ids, max_workers=DEFAULT_MAX_WORKERS):
+    model = PROJECTIONS.get(projection).model
+    if mirror is not None and mirror.has_model(model):
+        return mirror.iter_read(model, ids)
+    return get_client().iter_read_parallel(model, ids, _fields(projection), max_workers=max_workers)
+
+
+def _decoder(model, categorical=()):
+    return RecordDecoder.for_model(get_client(), model, categorical)
 
 
 def fetch_all_sales__order_details():
@@ -32,172 +121,254 @@ def fetch_all_sales__order_details():
         1. 所有销售订单信息
         2. 所有销售订单对应的订单行ID
     """
-    domain = [('user_id', 'not in', [8, 6])]
-    order_ids = cli.search('sale.order', [domain])
-    orders_ = cli.read('sale.order', [order_ids])
-    sale_orders = []
-    for od in orders_:
-        so = dict(
-            id=od['id'],
-            name=od['name'],
-            company=od['company_id'][1],
-            partner=od['partner_id'][1],
-            state=od['state'],
-            date_order=od['date_order'],
-            invoice_status=od['invoice_status'],
-            shipping_weight=od['shipping_weight'],
-            orderline_ids=od['order_line']
-        )
-        sale_orders.append(so)
-    df_sale_order = pd.DataFrame.from_dict(sale_orders)
-
-    orderline_ids = set()
-    for od in orders_:
-        orderline_ids.update(od['order_line'])
-    orderline_ids = list(orderline_ids)
+    df = _decoder('sale.order', SALE_ORDER_CATEGORICAL).decode_iter(_search_read('sale_orders', SALE_ORDER_DOMAIN),
+                                                                    SALE_ORDER_FIELDS)
+    df_sale_order = _sale_order_frame(df)
+    orderline_ids = list(set(itertools.chain.from_iterable(df['order_line'])))
     return df_sale_order, orderline_ids
 
 
-def fetch_sales_orderline_details(orderline_ids):
-    fields = ['order_id', 'name', 'currency_id', 'order_partner_id', 'salesman_id', 'product_template_id',
-              'state', 'product_uom', 'product_uom_qty', 'product_qty', 'price_unit',
-              'price_subtotal', 'price_tax', 'price_total', 'qty_to_invoice', 'qty_to_deliver',
-              'product_type', 'create_date', 'is_delivery', 'display_type', 'discount'
-             ]
-    # fields = []
-    orderlines_ = cli.read('sale.order.line', [orderline_ids], {"fields": fields})
-    orderlines = []
-
-    for odl in orderlines_:
-        if odl['display_type'] == 'line_note':
-            continue
-        try:
-            line = {
-                "order_number": odl['order_id'][1],  # 订单号
-                "product_name": odl['product_template_id'][1],
-                "product_id": odl['product_template_id'][0],
-                "internal_reference": __extract_internal_ref_from_product_name(odl['product_template_id'][1]),
-                "currency": odl['currency_id'][1],
-                "order_partner": odl['order_partner_id'][1], # 客户
-                "salesman": odl['salesman_id'][1], # 销售员
-                'state': odl['state'],
-                'uom': odl['product_uom'][1],  # 单位
-                'product_uom_qty': odl['product_uom_qty'],   #product_qty
-                'product_qty': odl['product_qty'],  # 数量
-                'price_unit': odl['price_unit'],  # 单价
-                'price_subtotal': odl['price_subtotal'], # 小计
-                'price_tax': odl['price_tax'], # 含税
-                'price_total': odl['price_total'], # 总计
-                'qty_to_invoice': odl['qty_to_invoice'],
-                'qty_to_deliver': odl['qty_to_deliver'],
-                'product_type': odl['product_type'],
-                'create_date': odl['create_date'],
-                'is_delivery': odl['is_delivery'],
-                'discount': odl['discount'],
-            }
-        except Exception as e:
-            print(e)
-            print(odl)
-        orderlines.append(line)
-    df_sale_order_lines = pd.DataFrame.from_dict(orderlines)
-    df_sale_order_lines['create_date'] = pd.to_datetime(df_sale_order_lines['create_date'], format='%Y-%m-%d %H:%M:%S')
+def _sale_order_frame(df):
+    """ 把解码后的 sale.order 列转换为分析用的订单表 """
+    return pd.DataFrame({
+        'id': df['id'],
+        'name': df['name'],
+        'company': df['company_id_name'],
+        'partner': df['partner_id_name'],
+        'state': df['state'],
+        'date_order': df['date_order'],
+        'invoice_status': df['invoice_status'],
+        'shipping_weight': df['shipping_weight'],
+        'orderline_ids': df['order_line'],
+    })
+
+
+def _sale_orderline_frame(df):
+    """ 把解码后的 sale.order.line 列转换为分析用的订单行表 """
+    df = drop_unused_categories(df[df['display_type'] != 'line_note'].reset_index(drop=True))
+    return pd.DataFrame({
+        "order_number": df['order_id_name'],  # 订单号
+        "product_name": df['product_template_id_name'],
+        "product_id": df['product_template_id'],
+        "internal_reference": extract_internal_ref(df['product_template_id_name']),
+        "currency": df['currency_id_name'],
+        "order_partner": df['order_partner_id_name'],  # 客户
+        "salesman": df['salesman_id_name'],  # 销售员
+        'state': df['state'],
+        'uom': df['product_uom_name'],  # 单位
+        'product_uom_qty': df['product_uom_qty'],  # product_qty
+        'product_qty': df['product_qty'],  # 数量
+        'price_unit': df['price_unit'],  # 单价
+        'price_subtotal': df['price_subtotal'],  # 小计
+        'price_tax': df['price_tax'],  # 含税
+        'price_total': df['price_total'],  # 总计
+        'qty_to_invoice': df['qty_to_invoice'],
+        'qty_to_deliver': df['qty_to_deliver'],
+        'product_type': df['product_type'],
+        'create_date': df['create_date'],
+        'is_delivery': df['is_delivery'],
+        'discount': df['discount'],
+    })
+
+
+def fetch_sales_orderline_details(orderline_ids, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    获取销售订单行详情，订单行按 id 分片后多线程并发读取，并按列解码
+    :param orderline_ids: 订单行ID列表
+    :param max_workers: 并发线程数
+    """
+    records = _read('sale_order_lines', orderline_ids, max_workers=max_workers)
+    df = _decoder('sale.order.line', SALE_ORDER_LINE_CATEGORICAL).decode_iter(records, SALE_ORDER_LINE_FIELDS)
+    df_sale_order_lines = _sale_orderline_frame(df)
     df_sale_order_lines.sort_values(by='create_date', inplace=True)
     return df_sale_order_lines
 
+
+def export_sales_orderline_details(orderline_ids, file_name='sales_order_lines', fmt=DEFAULT_EXPORT_FORMAT,
+                                   max_workers=DEFAULT_MAX_WORKERS):
+    """
+    把销售订单行边读取边写入 temp/<file_name>.<fmt>，不在内存中保留整张表。
+    输出按订单行 id 的读取顺序排列，而不是按 create_date 排序。
+    :return: 文件路径
+    """
+    records = _read('sale_order_lines', orderline_ids, max_workers=max_workers)
+    with DataFrameExporter(os.path.join(DEFAULT_EXPORT_DIR, f"{file_name}.{fmt}"), fmt, background=True) as exporter:
+        decoder = _decoder('sale.order.line', SALE_ORDER_LINE_CATEGORICAL)
+        for df in decoder.iter_frames(records, SALE_ORDER_LINE_FIELDS):
+            exporter.append(_sale_orderline_frame(df))
+    return exporter.path
+
 def fetch_all_purchase_order_details():
     """
+    获取所有采购订单及对应的订单行ID
     """
-    domain = [('partner_id', 'not in', [39, 316])]
-    order_ids = cli.search('purchase.order', [domain])
-    orders_ = cli.read('purchase.order', [order_ids])
-    purchase_orders = []
-    for od in orders_:
-        so = dict(
-            id=od['id'],
-            name=od['name'],
-            company=od['company_id'][1],
-            partner=od['partner_id'][1],
-            state=od['state'],
-            date_order=od['date_order'],
-            invoice_status=od['invoice_status'],
-            # shipping_weight = od['shipping_weight'],
-            orderline_ids=od['order_line']
-        )
-        purchase_orders.append(so)
-    df_purchase_orders = pd.DataFrame.from_dict(purchase_orders)
-
-    orderline_ids = set()
-    for od in orders_:
-        orderline_ids.update(od['order_line'])
-    orderline_ids = list(orderline_ids)
+    records = _search_read('purchase_orders', PURCHASE_ORDER_DOMAIN)
+    df = _decoder('purchase.order', PURCHASE_ORDER_CATEGORICAL).decode_iter(records, PURCHASE_ORDER_FIELDS)
+    df_purchase_orders = pd.DataFrame({
+        'id': df['id'],
+        'name': df['name'],
+        'company': df['company_id_name'],
+        'partner': df['partner_id_name'],
+        'state': df['state'],
+        'date_order': df['date_order'],
+        'invoice_status': df['invoice_status'],
+        'orderline_ids': df['order_line'],
+    })
+    orderline_ids = list(set(itertools.chain.from_iterable(df['order_line'])))
     return df_purchase_orders, orderline_ids
 
-def fetch_all_purchase_orderline_details(orderline_ids):
-    orderlines = []
-    orderlines_ = cli.read('purchase.order.line', [orderline_ids])
-    for odl in orderlines_:
-        if odl['display_type'] == 'line_note':
-            continue
-        line = {
-            "order_number": odl['order_id'][1],  # 订单号
-            "product_name": odl['name'],
-            "internal_reference": __extract_internal_ref_from_product_name(odl['name']),
-            "currency": odl['currency_id'][1],
-            "order_partner": odl['partner_id'][1],  # 客户
-            'state': odl['state'],
-            'uom': odl['product_uom'][1],  # 单位
-            'product_uom_qty': odl['product_uom_qty'],  # product_qty
-            'product_qty': odl['product_qty'],  # 数量
-            'price_unit': odl['price_unit'],  # 单价
-            'price_subtotal': odl['price_subtotal'],  # 小计
-            'price_tax': odl['price_tax'],  # 含税
-            'price_total': odl['price_total'],  # 总计
-            'qty_to_invoice': odl['qty_to_invoice'],
-            'qty_received': odl['qty_received'],
-            'date_order': odl['date_order'],
-            'product_type': odl['product_type'],
-            'create_date': odl['create_date'],
-            'discount': odl['discount'],
-        }
-
-        orderlines.append(line)
-
-    df_purchase_order_lines = pd.DataFrame.from_dict(orderlines)
-    df_purchase_order_lines['create_date'] = pd.to_datetime(df_purchase_order_lines['create_date'],
-                                                            format='%Y-%m-%d %H:%M:%S')
+def _purchase_orderline_frame(df):
+    """ 把解码后的 purchase.order.line 列转换为分析用的订单行表 """
+    df = drop_unused_categories(df[df['display_type'] != 'line_note'].reset_index(drop=True))
+    return pd.DataFrame({
+        "order_number": df['order_id_name'],  # 订单号
+        "product_name": df['name'],
+        "internal_reference": extract_internal_ref(df['name']),
+        "currency": df['currency_id_name'],
+        "order_partner": df['partner_id_name'],  # 客户
+        'state': df['state'],
+        'uom': df['product_uom_name'],  # 单位
+        'product_uom_qty': df['product_uom_qty'],  # product_qty
+        'product_qty': df['product_qty'],  # 数量
+        'price_unit': df['price_unit'],  # 单价
+        'price_subtotal': df['price_subtotal'],  # 小计
+        'price_tax': df['price_tax'],  # 含税
+        'price_total': df['price_total'],  # 总计
+        'qty_to_invoice': df['qty_to_invoice'],
+        'qty_received': df['qty_received'],
+        'date_order': df['date_order'],
+        'product_type': df['product_type'],
+        'create_date': df['create_date'],
+        'discount': df['discount'],
+    })
+
+
+def fetch_all_purchase_orderline_details(orderline_ids, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    获取采购订单行详情，订单行按 id 分片后多线程并发读取，并按列解码
+    :param orderline_ids: 订单行ID列表
+    :param max_workers: 并发线程数
+    """
+    records = _read('purchase_order_lines', orderline_ids, max_workers=max_workers)
+    decoder = _decoder('purchase.order.line', PURCHASE_ORDER_LINE_CATEGORICAL)
+    df = decoder.decode_iter(records, PURCHASE_ORDER_LINE_FIELDS)
+    df_purchase_order_lines = _purchase_orderline_frame(df)
     df_purchase_order_lines.sort_values(by='create_date', inplace=True)
     return df_purchase_order_lines
 
 
+def export_purchase_orderline_details(orderline_ids, file_name='purchase_order_lines', fmt=DEFAULT_EXPORT_FORMAT,
+                                      max_workers=DEFAULT_MAX_WORKERS):
+    """
+    把采购订单行边读取边写入 temp/<file_name>.<fmt>，不在内存中保留整张表。
+    :return: 文件路径
+    """
+    records = _read('purchase_order_lines', orderline_ids, max_workers=max_workers)
+    with DataFrameExporter(os.path.join(DEFAULT_EXPORT_DIR, f"{file_name}.{fmt}"), fmt, background=True) as exporter:
+        decoder = _decoder('purchase.order.line', PURCHASE_ORDER_LINE_CATEGORICAL)
+        for df in decoder.iter_frames(records, PURCHASE_ORDER_LINE_FIELDS):
+            exporter.append(_purchase_orderline_frame(df))
+    return exporter.path
+
+
 def fetch_all_product_template_details(product_ids):
     # Get Product Details
-    domain = [("id", "in", product_ids), "|", ("active", "=", True), ("active", "=", False)]
-    fields = {
-        "fields":
-            ['id', 'name', 'display_name', 'list_price', 'default_code', 'uom_name',
-             'active', 'barcode', 'standard_price', 'volume', 'weight', 'categ_id']
-    }
-    products_ = cli.search_read('product.template', [domain], fields)
-
-    products = []
-    for prod in products_:
-        product_dict = {
-            'id': prod['id'],
-            'name': prod['name'],
-            'display_name': prod['display_name'],
-            'categ_id': prod['categ_id'][1],
-            'list_price': prod['list_price'],
-            'default_code': prod['default_code'],
-            'barcode': prod['barcode'],
-            'standard_price': prod['standard_price'],
-            'volume': prod['volume'],
-            'weight': prod['weight'],
-            'uom_name': prod['uom_name'],
-        }
-        products.append(product_dict)
-
-    df_products = pd.DataFrame.from_dict(products)
-    return df_products
+    records = get_client().iter_search_read('product.template', _product_template_domain(product_ids),
+                                            _fields('product_templates'))
+    df = _decoder('product.template', PRODUCT_TEMPLATE_CATEGORICAL).decode_iter(records, PRODUCT_TEMPLATE_FIELDS)
+    return _product_template_frame(df)
+
+
+def _product_template_frame(df):
+    """ 把解码后的 product.template 列转换为产品表 """
+    return pd.DataFrame({
+        'id': df['id'],
+        'name': df['name'],
+        'display_name': df['display_name'],
+        'categ_id': df['categ_id_name'],
+        'list_price': df['list_price'],
+        'default_code': df['default_code'],
+        'barcode': df['barcode'],
+        'standard_price': df['standard_price'],
+        'volume': df['volume'],
+        'weight': df['weight'],
+        'uom_name': df['uom_name'],
+    })
+
+
+def _product_template_domain(product_ids):
+    """ 按 id 读取产品模版，包括已归档的 """
+    return [("id", "in", product_ids), "|", ("active", "=", True), ("active", "=", False)]
+
+
+def fetch_sales_pipeline(max_workers=DEFAULT_MAX_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, chunk_size=None):
+    """
+    以流水线方式获取销售订单、订单行和订单行引用的产品模版:
+    每页订单读到后其订单行 id 立即交给订单行线程，每块订单行读到后其中新出现的产品 id 立即交给产品线程，
+    三个阶段的网络等待相互重叠。阶段之间是有界队列，下游处理不过来时上游等待。
+    结果与依次调用 fetch_all_sales__order_details、fetch_sales_orderline_details 和
+    fetch_all_product_template_details 相同（产品表的行顺序可能不同）。
+    :param max_workers: 订单行和产品阶段各自的线程数
+    :param queue_size: 阶段之间队列的容量（块数）
+    :param chunk_size: 每块订单行/产品的 id 数，默认使用 client.chunk_size
+    :return: (df_sale_order, df_sale_order_lines, df_products)
+    """
+    if mirror is not None:
+        # 镜像中读取没有网络等待，直接依次执行
+        df_sale_order, orderline_ids = fetch_all_sales__order_details()
+        df_sale_order_lines = fetch_sales_orderline_details(orderline_ids, max_workers=max_workers)
+        product_ids = df_sale_order_lines['product_id'].dropna().unique().tolist()
+        return df_sale_order, df_sale_order_lines, fetch_all_product_template_details(product_ids)
+
+    client = get_client()
+    chunk_size = chunk_size or client.chunk_size
+    order_decoder = _decoder('sale.order', SALE_ORDER_CATEGORICAL)
+    line_decoder = _decoder('sale.order.line', SALE_ORDER_LINE_CATEGORICAL)
+    product_decoder = _decoder('product.template', PRODUCT_TEMPLATE_CATEGORICAL)
+    line_fields = _fields('sale_order_lines')
+    product_fields = _fields('product_templates')
+    line_ids = IdBatcher(chunk_size)
+    product_ids = IdBatcher(chunk_size)
+    order_frames, line_frames, product_frames = [], [], []
+
+    def handle_orders(records, emit):
+        df = order_decoder.decode(records, SALE_ORDER_FIELDS)
+        order_frames.append(df)
+        line_ids.add(itertools.chain.from_iterable(df['order_line']), emit)
+
+    def handle_lines(ids, emit):
+        records = client.read('sale.order.line', [ids], {'fields': line_fields})
+        df = line_decoder.decode(records, SALE_ORDER_LINE_FIELDS)
+        line_frames.append(df)
+        product_ids.add(df['product_template_id'].dropna().tolist(), emit)
+
+    def handle_products(ids, emit):
+        records = client.search_read('product.template', [_product_template_domain(ids)], {'fields': product_fields})
+        product_frames.append(product_decoder.decode(records, PRODUCT_TEMPLATE_FIELDS))
+
+    pipeline = Pipeline(queue_size) \
+        .stage('orders', handle_orders, flush=line_ids.flush) \
+        .stage('lines', handle_lines, workers=max_workers, flush=product_ids.flush) \
+        .stage('products', handle_products, workers=max_workers)
+    start = time.perf_counter()
+    stats = pipeline.run(client.iter_search_read_chunks('sale.order', SALE_ORDER_DOMAIN, _fields('sale_orders'),
+                                                        chunk_size))
+    for stage in stats:
+        print(f"[Pipeline] {stage.name}: {stage.items} chunks, {stage.workers} workers, "
+              f"busy {stage.busy_seconds:.2f}s")
+    print(f"[Pipeline] finished in {time.perf_counter() - start:.2f}s")
+
+    df_sale_order = _sale_order_frame(_concat(order_frames, order_decoder, SALE_ORDER_FIELDS))
+    df_sale_order_lines = _sale_orderline_frame(_concat(line_frames, line_decoder, SALE_ORDER_LINE_FIELDS))
+    df_sale_order_lines.sort_values(by='create_date', inplace=True)
+    df_products = _product_template_frame(_concat(product_frames, product_decoder, PRODUCT_TEMPLATE_FIELDS))
+    return df_sale_order, df_sale_order_lines, df_products
+
+
+def _concat(frames, decoder, fields):
+    if not frames:
+        return decoder.decode([], fields)
+    return concat_frames(frames) if len(frames) > 1 else frames[0]
 
 
 
@@ -1,4 +1,16 @@
-from .base import OdooAPIBase, OdooAPIKey
+from .base import OdooAPIBase, OdooAPIKey, OdooClient, FullRecordReadWarning
+from .base import SessionRegistry, SESSIONS
 from .base import ContactClient, SalesOrderClient
 from .base import ProductClient, ProductTemplateClient, OdooWarehouseClient
 from .base import OdooWarehouseOperation, OdooPricelistOperation
+from .aio import AsyncOdooClient, AsyncOdooAPI
+from .sync import OdooMirror, SyncModel
+from .cache import ResponseCache
+from .decode import RecordDecoder, extract_internal_ref
+from .export import DataFrameExporter, export_dataframe
+from .projection import Projection, ProjectionRegistry, PROJECTIONS
+from .aggregate import read_group_frame
+from .metrics import RpcMetrics
+from .governor import RateGovernor
+from .pipeline import Pipeline, IdBatcher, StageStats
+from .putaway import PutawayIndex, LocationTree
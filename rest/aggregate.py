@@ -0,0 +1,91 @@
+"""
+基于 read_group 的服务器端聚合
+
+由 Odoo 在数据库中完成分组和求和，只返回每组一行，而不是下载整张明细表再用 pandas 分组：
+    read_group_frame(client, 'sale.order.line', ['salesman_id', 'create_date:month'],
+                     ['price_subtotal:sum', 'order_id:count_distinct', '__count'])
+
+groupby 的写法与 Odoo 相同，日期字段可以带粒度: <field>:day/week/month/quarter/year。
+度量写作 <field>:<agg>（agg 为 sum/avg/min/max/count/count_distinct 等，省略时为 sum），
+__count 为每组的记录数。
+"""
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
+
+from .base import OdooClient
+from .lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+COUNT_MEASURE = '__count'
+DEFAULT_AGGREGATE = 'sum'
+
+
+def parse_measure(measure) -> Tuple[str, str, str]:
+    """
+    :param measure: 'price_subtotal', 'price_subtotal:sum', 'order_id:count_distinct' 或 '__count'
+    :return: (结果列名, 字段, 聚合函数)。sum 的列名为字段名，其他为 <field>_<agg>
+    """
+    if measure == COUNT_MEASURE:
+        return 'count', COUNT_MEASURE, 'count'
+    field, _, agg = measure.partition(':')
+    agg = agg or DEFAULT_AGGREGATE
+    column = field if agg == DEFAULT_AGGREGATE else f"{field}_{agg}"
+    return column, field, agg
+
+
+def read_group_frame(client: OdooClient, model, groupby: Sequence[str],
+                     measures: Sequence[str] = (COUNT_MEASURE,), domain: list = None,
+                     orderby: str = None, limit: int = None) -> pd.DataFrame:
+    """
+    调用 read_group 并把结果整理为每组一行的 DataFrame:
+    - many2one 分组键拆成 <field>（Int64）和 <field>_name 两列
+    - 带粒度的日期分组键为 <field>_<interval> 列，值为该区间的起始时间
+    - 每个度量一列
+    :param client: 已登录的 OdooClient
+    :param model: 模型名称
+    :param groupby: 分组键
+    :param measures: 度量
+    :param domain: 搜索条件
+    :param orderby: 排序，如 'price_subtotal desc'
+    :param limit: 最多返回的组数
+    """
+    groupby = list(groupby)
+    specs = [parse_measure(measure) for measure in measures]
+    # 'alias:agg(field)' 让同一字段可以有多种聚合，且结果键就是列名
+    fields = [f"{column}:{agg}({field})" for column, field, agg in specs if field != COUNT_MEASURE]
+    groups = client.read_group(model, domain or [], fields, groupby, lazy=False, orderby=orderby, limit=limit)
+    fields_meta = client.fields_get(model)
+
+    columns = {}
+    for key in groupby:
+        field, _, interval = key.partition(':')
+        values = [group.get(key, False) for group in groups]
+        field_type = fields_meta.get(field, {}).get('type')
+        if interval or field_type in ('date', 'datetime'):
+            columns[f"{field}_{interval}" if interval else field] = _group_dates(groups, key, values)
+        elif field_type == 'many2one':
+            pairs = [value or (None, None) for value in values]
+            columns[field] = pd.array([pair[0] for pair in pairs], dtype='Int64')
+            columns[f"{field}_name"] = pd.array([pair[1] for pair in pairs], dtype=object)
+        elif field_type == 'boolean':
+            columns[field] = pd.array(values, dtype=bool)
+        else:
+            columns[field] = pd.array([None if value is False else value for value in values], dtype=object)
+
+    for column, field, agg in specs:
+        key = COUNT_MEASURE if field == COUNT_MEASURE else column
+        columns[column] = pd.to_numeric(pd.Series([group.get(key) for group in groups], dtype=object))
+    return pd.DataFrame(columns)
+
+
+def _group_dates(groups: List[dict], key, labels: list) -> pd.Series:
+    """
+    日期分组的区间起点。Odoo 16+ 在 __range 中返回区间边界，
+    旧版本只有 'January 2024' 这样的本地化标签，此时保留标签原文。
+    """
+    ranges = [(group.get('__range') or {}).get(key) for group in groups]
+    if groups and all(ranges):
+        return pd.to_datetime(pd.Series([r['from'] or None for r in ranges], dtype=object), format='mixed')
+    return pd.Series([label or None for label in labels], dtype=object)
@@ -0,0 +1,115 @@
+"""
+asyncio 版本的 Odoo 客户端
+
+XML-RPC/JSON-RPC 调用本身是阻塞的，这里把每次调用放到线程中执行，
+由信号量限制同时进行中的请求数。底层共用一个线程安全的 OdooClient（连接池），
+因此在一个事件循环里可以并发地读取销售订单、订单行、产品和库存。
+
+用法（notebook 中可直接 await）:
+    aclient = await AsyncOdooClient(key).login()
+    so = aclient.api(SalesOrderClient)
+    wh = aclient.api(OdooWarehouseClient)
+    orders, quants = await asyncio.gather(so.fetch_order_details(order_ids),
+                                          wh.fetch_quant_details(quant_ids))
+"""
+import asyncio
+from typing import List, Type
+
+from .base import OdooAPIKey, OdooClient, OdooAPIBase
+
+# 默认同时进行中的请求数上限
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class AsyncOdooClient(object):
+    """ 与 OdooClient 方法一一对应的异步客户端 """
+
+    def __init__(self, api_key: OdooAPIKey = None, client: OdooClient = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, **client_kwargs):
+        """
+        :param api_key: 用于创建新的 OdooClient
+        :param client: 已有的 OdooClient（可已登录），与 api_key 二选一
+        :param max_concurrency: 同时进行中的请求数上限
+        :param client_kwargs: 创建 OdooClient 时的其他参数，如 protocol, chunk_size
+        """
+        if client is None:
+            if api_key is None:
+                raise ValueError("Either api_key or client must be given")
+            client_kwargs.setdefault('pool_size', max_concurrency)
+            client = OdooClient(api_key, **client_kwargs)
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, func, *args, **kwargs):
+        """ 在线程中执行一个阻塞调用，受并发上限约束 """
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    def api(self, api_cls: Type[OdooAPIBase]) -> 'AsyncOdooAPI':
+        """ 基于当前客户端创建 api_cls（如 SalesOrderClient），并返回其异步包装 """
+        return AsyncOdooAPI(api_cls.from_client(self.client), self)
+
+    async def login(self):
+        await self.run(self.client.login)
+        return self
+
+    async def version(self):
+        return await self.run(self.client.version)
+
+    async def execute_kw(self, model, method, *args, **kwargs):
+        return await self.run(self.client.execute_kw, model, method, *args, **kwargs)
+
+    async def search_read(self, model, *args, **kwargs):
+        return await self.execute_kw(model, 'search_read', *args, **kwargs)
+
+    async def search(self, model, *args, **kwargs):
+        return await self.execute_kw(model, 'search', *args, **kwargs)
+
+    async def read(self, model, *args, **kwargs):
+        return await self.execute_kw(model, 'read', *args, **kwargs)
+
+    async def create(self, model, *args, **kwargs):
+        return await self.execute_kw(model, 'create', *args, **kwargs)
+
+    async def write(self, model, *args, **kwargs):
+        return await self.execute_kw(model, 'write', *args, **kwargs)
+
+    async def read_group(self, model, *args, **kwargs):
+        return await self.run(self.client.read_group, model, *args, **kwargs)
+
+    async def read_chunked(self, model, ids, fields: List[str] = None, chunk_size: int = None) -> List[dict]:
+        """
+        按 id 分片并发读取，结果保持 ids 中的顺序
+        :param model: 模型名称
+        :param ids: 记录ID列表
+        :param fields: 需要读取的字段
+        :param chunk_size: 每个分片的记录数，默认使用 client.chunk_size
+        """
+        ids = list(ids)
+        chunk_size = chunk_size or self.client.chunk_size
+        options = {"fields": fields} if fields else {}
+        chunks = await asyncio.gather(*[
+            self.read(model, [ids[start:start + chunk_size]], options)
+            for start in range(0, len(ids), chunk_size)
+        ])
+        return [record for chunk in chunks for record in chunk]
+
+
+class AsyncOdooAPI(object):
+    """ 把 OdooAPIBase 子类（ContactClient, SalesOrderClient 等）的方法包装为协程 """
+
+    def __init__(self, api: OdooAPIBase, aclient: AsyncOdooClient):
+        self.api = api
+        self.aclient = aclient
+
+    def __getattr__(self, name):
+        attr = getattr(self.api, name)
+        if not callable(attr):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await self.aclient.run(attr, *args, **kwargs)
+        method.__name__ = name
+        method.__doc__ = attr.__doc__
+        return method
@@ -1,19 +1,71 @@
+from __future__ import annotations
+
+import itertools
 import json
 import os
 import re
-import time
+import sys
+import threading
+import warnings
 import xmlrpc.client
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
 from datetime import datetime
-from typing import List, Union
-import pandas as pd
-from dotenv import load_dotenv
+from typing import Dict, Iterator, List, Union
 from pydantic import BaseModel
 
-from schemas import StockToMove, QuantVO, ProductVO
+from schemas import OdooVO, StockToMove, QuantVO, ProductVO, RelocationResult, BatchResult
+from .transport import ConnectionPool, PooledTransport, JsonRpcProxy, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+from .cache import ResponseCache, CACHEABLE_METHODS, WRITE_METHODS
+from .export import export_dataframe, DEFAULT_EXPORT_FORMAT
+from .metrics import RpcMetrics
+from .governor import RateGovernor
+from .transport import PROTOCOL_XMLRPC, PROTOCOL_JSONRPC, PROTOCOLS
+from .lazy import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
 
 DATETIME_PATTERN = '%Y-%m-%d %H:%M:%S'
 DATE_PATTERN = '%Y-%m-%d'
+# 分片读取时每次请求的默认记录数
+DEFAULT_CHUNK_SIZE = 1000
+# 并发读取的默认线程数
+DEFAULT_MAX_WORKERS = 4
+# 批量 create/write 时每批的默认记录数
+DEFAULT_BATCH_SIZE = 200
+# 价格比较的容差，差值不超过该值视为未变化
+PRICE_TOLERANCE = 0.005
+# 产品名称中的内部参考号: "[REF] 产品名称"
+_INTERNAL_REF_RE = re.compile(r'\[(.*?)\]')
+# 会返回记录内容、应当指定 fields 的方法
+_RECORD_READ_METHODS = frozenset(['read', 'search_read'])
+# rest 包所在目录，用于确定警告的 stacklevel
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class FullRecordReadWarning(UserWarning):
+    """ read/search_read 没有指定 fields，服务器会返回全部字段 """
+
+
+def _external_stacklevel() -> int:
+    """
+    warnings.warn 的 stacklevel：指向调用栈中第一个不在 rest 包内的帧，
+    无论经过 OdooClient.read、iter_read 还是 OdooAPIBase 子类，警告都落在调用方的代码上
+    """
+    # 1 为调用本函数的 execute_kw
+    frame, level = sys._getframe(1), 1
+    while frame is not None and os.path.dirname(os.path.abspath(frame.f_code.co_filename)) == _PACKAGE_DIR:
+        frame, level = frame.f_back, level + 1
+    return level
+
+
+def _requests_fields(args) -> bool:
+    """ execute_kw 的参数中是否指定了 fields（位置参数 [ids/domain, fields] 或选项 {'fields': ...}） """
+    positional = args[0] if args else []
+    options = args[1] if len(args) > 1 else {}
+    return bool(len(positional) > 1 and positional[1]) or bool(options.get('fields'))
 
 
 def now():
@@ -29,52 +81,142 @@ class OdooAPIKey(BaseModel):
     username: str
     password: str
     host: str
+    # RPC 协议: xmlrpc 或 jsonrpc
+    protocol: str = PROTOCOL_XMLRPC
+    # 请求体超过该字节数时 gzip 压缩发送，需要服务器或反向代理支持解压；为 None 时不压缩
+    compress_threshold: Union[int, None] = None
 
     @classmethod
     def test(cls):
-        load_dotenv()
-        index = int(os.getenv("ODOO_ACCESS_KEY_INDEX"))
-        key_path = os.getenv("ODOO_ACCESS_KEY")
-        with open(f"conf/{key_path}", "r") as f:
-            conf = json.load(f)['keys'][index]
-            key = cls(**conf)
-        return key
+        index, keys = _load_keys()
+        return cls(**keys[index])
 
     @classmethod
     def prod(cls):
-        load_dotenv()
+        index, keys = _load_keys()
+        return cls(**keys[1])
+
+
+_dotenv_loaded = False
+# 已解析的密钥文件: {路径: (修改时间, keys)}
+_key_files: Dict[str, tuple] = {}
+_key_files_lock = threading.Lock()
+
+
+def _load_keys():
+    """
+    读取 .env 指定的密钥文件，.env 只加载一次，密钥文件在修改之前只解析一次
+    :return: (ODOO_ACCESS_KEY_INDEX, 密钥列表)
+    """
+    global _dotenv_loaded
+    with _key_files_lock:
+        if not _dotenv_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _dotenv_loaded = True
         index = int(os.getenv("ODOO_ACCESS_KEY_INDEX"))
-        key_path = os.getenv("ODOO_ACCESS_KEY")
-        with open(f"conf/{key_path}", "r") as f:
-            conf = json.load(f)['keys'][1]
-            key = cls(**conf)
-        return key
+        path = f"conf/{os.getenv('ODOO_ACCESS_KEY')}"
+        mtime = os.path.getmtime(path)
+        cached = _key_files.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, "r") as f:
+                cached = _key_files[path] = (mtime, json.load(f)['keys'])
+        return index, cached[1]
 
-class OdooClient(object):
 
-    def __init__(self, api_key: OdooAPIKey):
+class OdooClient(object):
+    """
+    Odoo RPC 客户端，支持 XML-RPC 与 JSON-RPC 两种协议（由 protocol 或 api_key.protocol 指定）。
+    所有请求共用一个 keep-alive 连接池，登录后的同一个实例可以被多个线程同时使用。
+    所有 execute_kw 经过同一个 RateGovernor：自适应并发上限、限速和失败重试。
+    """
+
+    def __init__(self, api_key: OdooAPIKey, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT,
+                 protocol: str = None, cache: ResponseCache = None, metrics: RpcMetrics = None,
+                 governor: RateGovernor = None, compress_threshold: int = None):
         self.api_key = api_key
         self.db = api_key.db
         self.username = api_key.username
         self.password = api_key.password
         self.host = api_key.host
+        self.protocol = protocol or api_key.protocol
+        if self.protocol not in PROTOCOLS:
+            raise ValueError(f"Unsupported protocol '{self.protocol}', expected one of {PROTOCOLS}")
+        self.chunk_size = chunk_size
+        # 可选的响应缓存，为 None 时不缓存
+        self.cache = cache
+        # 可选的调用统计，为 None 时不记录
+        self.metrics = metrics
+        # 并发、限速和重试，默认并发上限不超过连接池大小
+        self.governor = governor or RateGovernor(max_concurrency=pool_size)
         self.uid = None
+        # fields_get 结果缓存: {model: {field: meta}}
+        self._fields_meta = {}
+        # 响应总是协商 gzip/deflate；请求体压缩默认取 api_key.compress_threshold
+        if compress_threshold is None:
+            compress_threshold = api_key.compress_threshold
+        self.pool = ConnectionPool(self.host, pool_size=pool_size, timeout=timeout,
+                                   compress_threshold=compress_threshold)
+        self.common = self._server_proxy('common')
         self.models = None
+        self._login_lock = threading.Lock()
+
+    def _server_proxy(self, service):
+        if self.protocol == PROTOCOL_JSONRPC:
+            return JsonRpcProxy(self.pool, service)
+        return xmlrpc.client.ServerProxy('{}/xmlrpc/2/{}'.format(self.host, service),
+                                         transport=PooledTransport(self.pool), allow_none=True)
 
     def login(self):
         print("Odoo API Login")
-        self.common = xmlrpc.client.ServerProxy('{}/xmlrpc/2/common'.format(self.host), allow_none=True)
         self.uid = self.common.authenticate(self.db, self.username, self.password, {})
-        self.models = xmlrpc.client.ServerProxy('{}/xmlrpc/2/object'.format(self.host), allow_none=True)
+        self.models = self._server_proxy('object')
+        return self
+
+    def ensure_login(self):
+        """ 尚未登录时登录；多个线程同时调用时只登录一次 """
+        if self.models is None:
+            with self._login_lock:
+                if self.models is None:
+                    self.login()
         return self
 
+    def close(self):
+        """ 关闭连接池中的空闲连接 """
+        self.pool.close()
+
     def version(self):
-        common = xmlrpc.client.ServerProxy('{}/xmlrpc/2/common'.format(self.host))
-        return common.version()
+        return self.common.version()
 
     def execute_kw(self, model, method, *args, **kwargs):
-        return self.models.execute_kw(self.db, self.uid, self.password,
+        if method in _RECORD_READ_METHODS and not _requests_fields(args):
+            warnings.warn(f"{method} on {model} without fields reads every stored and computed field, "
+                          f"pass a fields list (see rest.projection)", FullRecordReadWarning,
+                          stacklevel=_external_stacklevel())
+        if self.cache is None:
+            return self._execute_kw(model, method, *args, **kwargs)
+        if method in CACHEABLE_METHODS:
+            key = self.cache.make_key(self.host, self.db, self.username, model, method, args, kwargs)
+            hit, result = self.cache.get(model, key)
+            if not hit:
+                result = self._execute_kw(model, method, *args, **kwargs)
+                self.cache.set(model, key, result)
+            return result
+        try:
+            return self._execute_kw(model, method, *args, **kwargs)
+        finally:
+            if method in WRITE_METHODS:
+                self.cache.invalidate(model)
+
+    def _execute_kw(self, model, method, *args, **kwargs):
+        if self.models is None:
+            self.ensure_login()
+        if self.metrics is None:
+            return self.governor.call(model, method, self.models.execute_kw, self.db, self.uid, self.password,
                                       model, method, *args, **kwargs)
+        return self.governor.call(model, method, self.metrics.measure, model, method, self.models.execute_kw,
+                                  self.db, self.uid, self.password, model, method, *args, **kwargs)
 
     def search_read(self, model, *args, **kwargs):
         return self.execute_kw(model,'search_read', *args, **kwargs)
@@ -91,19 +233,192 @@ class OdooClient(object):
     def write(self, model, *args, **kwargs):
         return self.execute_kw(model, 'write', *args, **kwargs)
 
+    def read_group(self, model, domain, fields: List[str], groupby: List[str], lazy: bool = False,
+                   orderby: str = None, limit: int = None, offset: int = 0) -> List[dict]:
+        """
+        服务器端分组聚合，每组返回一条记录
+        :param model: 模型名称
+        :param domain: 搜索条件
+        :param fields: 度量，如 ['price_subtotal:sum']
+        :param groupby: 分组键，如 ['salesman_id', 'create_date:month']
+        :param lazy: 为 True 时只按第一个分组键分组（Odoo 默认行为）
+        """
+        options = {"lazy": lazy, "offset": offset}
+        if orderby:
+            options["orderby"] = orderby
+        if limit:
+            options["limit"] = limit
+        return self.execute_kw(model, 'read_group', [domain, fields, groupby], options)
+
+    def fields_get(self, model, refresh=False) -> dict:
+        """
+        获取模型的字段定义（类型、名称、关联模型），每个模型只请求一次
+        :param model: 模型名称
+        :param refresh: 是否忽略缓存重新获取
+        """
+        if refresh or model not in self._fields_meta:
+            self._fields_meta[model] = self.execute_kw(model, 'fields_get', [],
+                                                       {'attributes': ['type', 'string', 'relation']})
+        return self._fields_meta[model]
+
+    def iter_read_chunks(self, model, ids, fields: List[str] = None,
+                         chunk_size: int = None) -> Iterator[List[dict]]:
+        """
+        按 id 分片调用 read，每次 yield 一个分片的记录列表
+        :param model: 模型名称
+        :param ids: 记录ID列表
+        :param fields: 需要读取的字段，为空时读取全部字段
+        :param chunk_size: 每个分片的记录数，默认使用 self.chunk_size
+        """
+        ids = list(ids)
+        chunk_size = chunk_size or self.chunk_size
+        options = {"fields": fields} if fields else {}
+        for start in range(0, len(ids), chunk_size):
+            yield self.read(model, [ids[start:start + chunk_size]], options)
+
+    def iter_read(self, model, ids, fields: List[str] = None, chunk_size: int = None) -> Iterator[dict]:
+        """ 按 id 分片读取，逐条 yield 记录 """
+        for chunk in self.iter_read_chunks(model, ids, fields, chunk_size):
+            yield from chunk
+
+    def iter_read_parallel(self, model, ids, fields: List[str] = None, chunk_size: int = None,
+                           max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[dict]:
+        """
+        多线程并发按 id 分片读取，按 ids 的原始顺序逐条 yield 记录。
+        最多有 max_workers * 2 个分片同时在途，内存占用不随总记录数增长。
+        实际并发还受 self.governor 的并发上限限制，失败的分片由 governor 重试。
+        :param model: 模型名称
+        :param ids: 记录ID列表
+        :param fields: 需要读取的字段，为空时读取全部字段
+        :param chunk_size: 每个分片的记录数，默认使用 self.chunk_size
+        :param max_workers: 线程数
+        """
+        ids = list(ids)
+        chunk_size = chunk_size or self.chunk_size
+        chunks = iter([ids[start:start + chunk_size] for start in range(0, len(ids), chunk_size)])
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque(executor.submit(self._read_chunk, model, chunk, fields)
+                            for chunk in itertools.islice(chunks, max_workers * 2))
+            while pending:
+                records = pending.popleft().result()
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.append(executor.submit(self._read_chunk, model, chunk, fields))
+                yield from records
+
+    def read_parallel(self, model, ids, fields: List[str] = None, chunk_size: int = None,
+                      max_workers: int = DEFAULT_MAX_WORKERS) -> List[dict]:
+        """ 多线程并发读取，返回按 ids 顺序排列的记录列表 """
+        return list(self.iter_read_parallel(model, ids, fields, chunk_size, max_workers))
+
+    def _read_chunk(self, model, ids, fields):
+        """ 读取一个分片，结果按 ids 顺序排列 """
+        options = {"fields": fields} if fields else {}
+        records = self.read(model, [ids], options)
+        by_id = {record['id']: record for record in records}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def iter_search_read_chunks(self, model, domain, fields: List[str] = None,
+                                chunk_size: int = None) -> Iterator[List[dict]]:
+        """
+        分页调用 search_read，每次 yield 一页记录。
+        以 id 为游标分页（id > 上一页最大id），避免 offset 在大表上越翻越慢，
+        也不会因为翻页期间有记录被删除而漏读。
+        :param model: 模型名称
+        :param domain: 搜索条件
+        :param fields: 需要读取的字段，为空时读取全部字段
+        :param chunk_size: 每页的记录数，默认使用 self.chunk_size
+        """
+        chunk_size = chunk_size or self.chunk_size
+        options = {"order": "id", "limit": chunk_size}
+        if fields:
+            options["fields"] = list(fields) if "id" in fields else ["id"] + list(fields)
+        last_id = 0
+        while True:
+            page_domain = [('id', '>', last_id)] + list(domain)
+            chunk = self.search_read(model, [page_domain], options)
+            if chunk:
+                yield chunk
+            if len(chunk) < chunk_size:
+                break
+            last_id = chunk[-1]['id']
+
+    def iter_search_read(self, model, domain, fields: List[str] = None, chunk_size: int = None) -> Iterator[dict]:
+        """ 分页 search_read，逐条 yield 记录 """
+        for chunk in self.iter_search_read_chunks(model, domain, fields, chunk_size):
+            yield from chunk
+
+
+class SessionRegistry(object):
+    """
+    已认证会话的注册表：同一个 (host, db, username, password, protocol) 只创建一个 OdooClient、只登录一次，
+    之后的 OdooAPIBase 子类（以及 OdooWarehouseOperation、OdooPricelistOperation）共用这个客户端、
+    它的 uid 和连接池。OdooClient 本身是线程安全的。
+    响应缓存和调用统计也是键的一部分：传入 cache/metrics 的调用方得到自己的会话，
+    不会让同一个 key 的其他客户端也读写这个缓存。
+    """
+
+    def __init__(self):
+        self._sessions: Dict[tuple, OdooClient] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(api_key: OdooAPIKey, protocol: str = None, cache: ResponseCache = None,
+            metrics: RpcMetrics = None) -> tuple:
+        # cache 和 metrics 按对象本身区分
+        return (api_key.host, api_key.db, api_key.username, api_key.password, protocol or api_key.protocol,
+                cache, metrics)
+
+    def get(self, api_key: OdooAPIKey, login: bool = True, protocol: str = None,
+            cache: ResponseCache = None, metrics: RpcMetrics = None, governor: RateGovernor = None) -> OdooClient:
+        """
+        :param login: 为 False 时不立即登录，第一次调用 execute_kw 时再登录
+        :param cache: 会话的响应缓存，不同的 cache 使用不同的会话
+        :param metrics: 会话的调用统计，同 cache
+        :param governor: 只在创建会话时使用，已有会话沿用原来的 governor
+        """
+        key = self.key(api_key, protocol, cache, metrics)
+        with self._lock:
+            client = self._sessions.get(key)
+            if client is None:
+                client = self._sessions[key] = OdooClient(api_key, protocol=protocol, cache=cache, metrics=metrics,
+                                                          governor=governor)
+        if login:
+            client.ensure_login()
+        return client
+
+    def close(self):
+        """ 关闭并移除全部会话，之后的 get 会重新登录 """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for client in sessions:
+            client.close()
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+# 默认的全局会话注册表
+SESSIONS = SessionRegistry()
+
 
 class OdooAPIBase(object):
 
     def __init__(self, api_key: OdooAPIKey, login=True, *args, **kwargs):
+        """
+        :param api_key: OdooAPIKey 对象，同一个 key 的所有实例共用 SESSIONS 中的同一个会话
+        :param login: 为 False 时延迟到第一次调用时再登录
+        """
         self.api_key = api_key
-        self.client = OdooClient(self.api_key)
-        if login:
-            self.client.login()
+        self.client = SESSIONS.get(api_key, login=login, cache=kwargs.get('cache'), metrics=kwargs.get('metrics'),
+                                   governor=kwargs.get('governor'))
 
     @classmethod
     def from_client(cls, client: OdooClient):
-        """ 从已登录的 OdooClient 创建 OdooAPIBase """
-        api = cls(client.api_key, login=False)
+        """ 从已有的 OdooClient 创建 OdooAPIBase，不经过 SESSIONS """
+        api = cls.__new__(cls)
+        api.api_key = client.api_key
         api.client = client
         return api
 
@@ -120,7 +435,7 @@ class OdooAPIBase(object):
         return self.client.version()
 
     def fetch_write_date(self, model, ids, *args, **kwargs):
-        return self.client.read(model, [ids], {'fields': ['id', 'write_date']})
+        return list(self.client.iter_read(model, ids, ['id', 'write_date']))
 
 
 """ 
@@ -161,7 +476,7 @@ class ProductClient(OdooAPIBase):
         :param product_ids: 产品ID列表
         :return: 产品详情列表
         """
-        details = self.client.read(self._model_product, [product_ids], {"fields": self._fields_product})
+        details = list(self.client.iter_read(self._model_product, product_ids, self._fields_product))
         return details
 
     def fetch_pricelist_details(self):
@@ -173,8 +488,7 @@ class ProductClient(OdooAPIBase):
         domain = [
             ('active', '=', True)
         ]
-        details = self.client.search_read(self._model_pricelist, [domain], 
-                                          {"fields": self._fields_pricelist})  
+        details = list(self.client.iter_search_read(self._model_pricelist, domain, self._fields_pricelist))
         return details
 
     def fetch_pricelist_item_ids(self, pricelist_id):
@@ -195,8 +509,8 @@ class ProductClient(OdooAPIBase):
         :param pricelist_item_ids: 产品价格列表的item_ids
         :return: 产品价格列表的item_ids
         """
-        details = self.client.read(self._model_pricelist_item, [pricelist_item_ids], 
-                                   {"fields": self._fields_pricelist_item})
+        details = list(self.client.iter_read(self._model_pricelist_item, pricelist_item_ids,
+                                             self._fields_pricelist_item))
         return details
 
 
@@ -228,7 +542,7 @@ class ProductTemplateClient(OdooAPIBase):
         :param product_ids: 产品模版ID列表
         :return: 产品模版详情列表
         """
-        details = self.client.read(self._model, [product_ids], {"fields": self._fields})
+        details = list(self.client.iter_read(self._model, product_ids, self._fields))
         return details
 
 
@@ -263,13 +577,14 @@ class ContactClient(OdooAPIBase):
 
     def fetch_contact_details(self, contact_ids):
         print("Fetching contact details...")
-        contact_details = self.client.read(self._model, contact_ids, {"fields": self._fields})
+        contact_details = list(self.client.iter_read(self._model, contact_ids, self._fields))
         return contact_details
 
 
 
 class SalesOrderClient(OdooAPIBase):
     _model = "sale.order"
+    _model_line = "sale.order.line"
     _fields = ['id', 'name', 'date_order', 'partner_id', "state", 'amount_total',
                'partner_invoice_id', 'partner_shipping_id',  'order_line']
     def __init__(self, api_key: OdooAPIKey, *args, **kwargs):
@@ -282,23 +597,39 @@ class SalesOrderClient(OdooAPIBase):
 
     def fetch_order_details(self, sale_order_ids):
         print("Fetching sale order details...")
-        order_details = self.client.read(self._model,
-                                         [sale_order_ids], {"fields": self._fields})
+        order_details = list(self.client.iter_read(self._model, sale_order_ids, self._fields))
         return order_details
 
     def fetch_order_line_details(self, order_line_ids):
         print("Fetching sale order line details...")
         _fields2 = ["id", "product_id", "price_unit", "product_uom_qty", "product_uom"]
-        order_line_details = self.client.read("sale.order.line",
-                                              [order_line_ids],
-                                              {"fields": _fields2})
+        order_line_details = list(self.client.iter_read("sale.order.line", order_line_ids, _fields2))
         return order_line_details
 
     def fetch_order_write_date(self, sale_order_ids):
         print("Fetching sale order write date...")
-        order_write_date = self.client.read(self._model, [sale_order_ids], {"fields": ["id", "write_date"]})
+        order_write_date = list(self.client.iter_read(self._model, sale_order_ids, ["id", "write_date"]))
         return order_write_date
 
+    def aggregate_order_lines(self, groupby: List[str],
+                              measures: List[str] = ('price_subtotal:sum', 'product_uom_qty:sum', '__count'),
+                              domain: list = None, orderby: str = None, limit: int = None) -> pd.DataFrame:
+        """
+        在服务器端按 groupby 汇总销售订单行，每组一行，例如：
+            按销售员: aggregate_order_lines(['salesman_id'])
+            按产品: aggregate_order_lines(['product_template_id'])
+            客户每月销售额: aggregate_order_lines(['order_partner_id', 'create_date:month'])
+            订单数: aggregate_order_lines(['salesman_id'], ['order_id:count_distinct'])
+        :param groupby: 分组键，日期字段可带粒度 :day/:week/:month/:quarter/:year
+        :param measures: 度量 <field>:<agg>，'__count' 为订单行数
+        :param domain: 订单行的搜索条件
+        :return: 分组键列 + 度量列的 DataFrame，详见 rest.aggregate.read_group_frame
+        """
+        # rest.aggregate 依赖本模块，在此处导入以避免循环导入
+        from .aggregate import read_group_frame
+        print(f"Aggregating sale order lines by {groupby}...")
+        return read_group_frame(self.client, self._model_line, groupby, measures, domain, orderby, limit)
+
     def create_order(self, quot_data):
         print("Creating sale order...")
         order_id = self.client.create(self._model, quot_data)
@@ -348,8 +679,8 @@ class OdooWarehouseClient(OdooAPIBase):
 
     def fetch_putaway_rules_details(self, putaway_rules_ids):
         print("Fetching putaway rules details...")
-        putaway_rules_details = self.client.read(self._model_putaway, [putaway_rules_ids],
-                                                 {"fields": self._putaway_fields})
+        putaway_rules_details = list(self.client.iter_read(self._model_putaway, putaway_rules_ids,
+                                                           self._putaway_fields))
         return putaway_rules_details
 
     def fetch_location_ids(self):
@@ -367,8 +698,8 @@ class OdooWarehouseClient(OdooAPIBase):
 
     def fetch_location_details(self, location_ids):
         print("Fetching location details...")
-        location_details = self.client.read(self._model_location, [location_ids],
-                                             {"fields": self._location_fields})
+        location_details = list(self.client.iter_read(self._model_location, location_ids,
+                                                      self._location_fields))
         return location_details
 
     def fetch_quant_ids(self):
@@ -380,7 +711,7 @@ class OdooWarehouseClient(OdooAPIBase):
 
     def fetch_quant_details(self, quant_ids):
         print("Fetching quant details...")
-        quant_details = self.client.read(self._model_quant, [quant_ids], {"fields": self._quant_fields})
+        quant_details = list(self.client.iter_read(self._model_quant, quant_ids, self._quant_fields))
         return quant_details
     
     def fetch_quant_details_by_product_location(self, product_id, location_id):
@@ -389,123 +720,157 @@ class OdooWarehouseClient(OdooAPIBase):
             ('product_id', '=', product_id),
             ('location_id', '=', location_id)
         ]
-        quant_ids = self.client.search_read(self._model_quant, [domain], {"fields": self._quant_fields})
+        quant_ids = list(self.client.iter_search_read(self._model_quant, domain, self._quant_fields))
         return quant_ids
 
-    def fetch_quant_details_by_products_locations(self, product_ids, location_ids):
-        print("Fetching quant details by products and locations...")
-        if not product_ids or not location_ids or len(product_ids) != len(location_ids):
-            raise ValueError("Array product_ids and location_ids must be non-empty and have the same length!")
-        domain = []
-        for i in range(len(product_ids)):            
-            sub_condition = ['&', ('product_id', '=', product_ids[i]), ('location_id', '=', location_ids[i])]            
-            if domain:
-                domain = ['|'] + domain + sub_condition
-            else:
-                domain = sub_condition
-        quant_ids = self.client.search_read(self._model_quant, [domain], {"fields": self._quant_fields})
-        return quant_ids
-    
-
     def relocate_quant(self, quant_id, location_id):
         print(f"Relocating quant {quant_id} to location {location_id}...")
         self.client.write(self._model_quant, [[quant_id], {'location_id': location_id}])
 
+    def relocate_quants(self, quant_ids, location_id):
+        """
+        把多个库存量移动到同一个库位，每个分片一次 write
+        :param quant_ids: 库存量ID列表
+        :param location_id: 目标库位ID
+        """
+        print(f"Relocating {len(quant_ids)} quants to location {location_id}...")
+        chunk_size = self.client.chunk_size
+        for start in range(0, len(quant_ids), chunk_size):
+            self.client.write(self._model_quant, [quant_ids[start:start + chunk_size], {'location_id': location_id}])
+
 
-def save_dataframe_to_temp(df, file_name):
-    if not os.path.exists("temp"):
-        os.makedirs("temp")
-    fname = f"temp/{file_name}.xlsx"
-    df.to_excel(fname, index=False)
-    print(f"Saved to {fname}")
-    return fname
+def save_dataframe_to_temp(df, file_name, fmt=DEFAULT_EXPORT_FORMAT, background=False):
+    """
+    保存 DataFrame 到 temp/<file_name>.<fmt>
+    :param fmt: csv（默认）、parquet 或 xlsx
+    :param background: 是否在后台线程中写入，不阻塞当前操作
+    :return: 文件路径
+    """
+    return export_dataframe(df, file_name, fmt=fmt, background=background)
 
 class OdooWarehouseOperation:
+    # 上架规则索引，在多次 find_quants_match_putaway_rules 之间保留
+    _putaway_index = None
 
-    def __init__(self, api_key: OdooAPIKey, *args, **kwargs):
-        self.wh_client = OdooWarehouseClient(api_key, login=True)
+    def __init__(self, api_key: OdooAPIKey, cache: ResponseCache = None, *args, **kwargs):
+        """
+        :param api_key: OdooAPIKey 对象
+        :param cache: 可选的响应缓存，用于上架规则等参考数据
+        """
+        self.wh_client = OdooWarehouseClient(api_key, login=True, cache=cache)
         self.product_client = ProductClient.from_client(self.wh_client.client)
 
+    @classmethod
+    def from_client(cls, client: OdooClient) -> 'OdooWarehouseOperation':
+        """ 基于已登录的 OdooClient 创建，不再单独登录 """
+        operation = cls.__new__(cls)
+        operation.wh_client = OdooWarehouseClient.from_client(client)
+        operation.product_client = ProductClient.from_client(client)
+        return operation
+
+    def putaway_index(self):
+        """ 上架规则索引，首次调用时创建，之后每次调用只增量刷新 """
+        from .putaway import PutawayIndex
+        if self._putaway_index is None:
+            self._putaway_index = PutawayIndex(self.wh_client.client)
+        self._putaway_index.refresh()
+        return self._putaway_index
+
     def find_quants_match_putaway_rules(self) -> List[StockToMove]:
         """
-        寻找存在上架规则，却没有上架的产品的库存记录
-        """
-        putaway_rules_ids = self.wh_client.fetch_putaway_rules_ids()
-        print(f"Found {len(putaway_rules_ids)} putaway rules")
-        rules = self.wh_client.fetch_putaway_rules_details(putaway_rules_ids)
-        dict_rules = {}
-        for rule in rules:
-            key = f"{rule['product_id'][0]}_{rule['location_in_id'][0]}"
-            dict_rules[key] = rule
-
-        stock_to_move: List[StockToMove] = []
-        product_ids = [rule['product_id'][0] for rule in rules]
-        location_in_ids = [rule['location_in_id'][0] for rule in rules]
-        location_out_ids = [rule['location_out_id'][0] for rule in rules]
-        quants = self.wh_client.fetch_quant_details_by_products_locations(product_ids, location_in_ids)
-        # quants2 = self.wh_client.fetch_quant_details_by_products_locations(product_ids, location_out_ids)
-        for quant in quants:
-            quant_id = quant['id']
-            quant_quantity = quant['quantity']
-            rule = dict_rules.get(f"{quant['product_id'][0]}_{quant['location_id'][0]}")
-            stock_to_move.append(StockToMove(
-                product_id=rule['product_id'][0],
-                product_name=rule['product_id'][1],
-                location_in_id=rule['location_in_id'][0],
-                location_in_name=rule['location_in_id'][1],
-                location_out_id=rule['location_out_id'][0],
-                location_out_name=rule['location_out_id'][1],
-                quant_id=quant_id,
-                quant_quantity=quant_quantity
-            ))
-
-        print(f"++ Matched {len(stock_to_move)} stocks to move")
-        stock_to_move = [move for move in stock_to_move if int(move.quant_quantity) != 0]
-        print(f"-- Filtered out {len(stock_to_move)} with 0 quantities...")
-        if stock_to_move is not None and len(stock_to_move) == 0:
+        寻找存在上架规则，却没有上架的产品的库存记录。
+        规则对 location_in_id 的下级库位同样生效（最近的上级库位的规则优先），
+        已经在 location_out_id 及其下级库位中的库存量不需要移动。
+        """
+        index = self.putaway_index()
+        print(f"Found {len(index)} putaway rules")
+        # 服务器返回的数据是可信的：先组装行数据，DataFrame 直接由行生成，最后跳过校验构造对象
+        rows = index.violations()
+        print(f"++ Matched {len(rows)} stocks to move")
+        if len(rows) == 0:
             print("No quants to move!")
             return []
 
-        df = pd.DataFrame.from_dict([move.model_dump() for move in stock_to_move])
+        stock_to_move = StockToMove.construct_many(rows)
+        df = StockToMove.to_frame(rows)
         print(f"Found {len(stock_to_move)} stock to move")
         df_dropped = copy(df[['product_name', 'location_in_name', 'location_out_name', 'quant_quantity']])
         df_dropped['location_out_name'] = df_dropped['location_out_name'].map(lambda x: x.split('/')[-1])
         df_dropped['product_name'] = df_dropped['product_name'].map(lambda x: x.split(' ')[0])
         print(df_dropped)
-        fname = save_dataframe_to_temp(df, "stock_to_move")
+        fname = save_dataframe_to_temp(df, "stock_to_move", background=True)
         return stock_to_move
 
     
-    def relocate_quants_to_putaway_location(self, quants_to_move: List[StockToMove]):
+    def relocate_quants_to_putaway_location(self, quants_to_move: List[StockToMove],
+                                            max_workers: int = DEFAULT_MAX_WORKERS,
+                                            debug: bool = False) -> List[RelocationResult]:
+        """
+        按目标库位分组批量移动库存量：每个目标库位按 chunk_size 分批，每批一次 write，多个批次并发执行。
+        每批单独记录结果，某一批失败时，同一库位中其他已写入的批次仍记为成功。
+        :param quants_to_move: 需要移动的库存量
+        :param max_workers: 同时写入的批次数
+        :param debug: 为 True 时只分组并打印，不实际写入，结果记为跳过（success 为 None）
+        :return: 每个批次（一次 write）的移库结果
+        """
+        groups: Dict[int, List[StockToMove]] = {}
         for quant in quants_to_move:
-            self.wh_client.relocate_quant(quant.quant_id, quant.location_out_id)
-            print(f"Relocated {quant}")
-            time.sleep(1)
+            groups.setdefault(quant.location_out_id, []).append(quant)
+        chunk_size = self.wh_client.client.chunk_size
+        batches = [moves[start:start + chunk_size]
+                   for moves in groups.values() for start in range(0, len(moves), chunk_size)]
+
+        def relocate(moves: List[StockToMove]) -> RelocationResult:
+            quant_ids = [move.quant_id for move in moves]
+            result = RelocationResult(location_out_id=moves[0].location_out_id,
+                                      location_out_name=moves[0].location_out_name,
+                                      quant_ids=quant_ids, success=None if debug else True)
+            if debug:
+                return result
+            try:
+                self.wh_client.relocate_quants(quant_ids, moves[0].location_out_id)
+            except Exception as e:
+                result.success = False
+                result.error = str(e)
+            return result
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(relocate, batches))
+        for result in results:
+            print(f"Relocated {result}")
+        failed = [result for result in results if result.success is False]
+        skipped = [result for result in results if result.skipped]
+        print(f"Relocated {len(quants_to_move)} quants to {len(groups)} locations in {len(results)} batches, "
+              f"{len(failed)} batches failed, {len(skipped)} skipped (debug)")
+        for result in failed:
+            print(f"\tNot moved to {result.location_out_name}: {result.quant_ids}")
+        return results
     
 
     def list_quants_to_show(self) -> List[QuantVO]:
         quant_ids = self.wh_client.fetch_quant_ids()
-        quants = self.wh_client.fetch_quant_details(quant_ids)        
-        quant_to_show: List[QuantVO] = []
-        for item in quants:
-            quant_to_show.append(QuantVO(
-                product_id=item['product_id'][0],
-                product_name=item['product_id'][1],
-                location_id=item['location_id'][0],
-                location_name=item['location_id'][1],
-                product_uom=item['product_uom_id'][1],
-                warehouse_name=item['warehouse_id'][1],
-                quantity=item['quantity'],
-                available_quantity=item['available_quantity']
-            ))
-        quants_to_show = sorted(quant_to_show, key=lambda x: x.product_name)
-        df = pd.DataFrame.from_dict([quant.model_dump() for quant in quants_to_show])
+        quants = self.wh_client.fetch_quant_details(quant_ids)
+        rows = [{
+            'product_id': item['product_id'][0],
+            'product_name': item['product_id'][1],
+            'location_id': item['location_id'][0],
+            'location_name': item['location_id'][1],
+            'product_uom': item['product_uom_id'][1],
+            'warehouse_name': item['warehouse_id'][1],
+            'quantity': item['quantity'],
+            'available_quantity': item['available_quantity'],
+        } for item in quants]
+        rows.sort(key=lambda row: row['product_name'])
+        quants_to_show = QuantVO.construct_many(rows)
+        # 库位、仓库和单位名称在各行中大量重复，存为 category 列
+        df = QuantVO.to_frame(rows).astype({'location_name': 'category', 'warehouse_name': 'category',
+                                            'product_uom': 'category'})
         print(f"Found {len(quants_to_show)} quants to show")
         df_dropped = copy(df[['product_name', 'location_name', 'warehouse_name', 'quantity', 'available_quantity']]) 
         df_dropped['location_name'] = df_dropped['location_name'].map(lambda x: x.split('/')[-1])
         df_dropped['product_name'] = df_dropped['product_name'].map(lambda x: x.split(' ')[0])
         print(df_dropped)
-        fname = save_dataframe_to_temp(df, "quants_to_show")
+        fname = save_dataframe_to_temp(df, "quants_to_show", background=True)
         return quants_to_show
     
 
@@ -515,31 +880,28 @@ class OdooWarehouseOperation:
         product_ids = self.product_client.fetch_product_ids()
         products = self.product_client.fetch_product_details(product_ids)
         print(f"Found {len(products)} products...")
-        product_vo_list: List[ProductVO] = []
-        for product in products:
-            product_vo = ProductVO(
-                id=product['id'],
-                name=product['name'],
-                list_price=product['list_price'],
-                default_code= "" if product['default_code'] == False else product['default_code'],
-                barcode= "" if product['barcode'] == False else product['barcode'],
-                standard_price=product['standard_price'],
-                write_date=product['write_date'],
-                active=product['active'],
-                qty_available=product['qty_available']
-            )
-            product_vo_list.append(product_vo)
-        product_vo_list = list(filter(lambda x: x.active == True, product_vo_list))
+        rows = [{
+            'id': product['id'],
+            'name': product['name'],
+            'list_price': product['list_price'],
+            'default_code': product['default_code'] or "",
+            'barcode': product['barcode'] or "",
+            'standard_price': product['standard_price'],
+            'write_date': product['write_date'],
+            'active': product['active'],
+            'qty_available': product['qty_available'],
+        } for product in products if product['active']]
+        product_vo_list = ProductVO.construct_many(rows)
         print(f"Found {len(product_vo_list)} active products...")
-        df = pd.DataFrame.from_dict([product.model_dump() for product in product_vo_list])
+        df = ProductVO.to_frame(rows)
         df_droped = copy(df[['name', 'default_code', 'barcode', 'list_price','standard_price', 'qty_available']])
         df_droped['name'] = df_droped['name'].map(lambda x: x.split(' ')[0])
         print(df_droped)
-        fname = save_dataframe_to_temp(df, "products_to_show")
+        fname = save_dataframe_to_temp(df, "products_to_show", background=True)
         return product_vo_list
 
 
-class PricelistItem(BaseModel):
+class PricelistItem(OdooVO):
     id: int
     pricelist_id: int
     pricelist_name: str
@@ -559,14 +921,34 @@ class PricelistItem(BaseModel):
 # 核心类及方法定义 #
 # --------------- #
 class OdooPricelistOperation:
-    def __init__(self, api_key: 'OdooAPIKey', debug: bool = False):
+    _model_pricelist_item = 'product.pricelist.item'
+
+    def __init__(self, api_key: 'OdooAPIKey', debug: bool = False, cache: ResponseCache = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
         """
         :param api_key: OdooAPIKey 对象，用于认证和连接 Odoo
         :param debug: 是否处于调试模式。若为 True 则不会实际执行写入/创建操作
+        :param cache: 可选的响应缓存，用于价格表、产品模版等参考数据
+        :param batch_size: 每次批量 create/write 的最大记录数
         """
-        self.product_templ_client = ProductTemplateClient(api_key, login=True)
+        self.product_templ_client = ProductTemplateClient(api_key, login=True, cache=cache)
         self.client = self.product_templ_client.client
         self.debug = debug
+        self.batch_size = batch_size
+        # 最近一次同步中每个批次的执行结果
+        self.batch_results: List[BatchResult] = []
+
+    @classmethod
+    def from_client(cls, client: OdooClient, debug: bool = False,
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> 'OdooPricelistOperation':
+        """ 基于已登录的 OdooClient 创建，不再单独登录 """
+        operation = cls.__new__(cls)
+        operation.product_templ_client = ProductTemplateClient.from_client(client)
+        operation.client = client
+        operation.debug = debug
+        operation.batch_size = batch_size
+        operation.batch_results = []
+        return operation
 
     # ----------------------- #
     #  主入口：更新价格表条目  #
@@ -604,8 +986,8 @@ class OdooPricelistOperation:
 
         # 5. 对比 VIP 与 Odoo 数据，并输出对比结果
         df_compare = self._compare_vip_and_odoo_pricelist(df_vip_prices, pricelist_items, vip_pricelist_names_in_odoo)
-        df_compare.to_excel('temp/vip_odoo_pricelist_items.xlsx', index=False)
-        print(f"文件已经保存到 temp/vip_odoo_pricelist_items.xlsx")
+        fname = save_dataframe_to_temp(df_compare, "vip_odoo_pricelist_items", fmt='xlsx')
+        print(f"文件已经保存到 {fname}")
         input("请检查文件内容，确认无误后按任意键继续...")
 
         # 6. 更新 & 创建 Pricelist item
@@ -615,10 +997,18 @@ class OdooPricelistOperation:
             print("操作已取消，退出...")
             return []
 
+        self.batch_results = []
         products_not_found = []
         products_not_found += self._update_pricelist_items(df_compare)
         products_not_found += self._create_pricelist_items(df_compare, product_templates_map, pricelist_details)
 
+        failed_batches = [result for result in self.batch_results if result.success is False]
+        skipped_batches = [result for result in self.batch_results if result.skipped]
+        succeeded = len(self.batch_results) - len(failed_batches) - len(skipped_batches)
+        print(f"Total number of batches: {len(self.batch_results)}, succeeded: {succeeded}, "
+              f"failed: {len(failed_batches)}, skipped (debug): {len(skipped_batches)}")
+        for result in failed_batches:
+            print(f"\t{result}")
         print(f"Total number of products not found: {len(products_not_found)}")
         print(products_not_found)
         return products_not_found
@@ -646,9 +1036,10 @@ class OdooPricelistOperation:
         df['std_price_a'] = df['std_price_a'] / df['min_quantity']
         df['std_price_b'] = df['std_price_b'] / df['min_quantity']
 
-        # 构造 key 方便后续 merge
+        # 构造 key 方便后续 merge：同一参考号的不同包装是不同的价格阶梯，key 中包含最小数量
         df.drop(columns=['article_number'], inplace=True)
-        df['key'] = df['group_name'] + '_' + df['internal_reference'].astype(str)
+        df['key'] = (df['group_name'] + '_' + df['internal_reference'].astype(str)
+                     + '_' + df['min_quantity'].astype(str))
 
         # 排序 & 重置索引
         df.sort_values(by='group_name', inplace=True)
@@ -662,8 +1053,8 @@ class OdooPricelistOperation:
         """从Odoo 'product.pricelist' 获取指定名称的价格表详细信息。"""
         domain = [('name', 'in', [name.strip() for name in vip_pricelist_names])]
         pricelist_ids = self.client.search('product.pricelist', [domain], {})
-        pricelist_details = self.client.read('product.pricelist', [pricelist_ids],
-                                            {'fields': ['id', 'name', 'active']})
+        pricelist_details = list(self.client.iter_read('product.pricelist', pricelist_ids,
+                                                       ['id', 'name', 'active']))
         print(f"[Odoo] Found {len(pricelist_details)} matching pricelists in Odoo.")
         return pricelist_details
 
@@ -679,48 +1070,47 @@ class OdooPricelistOperation:
         domain = [('name', 'in', pricelist_names_in_odoo)]
         fields = ["id", "company_id", "pricelist_id", "fixed_price", "name", "currency_id",
                   "min_quantity", "product_tmpl_id", "product_id"]
-        pricelist_item_data = self.client.search_read('product.pricelist.item', [domain], {"fields": fields})
+        pricelist_item_data = list(self.client.iter_search_read('product.pricelist.item', domain, fields))
         print(f"[Odoo] Found {len(pricelist_item_data)} pricelist items in Odoo.")
 
-        pricelist_items: List[PricelistItem] = []
+        rows = []
         for item in pricelist_item_data:
             # 从 product_tmpl_id 名称中提取 [default_code]
             product_tmpl_label = item['product_tmpl_id'][1] if item['product_tmpl_id'] else ''
-            match = re.search(r'\[(.*?)\]', product_tmpl_label)
-            default_code = match.group(1) if match else ""
-
-            # 组装 PricelistItem 对象
-            pricelist_items.append(PricelistItem(
-                id=item['id'],
-                pricelist_id=item['pricelist_id'][0],
-                pricelist_name=item['pricelist_id'][1].replace('(EUR)', '').strip(),
-                company_id=item['company_id'][0],
-                company_name=item['company_id'][1],
-                fixed_price=item['fixed_price'],
-                name=item['name'],
-                currency=item['currency_id'][1],
-                min_quantity=item['min_quantity'],
-                product_tmpl_id=item['product_tmpl_id'][0] if item['product_tmpl_id'] else 0,
-                product_tmpl_name=product_tmpl_label,
-                default_code=default_code,
-                product_id=item['product_id'][0] if item['product_id'] else None,
-                product_name=item['product_id'][1] if item['product_id'] else None
-            ))
-        return pricelist_items
+            match = _INTERNAL_REF_RE.search(product_tmpl_label)
+            rows.append({
+                'id': item['id'],
+                'pricelist_id': item['pricelist_id'][0],
+                'pricelist_name': item['pricelist_id'][1].replace('(EUR)', '').strip(),
+                'company_id': item['company_id'][0],
+                'company_name': item['company_id'][1],
+                'fixed_price': item['fixed_price'],
+                'name': item['name'],
+                'currency': item['currency_id'][1],
+                # min_quantity 在 Odoo 中是 float，跳过校验时需要自己转换
+                'min_quantity': int(item['min_quantity']),
+                'product_tmpl_id': item['product_tmpl_id'][0] if item['product_tmpl_id'] else 0,
+                'product_tmpl_name': product_tmpl_label,
+                'default_code': match.group(1) if match else "",
+                'product_id': item['product_id'][0] if item['product_id'] else None,
+                'product_name': item['product_id'][1] if item['product_id'] else None,
+            })
+        # 服务器返回的数据是可信的，跳过逐条校验
+        return PricelistItem.construct_many(rows)
 
     def _get_odoo_product_templates(self) -> dict:
         """
         从 Odoo 读取所有激活的 product.template，并返回 {default_code: product_template_dict} 映射。
         """
         domain = [('active', '=', True)]
-        product_templates = self.client.search_read('product.template', [domain],
-                                                    {'fields': ['id', 'name', 'default_code']})
+        product_templates = list(self.client.iter_search_read('product.template', domain,
+                                                              ['id', 'name', 'default_code']))
         print(f"[Odoo] Found {len(product_templates)} active product templates.")
         return {pt['default_code']: pt for pt in product_templates if pt['default_code']}
 
-    # -------------------------------------------------- #
-    #    私有方法: 对比VIP与Odoo数据，标记 create/update    #
-    # -------------------------------------------------- #
+    # ------------------------------------------------------------------ #
+    #  私有方法: 对比VIP与Odoo数据，标记 create/update/unchanged/stale       #
+    # ------------------------------------------------------------------ #
     def _compare_vip_and_odoo_pricelist(
         self,
         df_vip_prices: pd.DataFrame,
@@ -728,29 +1118,53 @@ class OdooPricelistOperation:
         pricelist_names_in_odoo: List[str],
     ) -> pd.DataFrame:
         """
-        将 VIP 的价格表信息与 Odoo 中的 pricelist item 合并对比，
-        标记出需要 create 的行和需要 update 的行。
-        :return: 结果 DataFrame，含 'action' 列（create/update）
+        将 VIP 的价格表信息与 Odoo 中的 pricelist item 按 (价格表, 内部参考号, 最小数量) 做全外连接对比。
+        同一参考号的 PK 包装（如 PK10）在 VIP 中是不同最小数量的价格阶梯，必须按最小数量分别对应，
+        否则各阶梯会交叉匹配、互相覆盖。每行标记一个 action：
+        - create: VIP 中有，Odoo 中没有（包括新的最小数量阶梯）
+        - update: 两边都有，但价格误差超过 PRICE_TOLERANCE
+        - unchanged: 两边都有且价格一致，不需要任何 RPC
+        - stale: Odoo 中有，但 VIP 中已不存在（只报告，不删除）
+        :return: 结果 DataFrame，含 'action' 列
         """
-        # 先把 Odoo item 转成 DF
-        df_odoo_pricelist_items = pd.DataFrame.from_records(
-            [item.model_dump() for item in pricelist_items]
-        )
+        # 先把 Odoo item 转成 DF；两边的 key 都带上最小数量。
+        # 没有 item 时各列为空的 object 列，统一转成 str，否则不能与 str 列拼接
+        df_odoo_pricelist_items = PricelistItem.to_frame(pricelist_items)
         df_odoo_pricelist_items['key'] = (
-            df_odoo_pricelist_items['pricelist_name']
+            df_odoo_pricelist_items['pricelist_name'].astype(str)
             + '_'
-            + df_odoo_pricelist_items['default_code']
+            + df_odoo_pricelist_items['default_code'].astype(str)
+            + '_'
+            + df_odoo_pricelist_items['min_quantity'].astype(str)
         )
+        df_vip_prices = df_vip_prices.assign(
+            key=df_vip_prices['group_name'] + '_' + df_vip_prices['internal_reference'].astype(str)
+            + '_' + df_vip_prices['min_quantity'].astype(int).astype(str))
 
-        # 内连接: key
-        df_merged = df_vip_prices.merge(df_odoo_pricelist_items, on='key', how='left', suffixes=('_vip','_odoo'))
+        # 全外连接: key
+        df_merged = df_vip_prices.merge(df_odoo_pricelist_items, on='key', how='outer',
+                                        suffixes=('_vip', '_odoo'), indicator=True)
+        # 只在 Odoo 中存在的行没有 group_name，用 Odoo 的价格表名称补上
+        df_merged['group_name'] = df_merged['group_name'].fillna(df_merged['pricelist_name'])
 
         # 只保留那些在 Odoo 中确实存在的 pricelist
         df_filtered = df_merged[df_merged['group_name'].isin(pricelist_names_in_odoo)].copy()
 
-        # 标记 action: 如果 pricelist_id（来自 Odoo）为空 => create，否则 update
-        df_filtered['action'] = df_filtered['pricelist_id'].isna().map({True: 'create', False: 'update'})
+        price_equal = (df_filtered['custom_price'] - df_filtered['fixed_price']).abs() <= PRICE_TOLERANCE
+        df_filtered['action'] = np.select(
+            [
+                df_filtered['_merge'] == 'left_only',
+                df_filtered['_merge'] == 'right_only',
+                price_equal,
+            ],
+            ['create', 'stale', 'unchanged'],
+            default='update',
+        )
+        df_filtered.drop(columns=['_merge'], inplace=True)
 
+        summary = df_filtered['action'].value_counts()
+        print("[Compare] " + ", ".join(f"{action}: {summary.get(action, 0)}"
+                                       for action in ['create', 'update', 'unchanged', 'stale']))
         return df_filtered
 
     # -------------------------------------------------- #
@@ -759,27 +1173,33 @@ class OdooPricelistOperation:
     def _update_pricelist_items(self, df_compare: pd.DataFrame) -> List[str]:
         """
         对于已存在的 pricelist item，更新其 fixed_price, min_quantity 等。
+        更新值完全相同的条目合并为一次多 id 的 write，并按 batch_size 分批。
         :return: 未找到产品列表（此处一般不会新增此列表，仅占位）
         """
         df_update = df_compare[df_compare['action'] == 'update'].copy()
         print(f"[Update] Number of pricelist items to update: {len(df_update)}")
 
-        for i, row in enumerate(df_update.itertuples(), start=1):
+        # 更新值 -> pricelist item id 列表
+        groups: Dict[tuple, List[int]] = {}
+        for row in df_update.itertuples():
             pricelist_item_id = int(row.id) if pd.notna(row.id) else None
             if not pricelist_item_id:
                 continue  # 无效行（一般不会发生）
-
             update_vals = {
-                'fixed_price': row.custom_price,
-                'min_quantity': row.min_quantity_vip,
+                'fixed_price': float(row.custom_price),
+                'min_quantity': int(row.min_quantity_vip),
                 'compute_price': 'fixed',
             }
-            print(f"{i}. Updating pricelist item ID={pricelist_item_id} in {row.group_name}")
-            print(f"    => {update_vals}")
-
-            if not self.debug:
-                self.client.write('product.pricelist.item', [[pricelist_item_id], update_vals])
-                time.sleep(0.2)
+            groups.setdefault(tuple(sorted(update_vals.items())), []).append(pricelist_item_id)
+        print(f"[Update] Grouped into {len(groups)} distinct value sets")
+
+        for i, (vals_key, item_ids) in enumerate(groups.items(), start=1):
+            update_vals = dict(vals_key)
+            for start in range(0, len(item_ids), self.batch_size):
+                batch_ids = item_ids[start:start + self.batch_size]
+                print(f"{i}. Updating {len(batch_ids)} pricelist items => {update_vals}")
+                self._run_batch('write', len(batch_ids), batch_ids,
+                                lambda: self.client.write(self._model_pricelist_item, [batch_ids, update_vals]))
         return []  # 该步骤不产生products_not_found
 
     # -------------------------------------------------- #
@@ -792,7 +1212,7 @@ class OdooPricelistOperation:
         pricelist_details: List[dict]
     ) -> List[str]:
         """
-        对于在Odoo中尚不存在的 pricelist item 行，执行创建操作。
+        对于在Odoo中尚不存在的 pricelist item 行，按 batch_size 分批执行批量创建。
         :param df_compare: 包含了 action='create' 的行
         :param product_templates_map: {default_code: {id, name, default_code}}
         :param pricelist_details: Odoo pricelist信息，供 name->id 的映射
@@ -804,6 +1224,7 @@ class OdooPricelistOperation:
         # 建立 pricelist name -> pricelist_id 映射
         name_to_pricelist_obj = {detail['name']: detail for detail in pricelist_details}
         not_found_products = []
+        new_items_vals = []
 
         for i, row in enumerate(df_create.itertuples(), start=1):
             ref_code = row.internal_reference
@@ -823,16 +1244,34 @@ class OdooPricelistOperation:
             new_item_vals = {
                 'pricelist_id': pricelist_obj['id'],
                 'product_tmpl_id': product_tmpl_obj['id'],
-                'fixed_price': row.custom_price,
-                'min_quantity': row.min_quantity_vip,
+                'fixed_price': float(row.custom_price),
+                'min_quantity': int(row.min_quantity_vip),
                 'compute_price': 'fixed',
             }
 
             print(f"{i}. Creating item in Pricelist: {group_name} for product [{ref_code}]")
             print(f"    => {new_item_vals}")
+            new_items_vals.append(new_item_vals)
 
-            if not self.debug:
-                self.client.create('product.pricelist.item', [new_item_vals])
-                time.sleep(0.2)
+        for start in range(0, len(new_items_vals), self.batch_size):
+            batch_vals = new_items_vals[start:start + self.batch_size]
+            self._run_batch('create', len(batch_vals), [],
+                            lambda: self.client.create(self._model_pricelist_item, [batch_vals]))
 
-        return not_found_products
\ No newline at end of file
+        return not_found_products
+
+    def _run_batch(self, action: str, size: int, ids: List[int], call) -> BatchResult:
+        """ 执行一个批次，记录并打印结果；debug 模式下不执行，结果记为跳过（success 为 None） """
+        result = BatchResult(action=action, model=self._model_pricelist_item, size=size, ids=ids,
+                             success=None if self.debug else True)
+        if not self.debug:
+            try:
+                returned = call()
+                if action == 'create':
+                    result.ids = returned
+            except Exception as e:
+                result.success = False
+                result.error = str(e)
+        print(f"    [Batch] {result}")
+        self.batch_results.append(result)
+        return result
@@ -0,0 +1,138 @@
+"""
+RPC 响应缓存
+
+按 (model, method, 参数) 缓存只读调用（read, search, search_read 等）的结果：
+- 缓存按模型显式开启：只有 ttls 中列出的模型才缓存，其他模型的 TTL 默认为 0（不缓存）。
+  库存量、库位、订单等业务数据随时会被其他用户修改，缓存旧数据可能导致错误的移库等写操作，
+  只应为价格表、产品模版这类很少变化的参考数据设置 TTL
+- 键中包含 host、db 和用户名，同一个磁盘缓存文件不会混用测试库和生产库的数据，
+  共用缓存的不同用户也不会读到按对方访问权限返回的结果
+- 内存中按 LRU 淘汰，总大小不超过 max_bytes
+- 可选 SQLite 磁盘存储，跨进程/跨会话复用
+- 通过同一个客户端对某模型 write/create/unlink 时，自动清除该模型的缓存
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+# 只读、可缓存的方法
+CACHEABLE_METHODS = frozenset(['read', 'search', 'search_read', 'search_count', 'fields_get',
+                               'read_group', 'name_get', 'name_search'])
+# 会修改数据、需要清除缓存的方法
+WRITE_METHODS = frozenset(['write', 'create', 'unlink'])
+
+# 未在 ttls 中列出的模型的有效期（秒），0 为不缓存
+DEFAULT_TTL = 0
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ResponseCache(object):
+    """ 线程安全的 TTL + LRU 响应缓存 """
+
+    def __init__(self, default_ttl: float = DEFAULT_TTL, ttls: Dict[str, float] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES, path: str = None):
+        """
+        :param default_ttl: 未在 ttls 中列出的模型的有效期（秒），默认 0 即不缓存
+        :param ttls: 按模型设置的有效期，如 {'product.pricelist': 3600, 'product.template': 600}
+        :param max_bytes: 内存中缓存的最大字节数（按序列化后的大小计算）
+        :param path: 磁盘缓存文件路径，为空时只用内存
+        """
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()  # key -> (model, expires_at, payload)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._disk = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            with self._disk:
+                self._disk.execute("CREATE TABLE IF NOT EXISTS cache ("
+                                   "key TEXT PRIMARY KEY, model TEXT NOT NULL, expires_at REAL NOT NULL, "
+                                   "payload BLOB NOT NULL)")
+
+    def ttl(self, model) -> float:
+        return self.ttls.get(model, self.default_ttl)
+
+    @staticmethod
+    def make_key(host, db, username, model, method, args, kwargs) -> str:
+        return json.dumps([host, db, username, model, method, args, kwargs], sort_keys=True, default=str)
+
+    def get(self, model, key) -> Tuple[bool, object]:
+        """ :return: (是否命中, 缓存的值) """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                self._pop(key)
+                entry = None
+            if entry is None and self._disk is not None:
+                row = self._disk.execute("SELECT expires_at, payload FROM cache WHERE key = ?", (key,)).fetchone()
+                if row and row[0] > now:
+                    entry = (model, row[0], row[1])
+                    # 磁盘文件可能由 max_bytes 更大的缓存写入，超过本实例上限的只返回、不放入内存
+                    if len(row[1]) <= self.max_bytes:
+                        self._put(key, entry)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            payload = entry[2]
+        # 每次命中都反序列化出一份新对象，调用方修改结果不会污染缓存
+        return True, pickle.loads(payload)
+
+    def set(self, model, key, value):
+        ttl = self.ttl(model)
+        if ttl <= 0:
+            return
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        entry = (model, time.time() + ttl, payload)
+        with self._lock:
+            self._put(key, entry)
+            if self._disk is not None:
+                with self._disk:
+                    self._disk.execute("INSERT OR REPLACE INTO cache (key, model, expires_at, payload) "
+                                       "VALUES (?, ?, ?, ?)", (key, model, entry[1], payload))
+
+    def invalidate(self, model=None):
+        """ 清除某个模型（为空时为全部模型）的缓存 """
+        with self._lock:
+            keys = [k for k, entry in self._entries.items() if model is None or entry[0] == model]
+            for key in keys:
+                self._pop(key)
+            if self._disk is not None:
+                with self._disk:
+                    if model is None:
+                        self._disk.execute("DELETE FROM cache")
+                    else:
+                        self._disk.execute("DELETE FROM cache WHERE model = ?", (model,))
+
+    def _put(self, key, entry):
+        if key in self._entries:
+            self._pop(key)
+        self._entries[key] = entry
+        self._size += len(entry[2])
+        while self._size > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+
+    def _pop(self, key):
+        entry = self._entries.pop(key)
+        self._size -= len(entry[2])
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
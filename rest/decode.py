@@ -0,0 +1,151 @@
+"""
+read()/search_read() 结果的列式解码
+
+按字段类型（来自 fields_get）整列地转换记录列表，而不是每条记录构造一个 dict：
+- many2one [id, name] 拆成两列: <field>（Int64）和 <field>_name
+- char/selection 等字段中表示空值的 False 转为 None
+- date/datetime 字段解析为 datetime64
+
+每条记录都带着重复的 many2one 显示名称（币种、销售员、单位……），XML/JSON 解析后每行都是一个新的字符串对象。
+解码器按关联模型把名称登记到共享的 {id: 名称} 表中，同一个 id 的所有行引用同一个字符串对象。
+categorical 中列出的低基数字段（状态、币种、单位、产品类型、销售员等）输出为 pandas 的 category 列，
+每行只占一个整数编码，groupby 也直接按编码分组。
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+from .base import OdooClient, DATETIME_PATTERN, DATE_PATTERN, DEFAULT_CHUNK_SIZE
+from .lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# 内部参考号在产品名称中的格式: "[REF] 产品名称"
+INTERNAL_REF_PATTERN = r'\[(.*?)\]'
+
+_TEXT_TYPES = ('char', 'text', 'html', 'selection', 'reference')
+_NUMERIC_TYPES = ('integer', 'float', 'monetary')
+
+
+def extract_internal_ref(names: pd.Series) -> pd.Series:
+    """ 从 "[REF] 名称" 中提取 REF，未匹配时为空字符串 """
+    return names.str.extract(INTERNAL_REF_PATTERN, expand=False).fillna("")
+
+
+class RecordDecoder(object):
+    """ 把某个模型的记录列表解码为类型化的 DataFrame """
+
+    def __init__(self, field_types: Dict[str, str], relations: Dict[str, str] = None,
+                 categorical: Sequence[str] = ()):
+        """
+        :param field_types: {字段名: Odoo 字段类型}
+        :param relations: {many2one 字段名: 关联模型}，关联同一模型的字段共用一张名称表
+        :param categorical: 输出为 category 列的字段；many2one 字段指其 <field>_name 列
+        """
+        self.field_types = field_types
+        self.relations = relations or {}
+        self.categorical = frozenset(categorical)
+        # 按关联模型登记的 many2one 显示名称: {关联模型: {id: 名称}}
+        self.names: Dict[str, Dict[int, str]] = {}
+
+    @classmethod
+    def for_model(cls, client: OdooClient, model: str, categorical: Sequence[str] = ()) -> 'RecordDecoder':
+        """ 使用 client 缓存的 fields_get 结果创建解码器 """
+        fields_meta = client.fields_get(model)
+        return cls({name: meta['type'] for name, meta in fields_meta.items()},
+                   {name: meta['relation'] for name, meta in fields_meta.items() if meta.get('relation')},
+                   categorical)
+
+    def _many2one(self, field, values: list):
+        """ 拆分 [id, name]，名称经名称表去重 """
+        names = self.names.setdefault(self.relations.get(field, field), {})
+        ids = []
+        labels = []
+        for value in values:
+            if value:
+                ids.append(value[0])
+                labels.append(names.setdefault(value[0], value[1]))
+            else:
+                ids.append(None)
+                labels.append(None)
+        return ids, labels
+
+    def decode(self, records: List[dict], fields: List[str] = None) -> pd.DataFrame:
+        """
+        :param records: read()/search_read() 返回的记录
+        :param fields: 需要解码的字段，默认为第一条记录中的全部字段
+        """
+        if fields is None:
+            fields = list(records[0]) if records else []
+        columns = {}
+        for field in fields:
+            values = [record.get(field, False) for record in records]
+            field_type = self.field_types.get(field)
+            if field_type == 'many2one':
+                ids, labels = self._many2one(field, values)
+                columns[field] = pd.array(ids, dtype='Int64')
+                # 用 object 类型的 Series：pandas 3 装有 pyarrow 时会把 object 数组推断为 str 列，
+                # 复制出新的字符串，名称表去重的对象共享就失效了
+                columns[f'{field}_name'] = (pd.Categorical(labels) if field in self.categorical
+                                            else pd.Series(labels, dtype=object))
+            elif field_type == 'datetime':
+                columns[field] = pd.to_datetime(pd.Series([value or None for value in values], dtype=object),
+                                                format=DATETIME_PATTERN)
+            elif field_type == 'date':
+                columns[field] = pd.to_datetime(pd.Series([value or None for value in values], dtype=object),
+                                                format=DATE_PATTERN)
+            elif field_type in _TEXT_TYPES:
+                values = [None if value is False else value for value in values]
+                columns[field] = (pd.Categorical(values) if field in self.categorical
+                                  else pd.Series(values, dtype=object))
+            elif field_type in _NUMERIC_TYPES:
+                columns[field] = values
+            elif field_type == 'boolean':
+                columns[field] = pd.array(values, dtype=bool)
+            else:
+                # one2many/many2many 等保留为 id 列表
+                columns[field] = pd.Series(values, dtype=object)
+        return pd.DataFrame(columns)
+
+    def iter_frames(self, records: Iterable[dict], fields: List[str] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """ 逐块解码一个记录迭代器，每块 yield 一个 DataFrame """
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield self.decode(chunk, fields)
+                chunk = []
+        if chunk:
+            yield self.decode(chunk, fields)
+
+    def decode_iter(self, records: Iterable[dict], fields: List[str] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+        """ 逐块解码一个记录迭代器并拼接，内存中同时只保留一块原始记录 """
+        frames = list(self.iter_frames(records, fields, chunk_size))
+        if not frames:
+            return self.decode([], fields)
+        return concat_frames(frames) if len(frames) > 1 else frames[0]
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    按列拼接列相同的多个 DataFrame。
+    各块的 category 列类别不同，pd.concat 会把它们退化为 object 列，这里用 union_categoricals 合并类别。
+    """
+    columns = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[column] = pd.api.types.union_categoricals(parts, ignore_order=True)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def drop_unused_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """ 去掉筛选后不再出现的类别，避免 groupby(observed=False) 输出空的分组 """
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].cat.remove_unused_categories()
+    return df
@@ -0,0 +1,191 @@
+"""
+DataFrame 导出
+
+支持分块追加写入的导出器：
+- csv: 流式追加，无额外依赖（默认）
+- parquet: 按块写入 row group 并压缩，需要安装 pyarrow
+- xlsx: 仅在明确指定时使用；openpyxl 单线程且最多约 100 万行，只能在关闭时一次写入
+
+可选在后台线程中写入，调用方 append 之后即可继续处理下一块数据。
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+
+from .lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+EXPORT_FORMATS = ('csv', 'parquet', 'xlsx')
+DEFAULT_EXPORT_FORMAT = 'csv'
+DEFAULT_EXPORT_DIR = 'temp'
+# Excel 单个工作表的最大行数（含表头）
+XLSX_MAX_ROWS = 1048576
+
+
+class _CsvWriter(object):
+    def __init__(self, path, **options):
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._header = True
+
+    def write(self, df: pd.DataFrame):
+        df.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter(object):
+    def __init__(self, path, compression='snappy', **options):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._pq = pq
+        self._path = path
+        self._compression = compression
+        self._writer = None
+
+    def write(self, df: pd.DataFrame):
+        table = self._pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema, compression=self._compression)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _XlsxWriter(object):
+    def __init__(self, path, **options):
+        self._path = path
+        self._frames = []
+        self._rows = 0
+
+    def write(self, df: pd.DataFrame):
+        self._rows += len(df)
+        if self._rows >= XLSX_MAX_ROWS:
+            raise ValueError(f"xlsx supports at most {XLSX_MAX_ROWS - 1} rows, use csv or parquet instead")
+        self._frames.append(df)
+
+    def close(self):
+        df = pd.concat(self._frames, ignore_index=True) if self._frames else pd.DataFrame()
+        df.to_excel(self._path, index=False)
+
+
+_WRITERS = {
+    'csv': _CsvWriter,
+    'parquet': _ParquetWriter,
+    'xlsx': _XlsxWriter,
+}
+
+
+class DataFrameExporter(object):
+    """
+    分块导出 DataFrame:
+        with DataFrameExporter("temp/lines.parquet") as exporter:
+            for df_chunk in chunks:
+                exporter.append(df_chunk)
+    """
+
+    def __init__(self, path: str, fmt: str = None, background: bool = False, max_pending: int = 8,
+                 compression: str = 'snappy'):
+        """
+        :param path: 输出文件路径
+        :param fmt: 导出格式 csv/parquet/xlsx，为空时根据文件扩展名判断
+        :param background: 是否在后台线程中写入
+        :param max_pending: 后台模式下等待写入的最大块数，超过时 append 会阻塞
+        :param compression: parquet 压缩算法
+        """
+        fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{fmt}', expected one of {EXPORT_FORMATS}")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._writer = _WRITERS[fmt](path, compression=compression)
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=max_pending)
+            self._thread = threading.Thread(target=self._run, name=f"export-{os.path.basename(path)}")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            df = self._queue.get()
+            if df is None:
+                break
+            if self._error is None:
+                try:
+                    self._writer.write(df)
+                except Exception as e:
+                    self._error = e
+        self._finish()
+
+    def _finish(self):
+        try:
+            self._writer.close()
+        except Exception as e:
+            self._error = self._error or e
+        if self._error is None:
+            print(f"Saved {self.rows} rows to {self.path}")
+        elif self._thread is not None:
+            # 后台写入时调用方可能已经返回（close(wait=False)），错误只能在这里报告
+            print(f"[Export] Failed to save {self.rows} rows to {self.path}: {self._error!r}")
+
+    def append(self, df: pd.DataFrame):
+        """ 追加一块数据 """
+        if self._error is not None:
+            raise self._error
+        self.rows += len(df)
+        if self._queue is not None:
+            self._queue.put(df)
+        else:
+            self._writer.write(df)
+
+    def close(self, wait: bool = True) -> str:
+        """
+        结束写入
+        :param wait: 后台模式下是否等待写入完成；为 False 时立即返回，由后台线程完成剩余写入，
+                     写入失败时只打印错误
+        :return: 输出文件路径
+        """
+        if self._queue is None:
+            self._finish()
+        else:
+            self._queue.put(None)
+            if wait:
+                self._thread.join()
+        if wait and self._error is not None:
+            raise self._error
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def export_dataframe(df: pd.DataFrame, file_name: str, fmt: str = DEFAULT_EXPORT_FORMAT,
+                     directory: str = DEFAULT_EXPORT_DIR, background: bool = False) -> str:
+    """
+    导出一个 DataFrame 到 directory/file_name.<fmt>
+    :param background: 为 True 时在后台线程中写入并立即返回
+    :return: 输出文件路径
+    """
+    exporter = DataFrameExporter(os.path.join(directory, f"{file_name}.{fmt}"), fmt, background=background)
+    exporter.append(df)
+    return exporter.close(wait=not background)
@@ -0,0 +1,181 @@
+"""
+自适应限流与重试
+
+OdooClient 的每次 execute_kw 都经过 RateGovernor:
+- 并发上限按 AIMD 调整：调用成功且耗时正常时上限缓慢增加（每轮约 +1），
+  出现可重试的错误或耗时明显变慢时减半，每轮最多减半一次
+- 可重试的错误（超时、连接被拒绝或断开、502/503/504）按指数退避加随机抖动重试，
+  响应带 Retry-After 时至少等待该时间
+- 可选的每秒请求数上限 max_rps
+批量任务因此可以直接使用较多的线程，由 governor 收敛到服务器能承受的速度，代码中不需要再 sleep:
+    client = OdooClient(key, governor=RateGovernor(max_concurrency=8, max_rps=20))
+
+create 等非幂等方法只在连接被拒绝（请求没有到达服务器）时重试，避免重复创建记录。
+Odoo 的业务错误 Fault 既不重试，也不影响并发上限。
+"""
+import random
+import threading
+import time
+import xmlrpc.client
+from typing import Dict, Tuple
+
+from .transport import DEFAULT_POOL_SIZE, RETRYABLE_ERRORS
+
+# 失败后的重试次数，首次重试前的基准等待时间（秒，之后按指数增长）及最长等待时间
+DEFAULT_RETRIES = 3
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+# 耗时超过同一 (模型, 方法) 平滑耗时的倍数时视为服务器变慢
+SLOW_FACTOR = 3.0
+# 耗时低于该值（秒）的调用不做变慢判断，避免极短调用的抖动触发降速
+SLOW_FLOOR = 0.5
+# 平滑耗时（EWMA）的权重
+LATENCY_ALPHA = 0.2
+# 降速时并发上限乘以的系数
+DECREASE_FACTOR = 0.5
+# 表示网关或服务器暂时不可用、可以重试的 HTTP 状态码
+TRANSIENT_HTTP_STATUSES = frozenset([502, 503, 504])
+# 重复执行会产生重复数据的方法
+NON_IDEMPOTENT_METHODS = frozenset(['create', 'copy', 'message_post'])
+
+
+def _is_transient(error: Exception) -> bool:
+    """ 连接层错误，或 502/503/504 的 ProtocolError """
+    if isinstance(error, xmlrpc.client.ProtocolError):
+        return error.errcode in TRANSIENT_HTTP_STATUSES
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def _retry_after(error: Exception) -> float:
+    """ 响应头中的 Retry-After（秒），没有时为 0 """
+    headers = getattr(error, 'headers', None) or {}
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+class RateGovernor(object):
+    """ 线程安全的自适应并发控制、限速和重试，一个 OdooClient 上的所有线程共用 """
+
+    def __init__(self, max_concurrency: int = DEFAULT_POOL_SIZE, min_concurrency: int = 1,
+                 initial_concurrency: int = None, max_rps: float = None, retries: int = DEFAULT_RETRIES,
+                 retry_delay: float = RETRY_DELAY, max_retry_delay: float = MAX_RETRY_DELAY,
+                 slow_factor: float = SLOW_FACTOR):
+        """
+        :param max_concurrency: 并发上限的最大值，通常等于连接池大小
+        :param min_concurrency: 并发上限的最小值
+        :param initial_concurrency: 初始并发上限，默认为 max_concurrency 的一半
+        :param max_rps: 每秒最多发出的请求数，为 None 时不限制
+        :param retries: 可重试错误的最大重试次数
+        :param retry_delay: 首次重试前的基准等待时间（秒）
+        :param max_retry_delay: 单次重试前的最长等待时间（秒）
+        :param slow_factor: 耗时超过平滑耗时的倍数时降速
+        """
+        if min_concurrency < 1 or max_concurrency < min_concurrency:
+            raise ValueError(f"Invalid concurrency bounds [{min_concurrency}, {max_concurrency}]")
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(initial_concurrency or max(min_concurrency, max_concurrency // 2))
+        self.max_rps = max_rps
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.slow_factor = slow_factor
+        # 重试和降速次数，用于观察服务器的承受能力
+        self.retried = 0
+        self.decreases = 0
+        self._in_flight = 0
+        self._next_slot = 0.0
+        self._last_decrease = 0.0
+        # 每个 (模型, 方法) 的平滑耗时（秒）
+        self._latency: Dict[Tuple[str, str], float] = {}
+        self._cond = threading.Condition()
+
+    def call(self, model, method, func, *args, **kwargs):
+        """ 在并发上限和限速内执行 func(*args, **kwargs)（一次 RPC 调用），可重试的错误按退避重试 """
+        attempt = 0
+        while True:
+            started = self._acquire()
+            try:
+                result = func(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                transient = _is_transient(e)
+                self._release((model, method), started, error=True if transient else None)
+                if not transient or attempt >= self.retries or not self._can_retry(method, e):
+                    raise
+                delay = max(self.backoff(attempt), _retry_after(e))
+                attempt += 1
+                with self._cond:
+                    self.retried += 1
+                print(f"[Governor] {model}.{method} failed ({e!r}), retry {attempt}/{self.retries} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self._release((model, method), started, error=None)
+                raise
+            self._release((model, method), started, error=False)
+            return result
+
+    def backoff(self, attempt: int) -> float:
+        """ 第 attempt 次重试前的等待时间：指数退避上限内的随机值（full jitter） """
+        return random.uniform(0, min(self.max_retry_delay, self.retry_delay * 2 ** attempt))
+
+    @staticmethod
+    def _can_retry(method, error: Exception) -> bool:
+        if method in NON_IDEMPOTENT_METHODS:
+            return isinstance(error, ConnectionRefusedError)
+        return True
+
+    def _acquire(self) -> float:
+        """ 等待并发名额和限速时间片，返回开始时间 """
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+            delay = 0.0
+            if self.max_rps:
+                now = time.monotonic()
+                slot = max(now, self._next_slot)
+                self._next_slot = slot + 1.0 / self.max_rps
+                delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return time.monotonic()
+
+    def _release(self, key, started: float, error):
+        """
+        :param error: True 为暂时性错误（降速），False 为成功（按耗时加速或降速），None 为其他错误（不调整）
+        """
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self._in_flight -= 1
+            if error:
+                self._decrease(started)
+            elif error is not None:
+                smoothed = self._latency.get(key)
+                if smoothed is not None and elapsed > SLOW_FLOOR and elapsed > self.slow_factor * smoothed:
+                    self._decrease(started)
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+                self._latency[key] = elapsed if smoothed is None else smoothed + LATENCY_ALPHA * (elapsed - smoothed)
+            self._cond.notify_all()
+
+    def _decrease(self, started: float):
+        """ 并发上限减半；上次降速之前发出的调用不再重复降速 """
+        if started < self._last_decrease:
+            return
+        self.limit = max(float(self.min_concurrency), self.limit * DECREASE_FACTOR)
+        self._last_decrease = time.monotonic()
+        self.decreases += 1
+
+    @property
+    def concurrency(self) -> int:
+        """ 当前的并发上限 """
+        return int(self.limit)
+
+    def __repr__(self):
+        rps = f", max_rps={self.max_rps}" if self.max_rps else ""
+        return (f"<RateGovernor concurrency={self.concurrency}/{self.max_concurrency}{rps}, "
+                f"retried={self.retried}, decreases={self.decreases}>")
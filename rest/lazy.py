@@ -0,0 +1,34 @@
+"""
+延迟导入
+
+pandas/numpy 的导入耗时占 `import rest` 的大部分，而登录、移库等简短操作并不需要它们。
+用 LazyModule 代替模块级的 import，第一次访问属性时才真正导入：
+    pd = LazyModule('pandas')
+使用 LazyModule 的模块需要 `from __future__ import annotations`，
+否则函数签名中的 pd.DataFrame 注解在定义时就会触发导入。
+"""
+import importlib
+import threading
+
+
+class LazyModule(object):
+    """ 第一次访问属性时才导入的模块代理 """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._module if self._module is not None else self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
@@ -0,0 +1,165 @@
+"""
+RPC 调用统计
+
+在 OdooClient 上启用后，每次实际发出的 execute_kw 都会记录：模型、方法、耗时、
+请求/响应正文字节数（实际传输的大小和压缩前的大小）和返回的记录数，并按 (模型, 方法) 汇总为
+调用次数、p50/p95/p99 耗时和总字节数，用来判断时间花在网络、服务器计算还是本地解码上，
+traffic() 给出压缩节省的字节数:
+    metrics = RpcMetrics(dump_path="temp/rpc_metrics.json")
+    client = OdooClient(key, metrics=metrics)
+    ...
+    metrics.print_summary()
+
+未启用（metrics=None）时，OdooClient 和连接池中只多一次 None 判断。
+命中 ResponseCache 的调用没有发出请求，不会被记录。
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from .transport import start_metering, stop_metering
+
+PERCENTILES = (50, 95, 99)
+
+
+class _CallStats(object):
+    __slots__ = ('durations', 'errors', 'request_bytes', 'response_bytes', 'request_raw_bytes',
+                 'response_raw_bytes', 'records')
+
+    def __init__(self):
+        self.durations: List[float] = []
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.request_raw_bytes = 0
+        self.response_raw_bytes = 0
+        self.records = 0
+
+
+def _percentile(ordered: List[float], percent) -> float:
+    """ 最近秩法百分位，ordered 已排序且非空 """
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class RpcMetrics(object):
+    """ 线程安全的 RPC 调用统计 """
+
+    def __init__(self, dump_path: str = None):
+        """
+        :param dump_path: 不为空时，在进程退出时把统计结果以 JSON 写入该文件
+        """
+        self.dump_path = dump_path
+        self._stats: Dict[Tuple[str, str], _CallStats] = {}
+        self._lock = threading.Lock()
+        if dump_path:
+            atexit.register(self.dump, dump_path)
+
+    def measure(self, model, method, func, *args, **kwargs):
+        """ 执行 func(*args, **kwargs)（一次 RPC 调用）并记录耗时、字节数和记录数 """
+        counter = start_metering()
+        start = time.perf_counter()
+        result = None
+        error = True
+        try:
+            result = func(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            stop_metering()
+            records = len(result) if isinstance(result, list) else 0
+            self.record(model, method, elapsed, counter.sent, counter.received, records, error,
+                        counter.sent_raw, counter.received_raw)
+
+    def record(self, model, method, seconds: float, request_bytes: int = 0, response_bytes: int = 0,
+               records: int = 0, error: bool = False, request_raw_bytes: int = None,
+               response_raw_bytes: int = None):
+        """
+        :param request_raw_bytes: 压缩前的请求体字节数，为 None 时等于 request_bytes
+        :param response_raw_bytes: 解压后的响应体字节数，为 None 时等于 response_bytes
+        """
+        with self._lock:
+            stats = self._stats.get((model, method))
+            if stats is None:
+                stats = self._stats[(model, method)] = _CallStats()
+            stats.durations.append(seconds)
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+            stats.request_raw_bytes += request_bytes if request_raw_bytes is None else request_raw_bytes
+            stats.response_raw_bytes += response_bytes if response_raw_bytes is None else response_raw_bytes
+            stats.records += records
+            stats.errors += error
+
+    def stats(self) -> List[dict]:
+        """
+        :return: 每个 (模型, 方法) 一条汇总，按总耗时从高到低排序；耗时单位为毫秒
+        """
+        with self._lock:
+            items = [(key, sorted(stats.durations), stats.errors, stats.request_bytes, stats.response_bytes,
+                      stats.request_raw_bytes, stats.response_raw_bytes, stats.records)
+                     for key, stats in self._stats.items()]
+        rows = []
+        for (model, method), durations, errors, request_bytes, response_bytes, request_raw_bytes, \
+                response_raw_bytes, records in items:
+            row = {
+                'model': model,
+                'method': method,
+                'calls': len(durations),
+                'errors': errors,
+                'total_ms': round(sum(durations) * 1000, 3),
+            }
+            for percent in PERCENTILES:
+                row[f'p{percent}_ms'] = round(_percentile(durations, percent) * 1000, 3)
+            row['max_ms'] = round(durations[-1] * 1000, 3)
+            row['request_bytes'] = request_bytes
+            row['response_bytes'] = response_bytes
+            row['request_raw_bytes'] = request_raw_bytes
+            row['response_raw_bytes'] = response_raw_bytes
+            row['records'] = records
+            rows.append(row)
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def traffic(self) -> dict:
+        """
+        :return: 全部调用的传输字节数、压缩前字节数、节省的字节数和压缩比（压缩前 / 传输）
+        """
+        rows = self.stats()
+        totals = {key: sum(row[key] for row in rows)
+                  for key in ('request_bytes', 'request_raw_bytes', 'response_bytes', 'response_raw_bytes')}
+        wire = totals['request_bytes'] + totals['response_bytes']
+        raw = totals['request_raw_bytes'] + totals['response_raw_bytes']
+        totals['saved_bytes'] = raw - wire
+        totals['ratio'] = round(raw / wire, 2) if wire else 1.0
+        return totals
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def dump(self, path: str = None) -> str:
+        """ 把统计结果写入 JSON 文件，返回文件路径 """
+        path = path or self.dump_path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'calls': self.stats(),
+                       'traffic': self.traffic()}, f, indent=2)
+        return path
+
+    def print_summary(self):
+        for row in self.stats():
+            print(f"[RPC] {row['model']}.{row['method']}: {row['calls']} calls, {row['errors']} errors, "
+                  f"total {row['total_ms']:.0f} ms, p50 {row['p50_ms']:.0f} / p95 {row['p95_ms']:.0f} / "
+                  f"p99 {row['p99_ms']:.0f} ms, {row['response_bytes'] / 1024:.1f} KiB in, "
+                  f"{row['records']} records")
+        traffic = self.traffic()
+        print(f"[RPC] traffic: {traffic['request_bytes'] / 1024:.1f} KiB out "
+              f"({traffic['request_raw_bytes'] / 1024:.1f} KiB uncompressed), "
+              f"{traffic['response_bytes'] / 1024:.1f} KiB in ({traffic['response_raw_bytes'] / 1024:.1f} KiB decoded), "
+              f"saved {traffic['saved_bytes'] / 1024:.1f} KiB ({traffic['ratio']:.1f}x)")
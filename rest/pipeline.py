@@ -0,0 +1,209 @@
+"""
+多阶段流水线
+
+把前后依赖的提取步骤（如 订单 → 订单行 → 产品）连成流水线：上一阶段一得到一批 id 就交给下一阶段，
+各阶段的网络等待相互重叠，总耗时接近最慢的一个阶段单独运行的时间:
+    pipeline = Pipeline(queue_size=4)
+    pipeline.stage('orders', handle_orders, flush=flush_orders)
+    pipeline.stage('lines', handle_lines, workers=4)
+    pipeline.run(client.iter_search_read_chunks('sale.order', domain, fields))
+
+每个阶段的 func(item, emit) 处理一项输入，调用 emit(x) 把 x 交给下一阶段；
+flush(emit) 在该阶段全部输入处理完后调用一次，用于发出尚未凑满一块的剩余 id。
+阶段之间是有界队列，下游处理不过来时 emit 会阻塞（背压），内存中在途的数据量有上限。
+任一阶段出错时整个流水线停止，run() 重新抛出第一个错误。
+"""
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List
+
+from pydantic import BaseModel
+
+# 阶段之间队列的默认容量（块数）
+DEFAULT_QUEUE_SIZE = 4
+# 阻塞等待队列时检查是否已取消的间隔（秒）
+_POLL_INTERVAL = 0.1
+# 队列中表示上游已结束的标记
+_DONE = object()
+
+
+class PipelineCancelled(Exception):
+    """ 流水线中其他阶段出错，当前阶段停止 """
+
+
+class StageStats(BaseModel):
+    """ 一个阶段的运行统计 """
+    name: str
+    workers: int
+    items: int = 0
+    # 各线程处理输入的耗时之和（秒），不含等待上游和下游的时间
+    busy_seconds: float = 0.0
+
+
+class _Stage(object):
+
+    def __init__(self, name, func: Callable, workers: int, flush: Callable):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.flush = flush
+        self.stats = StageStats(name=name, workers=workers)
+        self.inbox: queue.Queue = None
+
+
+class Pipeline(object):
+    """ 由有界队列连接的多线程阶段 """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        :param queue_size: 每个阶段输入队列的容量
+        """
+        self.queue_size = queue_size
+        self._stages: List[_Stage] = []
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._error: BaseException = None
+
+    def stage(self, name, func: Callable, workers: int = 1, flush: Callable = None) -> 'Pipeline':
+        """
+        添加一个阶段
+        :param name: 阶段名称
+        :param func: func(item, emit)，处理一项输入
+        :param workers: 并发处理的线程数；为 1 时按输入顺序处理
+        :param flush: flush(emit)，全部输入处理完后调用一次
+        """
+        self._stages.append(_Stage(name, func, workers, flush))
+        return self
+
+    def run(self, source: Iterable) -> List[StageStats]:
+        """
+        运行流水线直到 source 耗尽且所有阶段处理完毕
+        :param source: 第一个阶段的输入，在单独的线程中迭代
+        :return: 每个阶段的统计
+        """
+        if not self._stages:
+            raise ValueError("Pipeline has no stages")
+        for stage in self._stages:
+            stage.inbox = queue.Queue(maxsize=self.queue_size)
+        threads = [threading.Thread(target=self._feed, args=(source,), name="pipeline-source", daemon=True)]
+        for index, stage in enumerate(self._stages):
+            remaining = [stage.workers]
+            threads += [threading.Thread(target=self._work, args=(index, remaining),
+                                         name=f"pipeline-{stage.name}-{n}", daemon=True)
+                        for n in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        return [stage.stats for stage in self._stages]
+
+    def _fail(self, error: BaseException):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._cancelled.set()
+
+    def _put(self, inbox: queue.Queue, item):
+        """ 放入下一阶段的队列，队列已满时等待（背压），流水线取消时停止等待 """
+        while True:
+            if self._cancelled.is_set():
+                raise PipelineCancelled()
+            try:
+                inbox.put(item, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, inbox: queue.Queue):
+        while True:
+            if self._cancelled.is_set():
+                raise PipelineCancelled()
+            try:
+                return inbox.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+    def _close(self, index):
+        """ 通知第 index 个阶段上游已结束：每个线程一个结束标记 """
+        if index < len(self._stages):
+            for _ in range(self._stages[index].workers):
+                self._put(self._stages[index].inbox, _DONE)
+
+    def _feed(self, source: Iterable):
+        try:
+            for item in source:
+                self._put(self._stages[0].inbox, item)
+            self._close(0)
+        except PipelineCancelled:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def _work(self, index, remaining: List[int]):
+        stage = self._stages[index]
+        if index + 1 < len(self._stages):
+            inbox = self._stages[index + 1].inbox
+
+            def emit(item):
+                self._put(inbox, item)
+        else:
+            def emit(item):
+                raise TypeError(f"Stage '{stage.name}' is the last stage and cannot emit")
+        try:
+            while True:
+                item = self._get(stage.inbox)
+                if item is _DONE:
+                    break
+                start = time.perf_counter()
+                stage.func(item, emit)
+                with self._lock:
+                    stage.stats.items += 1
+                    stage.stats.busy_seconds += time.perf_counter() - start
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            # 该阶段最后一个结束的线程负责 flush 并通知下游
+            if last:
+                if stage.flush is not None:
+                    stage.flush(emit)
+                self._close(index + 1)
+        except PipelineCancelled:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+
+class IdBatcher(object):
+    """
+    在流水线阶段之间传递 id：去重后累积，凑满 chunk_size 个就作为一块发给下一阶段。
+    可被同一阶段的多个线程同时使用，把 flush 作为该阶段的 flush 发出最后不足一块的 id。
+    """
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self.seen = set()
+        self._pending: List[int] = []
+        self._lock = threading.Lock()
+
+    def add(self, ids: Iterable[int], emit: Callable):
+        with self._lock:
+            for record_id in ids:
+                if record_id not in self.seen:
+                    self.seen.add(record_id)
+                    self._pending.append(record_id)
+            chunks = []
+            while len(self._pending) >= self.chunk_size:
+                chunks.append(self._pending[:self.chunk_size])
+                del self._pending[:self.chunk_size]
+        # 在锁外发出，下游队列已满时只阻塞当前线程
+        for chunk in chunks:
+            emit(chunk)
+
+    def flush(self, emit: Callable):
+        with self._lock:
+            chunk, self._pending = self._pending, []
+        if chunk:
+            emit(chunk)
@@ -0,0 +1,102 @@
+"""
+字段投影注册表
+
+不带 fields 的 read/search_read 会让 Odoo 计算并序列化全部存储字段和计算字段
+（如 sale.order 的 amount_total, invoice_status），在数千条记录上代价很高。
+每个数据提取函数在这里声明自己需要的字段，调用时总是只发送这些字段：
+    PROJECTIONS.register('sale_orders', 'sale.order', ['id', 'name', 'state'])
+    fields = PROJECTIONS.fields('sale_orders', client)
+
+字段第一次使用时与 fields_get 的结果核对一次，服务器上不存在（或已删除）的字段
+会被去掉并给出警告，之后直接使用核对后的字段列表。
+"""
+import threading
+import warnings
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+from .base import OdooClient
+
+
+class Projection(BaseModel):
+    """ 一个数据提取函数需要读取的模型字段 """
+    name: str
+    model: str
+    fields: List[str]
+
+
+class ProjectionRegistry(object):
+    """ 按名称登记的字段投影，字段列表只核对一次 """
+
+    def __init__(self):
+        self._projections: Dict[str, Projection] = {}
+        # 核对后的字段列表: {name: fields}
+        self._validated: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, model, fields: List[str]) -> Projection:
+        """
+        登记（或替换）一个投影
+        :param name: 投影名称，通常对应一个数据提取函数
+        :param model: 模型名称
+        :param fields: 需要读取的字段
+        """
+        if not fields:
+            raise ValueError(f"Projection '{name}' must declare at least one field")
+        projection = Projection(name=name, model=model, fields=list(dict.fromkeys(fields)))
+        with self._lock:
+            self._projections[name] = projection
+            self._validated.pop(name, None)
+        return projection
+
+    def get(self, name) -> Projection:
+        try:
+            return self._projections[name]
+        except KeyError:
+            raise KeyError(f"Projection '{name}' is not registered")
+
+    def fields(self, name, client: OdooClient) -> List[str]:
+        """
+        :return: 已与服务器的 fields_get 核对过的字段列表
+        """
+        validated = self._validated.get(name)
+        if validated is None:
+            projection = self.get(name)
+            known = client.fields_get(projection.model)
+            unknown = [field for field in projection.fields if field not in known]
+            if unknown:
+                warnings.warn(f"Projection '{name}': {projection.model} has no field(s) {unknown}, "
+                              f"they will not be requested")
+            validated = [field for field in projection.fields if field in known]
+            with self._lock:
+                self._validated[name] = validated
+        return validated
+
+    def invalidate(self):
+        """ 清除核对结果，下次使用时重新与 fields_get 核对（如切换到另一台服务器后） """
+        with self._lock:
+            self._validated.clear()
+
+    def validate(self, client: OdooClient) -> Dict[str, List[str]]:
+        """
+        一次性核对全部投影
+        :return: {投影名称: 服务器上不存在的字段}，只包含有未知字段的投影
+        """
+        unknown = {}
+        for name, projection in list(self._projections.items()):
+            fields = self.fields(name, client)
+            missing = [field for field in projection.fields if field not in fields]
+            if missing:
+                unknown[name] = missing
+        return unknown
+
+    def __contains__(self, name):
+        return name in self._projections
+
+    def __iter__(self):
+        return iter(list(self._projections.values()))
+
+
+# 默认的全局注册表
+PROJECTIONS = ProjectionRegistry()
@@ -0,0 +1,241 @@
+"""
+上架规则的内存索引
+
+Odoo 的上架规则（stock.putaway.rule）对 location_in_id 及其全部下级库位都生效：
+入库到 WH/Stock/Shelf 3 的产品同样适用 location_in_id 为 WH/Stock 的规则。
+查找规则时从库存量所在的库位开始逐级向上，第一个有该产品规则的库位胜出（最近的上级优先），
+同一 (产品, 库位) 有多条规则时取 sequence 最小的一条:
+    index = PutawayIndex(client)
+    index.refresh()
+    rows = index.violations()
+
+- 规则按 (product_id, location_in_id) 整数元组建哈希索引
+- stock.location 的上级关系缓存在 LocationTree 中，每个库位的上级链只计算一次
+- refresh() 按 write_date 增量拉取变化的库位、规则和库存量，再用一次只返回 id 的 search 找出
+  已删除（或已归档、已移出范围）的规则和库存量；规则涉及的产品或库位变化、
+  或有库位换了上级库位时，重新全量拉取库存量
+
+按产品类别（category_id）设置的规则不在索引中。
+"""
+from typing import Dict, List, Tuple, Union
+
+from .base import OdooClient
+
+# (product_id, location_in_id)
+RuleKey = Tuple[int, int]
+
+
+def _max_write_date(records: List[dict], current: Union[str, None]) -> Union[str, None]:
+    write_dates = [record['write_date'] for record in records if record.get('write_date')]
+    if not write_dates:
+        return current
+    return max([current] + write_dates) if current else max(write_dates)
+
+
+class LocationTree(object):
+    """ stock.location 的上级关系缓存，用于在本地计算 child_of """
+    _model = "stock.location"
+    _fields = ["id", "complete_name", "location_id", "write_date"]
+
+    def __init__(self, client: OdooClient):
+        self.client = client
+        self.parents: Dict[int, Union[int, None]] = {}
+        self.names: Dict[int, str] = {}
+        self.high_water_mark: Union[str, None] = None
+        # 每个库位从自身到最顶层的库位 id
+        self._ancestors: Dict[int, Tuple[int, ...]] = {}
+
+    def refresh(self) -> Tuple[int, int]:
+        """
+        拉取 write_date 不早于上次的库位（含已归档的库位，其下仍可能有库存量）。
+        >= 边界上的库位每次都会重新拉取，只有上级或名称确实变化的才计入变化。
+        已删除的库位不会再出现在库存量和规则中，留在缓存中也不影响结果。
+        :return: (新增或名称、上级有变化的库位数, 已有库位中上级有变化的库位数)
+        """
+        domain = [('active', 'in', [True, False])]
+        if self.high_water_mark:
+            domain.append(('write_date', '>=', self.high_water_mark))
+        changed = reparented = 0
+        for chunk in self.client.iter_search_read_chunks(self._model, domain, self._fields):
+            for location in chunk:
+                location_id = location['id']
+                parent_id = location['location_id'][0] if location['location_id'] else None
+                known = location_id in self.parents
+                if known and self.parents[location_id] == parent_id \
+                        and self.names[location_id] == location['complete_name']:
+                    continue
+                changed += 1
+                if known and self.parents[location_id] != parent_id:
+                    reparented += 1
+                # 新库位之前可能按未知库位缓存过上级链
+                self._ancestors.pop(location_id, None)
+                self.parents[location_id] = parent_id
+                self.names[location_id] = location['complete_name']
+            self.high_water_mark = _max_write_date(chunk, self.high_water_mark)
+        if reparented:
+            # 下级库位的上级链也随之变化
+            self._ancestors.clear()
+        return changed, reparented
+
+    def ancestors(self, location_id: int) -> Tuple[int, ...]:
+        """ location_id 自身及其全部上级库位，由近到远 """
+        cached = self._ancestors.get(location_id)
+        if cached is not None:
+            return cached
+        chain = []
+        current = location_id
+        # 正常的库位树没有环，seen 只是防止数据异常时死循环
+        seen = set()
+        while current is not None and current not in seen:
+            seen.add(current)
+            chain.append(current)
+            current = self.parents.get(current)
+        result = self._ancestors[location_id] = tuple(chain)
+        return result
+
+    def is_child_of(self, location_id: int, parent_id: int) -> bool:
+        """ location_id 是否为 parent_id 或其下级库位，与 Odoo domain 中的 child_of 相同 """
+        return parent_id in self.ancestors(location_id)
+
+    def __len__(self):
+        return len(self.parents)
+
+
+class PutawayIndex(object):
+    """ 上架规则和相关库存量的内存索引，找出不在上架目标库位中的库存量 """
+    _model_rule = "stock.putaway.rule"
+    _rule_fields = ["id", "product_id", "location_in_id", "location_out_id", "sequence", "write_date"]
+    _model_quant = "stock.quant"
+    _quant_fields = ["id", "product_id", "location_id", "quantity", "write_date"]
+
+    def __init__(self, client: OdooClient, tree: LocationTree = None):
+        """
+        :param client: 已登录的 OdooClient
+        :param tree: 库位树，默认新建；多个索引可共用一个
+        """
+        self.client = client
+        self.tree = tree or LocationTree(client)
+        self.rules: Dict[int, dict] = {}
+        self.quants: Dict[int, dict] = {}
+        self._by_key: Dict[RuleKey, dict] = {}
+        self._rules_hwm: Union[str, None] = None
+        self._quants_hwm: Union[str, None] = None
+        # 上次拉取库存量时规则涉及的产品和 location_in_id
+        self._scope: Tuple[frozenset, frozenset] = (frozenset(), frozenset())
+
+    def refresh(self):
+        """ 增量刷新库位、规则和库存量 """
+        locations, reparented = self.tree.refresh()
+        changed_rules, deleted_rules = self._refresh_rules()
+        scope = (frozenset(product_id for product_id, _ in self._by_key),
+                 frozenset(location_id for _, location_id in self._by_key))
+        if scope != self._scope or reparented:
+            # 规则覆盖的范围变了，或库位移到了别的上级下（其中库存量的 write_date 不变，增量拉取不到），
+            # 原来的库存量缓存不再完整
+            self.quants.clear()
+            self._quants_hwm = None
+            self._scope = scope
+        changed_quants, deleted_quants = self._refresh_quants()
+        print(f"[Putaway] {locations} locations, {changed_rules} rules ({deleted_rules} removed), "
+              f"{changed_quants} quants ({deleted_quants} removed) refreshed; "
+              f"{len(self._by_key)} rules, {len(self.quants)} quants indexed")
+
+    def _refresh_rules(self) -> Tuple[int, int]:
+        domain = [('write_date', '>=', self._rules_hwm)] if self._rules_hwm else []
+        changed = 0
+        for chunk in self.client.iter_search_read_chunks(self._model_rule, domain, self._rule_fields):
+            for rule in chunk:
+                # >= 边界上的规则每次都会重新拉取，内容不变的不计入变化
+                if self.rules.get(rule['id']) != rule:
+                    self.rules[rule['id']] = rule
+                    changed += 1
+            self._rules_hwm = _max_write_date(chunk, self._rules_hwm)
+        deleted = 0
+        if domain:
+            # 首次拉取时缓存为空，无需检查删除；已归档的规则不在默认的搜索结果中，同样移除
+            server_ids = set(self.client.search(self._model_rule, [[]]))
+            stale_ids = [rule_id for rule_id in self.rules if rule_id not in server_ids]
+            for rule_id in stale_ids:
+                del self.rules[rule_id]
+            deleted = len(stale_ids)
+        if changed or deleted:
+            self._build_rule_index()
+        return changed, deleted
+
+    def _build_rule_index(self):
+        """ (product_id, location_in_id) → 规则；同一个键取 sequence 最小、其次 id 最小的规则 """
+        by_key: Dict[RuleKey, dict] = {}
+        for rule in sorted(self.rules.values(), key=lambda r: (r.get('sequence') or 0, r['id']), reverse=True):
+            if not rule['product_id'] or not rule['location_in_id']:
+                continue
+            by_key[(rule['product_id'][0], rule['location_in_id'][0])] = rule
+        self._by_key = by_key
+
+    def _quant_domains(self) -> List[list]:
+        """ 规则涉及的产品在 location_in_id 及其下级库位中的库存量，产品很多时分片查询 """
+        product_ids, location_ids = sorted(self._scope[0]), sorted(self._scope[1])
+        chunk_size = self.client.chunk_size
+        return [[('product_id', 'in', product_ids[start:start + chunk_size]),
+                 ('location_id', 'child_of', location_ids)]
+                for start in range(0, len(product_ids), chunk_size)]
+
+    def _refresh_quants(self) -> Tuple[int, int]:
+        hwm = self._quants_hwm
+        changed = 0
+        for domain in self._quant_domains():
+            if hwm:
+                domain = domain + [('write_date', '>=', hwm)]
+            for chunk in self.client.iter_search_read_chunks(self._model_quant, domain, self._quant_fields):
+                for quant in chunk:
+                    if self.quants.get(quant['id']) != quant:
+                        self.quants[quant['id']] = quant
+                        changed += 1
+                self._quants_hwm = _max_write_date(chunk, self._quants_hwm)
+        deleted = 0
+        if hwm:
+            server_ids = set()
+            for domain in self._quant_domains():
+                server_ids.update(self.client.search(self._model_quant, [domain]))
+            stale_ids = [quant_id for quant_id in self.quants if quant_id not in server_ids]
+            for quant_id in stale_ids:
+                del self.quants[quant_id]
+            deleted = len(stale_ids)
+        return changed, deleted
+
+    def rule_for(self, product_id: int, location_id: int) -> Union[dict, None]:
+        """ 适用于 location_id 中的 product_id 的规则：从 location_id 逐级向上找到的第一条，没有时为 None """
+        for ancestor in self.tree.ancestors(location_id):
+            rule = self._by_key.get((product_id, ancestor))
+            if rule is not None:
+                return rule
+        return None
+
+    def violations(self) -> List[dict]:
+        """
+        数量不为 0、有适用的上架规则、但不在规则的 location_out_id（及其下级库位）中的库存量
+        :return: StockToMove 的行数据，按库存量 id 排序；location_in 为库存量当前所在的库位，
+                 而不是规则的 location_in_id（可能是它的上级库位）
+        """
+        rows = []
+        for quant_id in sorted(self.quants):
+            quant = self.quants[quant_id]
+            if int(quant['quantity']) == 0:
+                continue
+            location_id, location_name = quant['location_id']
+            rule = self.rule_for(quant['product_id'][0], location_id)
+            if rule is None or self.tree.is_child_of(location_id, rule['location_out_id'][0]):
+                continue
+            rows.append({
+                'product_id': rule['product_id'][0],
+                'product_name': rule['product_id'][1],
+                'location_in_id': location_id,
+                'location_in_name': location_name,
+                'location_out_id': rule['location_out_id'][0],
+                'location_out_name': rule['location_out_id'][1],
+                'quant_id': quant_id,
+                'quant_quantity': quant['quantity'],
+            })
+        return rows
+
+    def __len__(self):
+        return len(self._by_key)
@@ -0,0 +1,152 @@
+"""
+基于 write_date 的增量同步
+
+把 Odoo 模型的记录镜像到本地 SQLite 文件中，并为每个模型记录已同步到的最大
+write_date（高水位）。每次同步只拉取 write_date >= 高水位的记录，再用一次只返回
+id 的 search 找出服务器上已删除（或已不满足 domain）的记录并从镜像中删除。
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Union
+
+from pydantic import BaseModel
+
+from .base import OdooClient, now
+
+DEFAULT_MIRROR_PATH = "temp/odoo_mirror.sqlite3"
+# SQLite 单条语句中参数个数的安全上限
+_SQLITE_MAX_VARS = 900
+
+
+class SyncModel(BaseModel):
+    """ 一个需要镜像的模型 """
+    model: str
+    fields: List[str]
+    domain: list = []
+
+
+class SyncResult(BaseModel):
+    model: str
+    changed: int
+    deleted: int
+    total: int
+    high_water_mark: Union[str, None] = None
+
+
+class OdooMirror(object):
+    """ Odoo 记录的本地 SQLite 镜像 """
+
+    def __init__(self, client: OdooClient, models: Iterable[SyncModel], path: str = DEFAULT_MIRROR_PATH):
+        """
+        :param client: 已登录的 OdooClient
+        :param models: 需要镜像的模型
+        :param path: SQLite 文件路径
+        """
+        self.client = client
+        self.models: Dict[str, SyncModel] = {spec.model: spec for spec in models}
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS records ("
+                               "model TEXT NOT NULL, id INTEGER NOT NULL, write_date TEXT, data TEXT NOT NULL, "
+                               "PRIMARY KEY (model, id))")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state ("
+                               "model TEXT PRIMARY KEY, write_date TEXT, synced_at TEXT)")
+
+    def has_model(self, model) -> bool:
+        return model in self.models
+
+    def high_water_mark(self, model) -> Union[str, None]:
+        """ 已同步到的最大 write_date，从未同步过时为 None """
+        row = self._conn.execute("SELECT write_date FROM sync_state WHERE model = ?", (model,)).fetchone()
+        return row[0] if row else None
+
+    def sync(self, models: List[str] = None) -> List[SyncResult]:
+        """
+        增量同步指定模型（默认全部）
+        :return: 每个模型的同步结果
+        """
+        results = []
+        for model in models or list(self.models):
+            result = self.sync_model(model)
+            print(f"[Sync] {result.model}: {result.changed} changed, {result.deleted} deleted, "
+                  f"{result.total} in mirror")
+            results.append(result)
+        return results
+
+    def sync_model(self, model) -> SyncResult:
+        spec = self.models[model]
+        fields = list(dict.fromkeys(['id', 'write_date'] + spec.fields))
+        with self._lock, self._conn:
+            hwm = self.high_water_mark(model)
+            # 用 >= 而不是 >：同一秒内的多次写入不会漏掉，边界上的记录重复写入也无妨
+            domain = list(spec.domain) + ([('write_date', '>=', hwm)] if hwm else [])
+            changed = 0
+            new_hwm = hwm
+            for chunk in self.client.iter_search_read_chunks(model, domain, fields):
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO records (model, id, write_date, data) VALUES (?, ?, ?, ?)",
+                    [(model, r['id'], r['write_date'], json.dumps(r)) for r in chunk])
+                changed += len(chunk)
+                write_dates = [r['write_date'] for r in chunk if r['write_date']]
+                if write_dates:
+                    new_hwm = max([new_hwm] + write_dates) if new_hwm else max(write_dates)
+
+            deleted = 0
+            if hwm:
+                # 首次同步时镜像为空，无需检查删除
+                server_ids = set(self.client.search(model, [list(spec.domain)]))
+                stale_ids = [i for i in self._local_ids(model) if i not in server_ids]
+                for start in range(0, len(stale_ids), _SQLITE_MAX_VARS):
+                    part = stale_ids[start:start + _SQLITE_MAX_VARS]
+                    self._conn.execute(f"DELETE FROM records WHERE model = ? AND id IN ({','.join('?' * len(part))})",
+                                       [model] + part)
+                deleted = len(stale_ids)
+
+            self._conn.execute("INSERT OR REPLACE INTO sync_state (model, write_date, synced_at) VALUES (?, ?, ?)",
+                               (model, new_hwm, now()))
+            total = self._conn.execute("SELECT COUNT(*) FROM records WHERE model = ?", (model,)).fetchone()[0]
+        return SyncResult(model=model, changed=changed, deleted=deleted, total=total, high_water_mark=new_hwm)
+
+    def reset(self, model):
+        """ 清空某个模型的镜像，下次同步时全量拉取 """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM records WHERE model = ?", (model,))
+            self._conn.execute("DELETE FROM sync_state WHERE model = ?", (model,))
+
+    def _local_ids(self, model) -> List[int]:
+        return [row[0] for row in self._conn.execute("SELECT id FROM records WHERE model = ?", (model,))]
+
+    def iter_read(self, model, ids: Iterable[int] = None) -> Iterator[dict]:
+        """
+        从镜像读取记录
+        :param model: 模型名称
+        :param ids: 记录ID列表，结果按 ids 的顺序返回；为空时按 id 顺序返回全部记录
+        """
+        if not self.has_model(model):
+            raise KeyError(f"Model {model} is not mirrored")
+        if ids is None:
+            for (data,) in self._conn.execute("SELECT data FROM records WHERE model = ? ORDER BY id", (model,)):
+                yield json.loads(data)
+            return
+        ids = list(ids)
+        for start in range(0, len(ids), _SQLITE_MAX_VARS):
+            part = ids[start:start + _SQLITE_MAX_VARS]
+            rows = self._conn.execute(
+                f"SELECT id, data FROM records WHERE model = ? AND id IN ({','.join('?' * len(part))})",
+                [model] + part)
+            by_id = dict(rows.fetchall())
+            for i in part:
+                if i in by_id:
+                    yield json.loads(by_id[i])
+
+    def read(self, model, ids: Iterable[int] = None) -> List[dict]:
+        return list(self.iter_read(model, ids))
+
+    def close(self):
+        self._conn.close()
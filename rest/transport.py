@@ -0,0 +1,345 @@
+"""
+HTTP 传输层
+
+xmlrpc.client 默认的 Transport 只缓存一个连接，且不能在多线程间共享。
+这里提供一个线程安全的连接池：每次请求独占一个 HTTP/1.1 keep-alive 连接，
+请求结束后归还到池中复用，从而省去每次调用的 TCP/TLS 握手。
+
+在连接池之上有两种协议：XML-RPC (/xmlrpc/2/*) 和 JSON-RPC (/jsonrpc)。
+
+压缩：连接池总是发送 Accept-Encoding: gzip, deflate，服务器（或其前面的 nginx 等反向代理）
+压缩的响应在读取时流式解压，两种协议都适用。请求体压缩需要服务器端支持（Odoo 本身不解压请求体，
+需要反向代理解压），因此默认关闭，设置 compress_threshold 后超过该字节数的请求体以 gzip 发送。
+"""
+import errno
+import gzip
+import http.client
+import itertools
+import json
+import queue
+import socket
+import ssl
+import threading
+import urllib.parse
+import xmlrpc.client
+import zlib
+from typing import Callable, List, Tuple
+
+# 连接池默认大小（同时进行中的请求数上限）
+DEFAULT_POOL_SIZE = 8
+# 单次请求的超时时间（秒）
+DEFAULT_TIMEOUT = 300
+# 可以接受的响应压缩格式
+ACCEPT_ENCODING = 'gzip, deflate'
+# 请求体 gzip 压缩级别：大的 XML/JSON 文本在较低级别已能压缩到 1/10 左右，更高级别只增加 CPU
+COMPRESS_LEVEL = 5
+# 流式解压时每次从连接读取的字节数
+_DECODE_CHUNK_SIZE = 64 * 1024
+
+# 支持的 RPC 协议
+PROTOCOL_XMLRPC = 'xmlrpc'
+PROTOCOL_JSONRPC = 'jsonrpc'
+PROTOCOLS = (PROTOCOL_XMLRPC, PROTOCOL_JSONRPC)
+
+# 可以重试的连接层错误：连接被拒绝/重置、超时、服务器断开或返回无法解析的状态行，
+# 以及 HTTP 状态码错误（ProtocolError，是否重试再按状态码判断，见 governor.TRANSIENT_HTTP_STATUSES）。
+# SSL 证书/握手错误、权限错误等其他 OSError 重试也不会成功，Odoo 的业务错误 Fault 同样不在其中
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError, socket.timeout, http.client.RemoteDisconnected,
+                    http.client.BadStatusLine, xmlrpc.client.ProtocolError)
+
+# 复用的空闲连接可能已被服务器关闭，遇到这些错误时换一个新连接重试一次
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError,
+                            ConnectionAbortedError, BrokenPipeError)
+
+# 当前线程上正在计量的 TrafficCounter，见 start_metering()
+_metering = threading.local()
+
+
+class TrafficCounter(object):
+    """
+    当前线程在一次调用中发送/接收的 HTTP 正文字节数:
+    sent/received 为实际传输（压缩后）的大小，sent_raw/received_raw 为压缩前的大小
+    """
+    __slots__ = ('sent', 'received', 'sent_raw', 'received_raw')
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.sent_raw = 0
+        self.received_raw = 0
+
+
+def start_metering() -> TrafficCounter:
+    """ 开始计量当前线程上的请求/响应字节数 """
+    counter = _metering.counter = TrafficCounter()
+    return counter
+
+
+def stop_metering():
+    _metering.counter = None
+
+
+class _CountingResponse(object):
+    """ 统计读取字节数的 HTTPResponse 包装，其余属性直接转发 """
+
+    def __init__(self, resp: http.client.HTTPResponse, counter: TrafficCounter):
+        self._resp = resp
+        self._counter = counter
+
+    def read(self, *args):
+        data = self._resp.read(*args)
+        self._counter.received += len(data)
+        return data
+
+    def readinto(self, buffer):
+        n = self._resp.readinto(buffer)
+        self._counter.received += n or 0
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self._resp, name)
+
+
+class _DecodedResponse(object):
+    """
+    流式解压 gzip/deflate 响应体的只读流。
+    不提供 getheader，xmlrpc.client 的 parse_response 会把它当作普通文件对象直接读取。
+    """
+
+    def __init__(self, resp, encoding: str, counter: TrafficCounter = None):
+        self._resp = resp
+        self._counter = counter
+        # gzip 带 gzip 头；deflate 按 RFC 应为 zlib 格式，部分服务器发送不带头的原始 deflate，读到前两个字节时判断
+        self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == 'gzip' else None
+        self._buffer = bytearray()
+        # deflate 判断格式前已读到的数据，zlib 头有 2 个字节，可能分在两次读取中
+        self._head = b''
+        self._eof = False
+
+    def _fill(self, size):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self._resp.read(_DECODE_CHUNK_SIZE)
+            if self._decoder is None:
+                if chunk and len(self._head) + len(chunk) < 2:
+                    self._head += chunk
+                    continue
+                chunk, self._head = self._head + chunk, b''
+                if chunk:
+                    zlib_header = len(chunk) > 1 and chunk[0] & 0x0F == 8 and (chunk[0] << 8 | chunk[1]) % 31 == 0
+                    self._decoder = zlib.decompressobj(zlib.MAX_WBITS if zlib_header else -zlib.MAX_WBITS)
+            if chunk:
+                data = self._decoder.decompress(chunk)
+            else:
+                data = self._decoder.flush() if self._decoder is not None else b''
+                self._eof = True
+            self._buffer += data
+            if self._counter is not None:
+                self._counter.received_raw += len(data)
+
+    def read(self, size=-1):
+        size = -1 if size is None else size
+        self._fill(size)
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def close(self):
+        pass
+
+
+class ConnectionPool(object):
+    """ 指向同一个 Odoo 主机的线程安全 HTTP(S) 连接池 """
+
+    def __init__(self, host: str, pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT,
+                 compress_threshold: int = None):
+        """
+        :param host: Odoo 地址，如 https://odoo.example.com；可以带路径前缀，如 https://example.com/odoo
+        :param pool_size: 最大连接数，超过时请求会等待空闲连接
+        :param timeout: 套接字超时时间（秒）
+        :param compress_threshold: 请求体超过该字节数时以 gzip 压缩发送，为 None 时不压缩（服务器需要支持）
+        """
+        parsed = urllib.parse.urlsplit(host)
+        self.scheme = parsed.scheme or 'http'
+        self.netloc = parsed.netloc or parsed.path
+        # 反向代理下的路径前缀（如 /odoo），没有时为空字符串
+        self.base_path = parsed.path.rstrip('/') if parsed.netloc else ''
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.compress_threshold = compress_threshold
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._ssl_context = ssl.create_default_context() if self.scheme == 'https' else None
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """ 取出一个连接，返回 (连接, 是否为复用的空闲连接) """
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, conn: http.client.HTTPConnection, reusable: bool):
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def post(self, path: str, body: bytes, headers: List[Tuple[str, str]],
+             handle_response: Callable[[http.client.HTTPResponse], object]):
+        """
+        发送 POST 请求，并在持有连接期间用 handle_response 读取响应。
+        handle_response 必须把响应体读完，连接才能被复用；压缩的响应体交给它之前已经解压。
+        :return: handle_response 的返回值
+        """
+        counter = getattr(_metering, 'counter', None)
+        raw_size = len(body)
+        headers = headers + [("Accept-Encoding", ACCEPT_ENCODING)]
+        if self.compress_threshold is not None and raw_size > self.compress_threshold:
+            body = gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+            headers.append(("Content-Encoding", "gzip"))
+        for attempt in (0, 1):
+            conn, reused = self._acquire()
+            try:
+                conn.putrequest("POST", path, skip_accept_encoding=True)
+                for key, val in headers:
+                    conn.putheader(key, val)
+                conn.putheader("Content-Length", str(len(body)))
+                conn.endheaders(body)
+                resp = conn.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                self._release(conn, reusable=False)
+                if attempt or not reused:
+                    raise
+                continue
+            except OSError as e:
+                self._release(conn, reusable=False)
+                if attempt or not reused or e.errno not in (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE):
+                    raise
+                continue
+            except Exception:
+                self._release(conn, reusable=False)
+                raise
+
+            try:
+                if resp.status != 200:
+                    resp.read()
+                    raise xmlrpc.client.ProtocolError(self.netloc + path, resp.status, resp.reason,
+                                                      dict(resp.getheaders()))
+                stream = resp
+                if counter is not None:
+                    counter.sent += len(body)
+                    counter.sent_raw += raw_size
+                    received = counter.received
+                    stream = _CountingResponse(resp, counter)
+                encoding = (resp.getheader("Content-Encoding") or "").strip().lower()
+                if encoding in ('gzip', 'deflate'):
+                    result = handle_response(_DecodedResponse(stream, encoding, counter))
+                else:
+                    result = handle_response(stream)
+                    if counter is not None:
+                        counter.received_raw += counter.received - received
+            except xmlrpc.client.Fault:
+                # 业务错误：响应已完整读取，连接仍可复用
+                self._release(conn, reusable=not resp.will_close)
+                raise
+            except Exception:
+                self._release(conn, reusable=False)
+                raise
+            self._release(conn, reusable=not resp.will_close)
+            return result
+
+    def close(self):
+        """ 关闭所有空闲连接 """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class PooledTransport(xmlrpc.client.Transport):
+    """ 基于 ConnectionPool 的 XML-RPC 传输，可被多个线程同时使用 """
+
+    def __init__(self, pool: ConnectionPool, use_datetime=False, use_builtin_types=False):
+        super().__init__(use_datetime=use_datetime, use_builtin_types=use_builtin_types)
+        self.pool = pool
+        self.verbose = False
+
+    def request(self, host, handler, request_body, verbose=False):
+        headers = [
+            ("Content-Type", "text/xml"),
+            ("User-Agent", self.user_agent),
+        ]
+        return self.pool.post(handler, request_body, headers, self.parse_response)
+
+    def close(self):
+        self.pool.close()
+
+
+class JsonRpcProxy(object):
+    """
+    JSON-RPC 代理，接口与 xmlrpc.client.ServerProxy 相同：
+    proxy.execute_kw(...) / proxy.authenticate(...) / proxy.version()
+    服务端返回的错误会转换为 xmlrpc.client.Fault，调用方无需区分协议。
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, pool: ConnectionPool, service: str, path: str = None):
+        """
+        :param pool: 连接池
+        :param service: Odoo 服务名，common 或 object
+        :param path: JSON-RPC 入口的完整路径，默认为主机地址的路径前缀加 /jsonrpc
+        """
+        self.pool = pool
+        self.service = service
+        self.path = path or f"{pool.base_path}/jsonrpc"
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+
+        def call(*args):
+            return self._call(method, list(args))
+        return call
+
+    def _call(self, method, args):
+        payload = {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": self.service, "method": method, "args": args},
+            "id": next(self._ids),
+        }
+        body = json.dumps(payload).encode('utf-8')
+        headers = [
+            ("Content-Type", "application/json"),
+        ]
+        return self.pool.post(self.path, body, headers, self._parse_response)
+
+    @staticmethod
+    def _parse_response(resp):
+        data = json.load(resp)
+        error = data.get('error')
+        if error:
+            detail = error.get('data') or {}
+            raise xmlrpc.client.Fault(error.get('code', 0),
+                                      detail.get('message') or error.get('message', ''))
+        return data.get('result')
+
+    def __close(self):
+        self.pool.close()
+
+    def __call__(self, attr):
+        # 与 ServerProxy 保持一致: proxy("close")() 关闭连接
+        if attr == "close":
+            return self.__close
+        raise AttributeError("Attribute %r not found" % (attr,))
@@ -1 +1,2 @@
-from .odoo import QuantVO, StockToMove, ProductVO
\ No newline at end of file
+from .odoo import OdooVO, VORecord
+from .odoo import QuantVO, StockToMove, ProductVO, RelocationResult, BatchResult
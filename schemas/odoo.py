@@ -1,7 +1,80 @@
-from pydantic import BaseModel
+from typing import Dict, Iterable, List, Type, Union
 
+from pydantic import BaseModel, TypeAdapter
 
-class StockToMove(BaseModel):
+# 每个 VO 类对应的 List[cls] 校验器
+_list_adapters: Dict[type, TypeAdapter] = {}
+# 每个 VO 类对应的 __slots__ 记录类型
+_record_types: Dict[type, type] = {}
+
+
+class VORecord(object):
+    """ 只有 __slots__、不做校验的轻量记录，用于大批量可信数据 """
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    def _asdict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+class OdooVO(BaseModel):
+    """
+    视图对象基类，提供批量构造的快速路径:
+    - validate_many: 一次性校验整个列表（在 pydantic-core 中完成，不逐个调用构造函数）
+    - construct_many: 跳过校验，适用于 Odoo 服务器返回的可信数据
+    - records: 构造 __slots__ 轻量记录
+    - to_frame: 直接由行数据或对象列表生成 DataFrame，无需逐个 model_dump()
+    """
+
+    @classmethod
+    def field_names(cls) -> List[str]:
+        return list(cls.model_fields)
+
+    @classmethod
+    def validate_many(cls, rows: Iterable[dict]) -> list:
+        adapter = _list_adapters.get(cls)
+        if adapter is None:
+            adapter = _list_adapters[cls] = TypeAdapter(List[cls])
+        return adapter.validate_python(list(rows))
+
+    @classmethod
+    def construct_many(cls, rows: Iterable[dict]) -> list:
+        return [cls.model_construct(**row) for row in rows]
+
+    @classmethod
+    def record_type(cls) -> Type[VORecord]:
+        record_type = _record_types.get(cls)
+        if record_type is None:
+            record_type = _record_types[cls] = type(f"{cls.__name__}Record", (VORecord,),
+                                                    {'__slots__': tuple(cls.model_fields)})
+        return record_type
+
+    @classmethod
+    def records(cls, rows: Iterable[dict]) -> List[VORecord]:
+        record_type = cls.record_type()
+        return [record_type(**row) for row in rows]
+
+    @classmethod
+    def to_frame(cls, items: Iterable):
+        """
+        :param items: 行数据 dict、本类对象或 VORecord 的列表
+        :return: 列顺序与模型字段一致的 DataFrame
+        """
+        import pandas as pd
+        rows = [item if isinstance(item, dict) else
+                item._asdict() if isinstance(item, VORecord) else vars(item)
+                for item in items]
+        return pd.DataFrame.from_records(rows, columns=cls.field_names())
+
+
+class StockToMove(OdooVO):
     product_id: int
     product_name: str
     location_in_id: int
@@ -18,7 +91,51 @@ class StockToMove(BaseModel):
         return f"{self.quant_quantity}x {product_name} from {location_in_name} to {location_out_name}"
 
 
-class QuantVO(BaseModel):
+class RelocationResult(BaseModel):
+    """ 移到同一个目标库位的一批库存量（一次 write）的结果 """
+    location_out_id: int
+    location_out_name: str
+    quant_ids: List[int]
+    # None 表示 debug 模式下没有实际执行
+    success: Union[bool, None]
+    error: Union[str, None] = None
+
+    @property
+    def skipped(self) -> bool:
+        return self.success is None
+
+    def __str__(self):
+        location_out_name = self.location_out_name.split('/')[-1]
+        if self.skipped:
+            status = "SKIPPED (debug)"
+        else:
+            status = "OK" if self.success else f"FAILED ({self.error})"
+        return f"{len(self.quant_ids)} quants to {location_out_name}: {status}"
+
+
+class BatchResult(BaseModel):
+    """ 一次批量 create/write 的结果 """
+    action: str
+    model: str
+    size: int
+    ids: List[int] = []
+    # None 表示 debug 模式下没有实际执行
+    success: Union[bool, None]
+    error: Union[str, None] = None
+
+    @property
+    def skipped(self) -> bool:
+        return self.success is None
+
+    def __str__(self):
+        if self.skipped:
+            status = "SKIPPED (debug)"
+        else:
+            status = "OK" if self.success else f"FAILED ({self.error})"
+        return f"{self.action} {self.size} {self.model}: {status}"
+
+
+class QuantVO(OdooVO):
     product_id: int
     product_name: str
     location_id: int
@@ -32,7 +149,7 @@ class QuantVO(BaseModel):
         product_name = self.product_name.split(' ')[0]
         return f"{self.quantity}x {product_name} in {self.location_name} ({self.warehouse_name})"
 
-class ProductVO(BaseModel):
+class ProductVO(OdooVO):
     id: int
     name: str
     list_price: float
@@ -1,10 +1,35 @@
+import asyncio
+import gzip
+import importlib.util
+import itertools
+import json
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+import xmlrpc.client
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
 import pandas as pd
+from pydantic import ValidationError
 
-from rest import (OdooAPIKey, ContactClient, SalesOrderClient,
+from rest import (OdooAPIKey, OdooClient, SESSIONS, ContactClient, SalesOrderClient,
                   ProductClient, ProductTemplateClient, OdooWarehouseClient,
-                  OdooWarehouseOperation)
+                  OdooWarehouseOperation, AsyncOdooClient, OdooMirror, SyncModel, RateGovernor,
+                  PutawayIndex, ResponseCache, Pipeline, IdBatcher, RecordDecoder, RpcMetrics,
+                  DataFrameExporter)
+from rest import FullRecordReadWarning, ProjectionRegistry
+from rest.base import OdooPricelistOperation, PricelistItem, PRICE_TOLERANCE
+from rest.transport import _DecodedResponse, TrafficCounter
+from schemas import StockToMove, ProductVO
+from analytics import RFMEngine, compute_rfm
+from bench.fake_odoo import FakeOdooServer, Scale
 import warnings
 import dotenv
 # 调整显示选项
@@ -44,6 +69,481 @@ class TestOdooAPI(unittest.TestCase):
 
 
 
+    def test_OdooClient_iter_read(self):
+        warnings.filterwarnings("ignore", category=ResourceWarning)
+        client = SalesOrderClient(key).client
+        ids = client.search("sale.order", [[]], {"limit": 25})
+        fields = ["id", "name", "write_date"]
+        expected = client.read("sale.order", [ids], {"fields": fields})
+
+        chunks = list(client.iter_read_chunks("sale.order", ids, fields, chunk_size=10))
+        self.assertTrue(all(len(chunk) <= 10 for chunk in chunks))
+        records = [record for chunk in chunks for record in chunk]
+        self.assertEqual([r['id'] for r in records], [r['id'] for r in expected])
+
+        paged = list(client.iter_search_read("sale.order", [("id", "in", ids)], fields, chunk_size=10))
+        self.assertEqual(sorted(r['id'] for r in paged), sorted(ids))
+
+    def test_OdooClient_read_parallel(self):
+        warnings.filterwarnings("ignore", category=ResourceWarning)
+        client = SalesOrderClient(key).client
+        ids = client.search("sale.order.line", [[]], {"limit": 100})
+        ids.reverse()
+        records = client.read_parallel("sale.order.line", ids, ["id", "order_id"],
+                                       chunk_size=7, max_workers=4)
+        self.assertEqual([r['id'] for r in records], ids)
+
+    def test_OdooClient_shared_across_threads(self):
+        warnings.filterwarnings("ignore", category=ResourceWarning)
+        client = ContactClient(key).client
+        ids = client.search("res.partner", [[]], {"limit": 20})
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda i: client.read("res.partner", [[i]], {"fields": ["id"]}), ids))
+        self.assertEqual([r[0]['id'] for r in results], ids)
+        self.assertLessEqual(client.pool._idle.qsize(), client.pool.pool_size)
+
+    def test_OdooClient_jsonrpc(self):
+        with FakeOdooServer(Scale.for_rows(1000)) as server:
+            xml_client = OdooClient(server.api_key(protocol="xmlrpc")).login()
+            json_client = OdooClient(server.api_key(protocol="jsonrpc")).login()
+            self.assertEqual(json_client.protocol, "jsonrpc")
+            self.assertEqual(xml_client.uid, json_client.uid)
+
+            ids = xml_client.search("res.partner", [[]], {"limit": 10})
+            self.assertEqual(len(ids), 10)
+            self.assertEqual(json_client.search("res.partner", [[]], {"limit": 10}), ids)
+            fields = ["id", "name", "email"]
+            self.assertEqual(json_client.read("res.partner", [ids], {"fields": fields}),
+                             xml_client.read("res.partner", [ids], {"fields": fields}))
+            # 两种协议的服务端错误都转换为 Fault
+            for client in (xml_client, json_client):
+                with self.assertRaises(xmlrpc.client.Fault):
+                    client.execute_kw("res.partner", "no_such_method", [])
+            xml_client.close()
+            json_client.close()
+
+    def test_RateGovernor(self):
+        governor = RateGovernor(max_concurrency=4, retry_delay=0.01)
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise xmlrpc.client.ProtocolError("localhost", 502, "Bad Gateway", {})
+            return [1]
+
+        self.assertEqual(governor.call("sale.order", "read", flaky), [1])
+        self.assertEqual(governor.retried, 2)
+        self.assertEqual(governor.decreases, 2)
+        # create 只在连接被拒绝时重试
+        attempts.clear()
+        with self.assertRaises(xmlrpc.client.ProtocolError):
+            governor.call("sale.order", "create", flaky)
+        self.assertEqual(len(attempts), 1)
+
+        # 只重试连接层错误和 502/503/504：SSL 错误和 500 立即抛出，连接被重置时重试
+        def failing(error):
+            def call():
+                attempts.append(1)
+                raise error
+            return call
+
+        for error in (ssl.SSLCertVerificationError("certificate verify failed"),
+                      ssl.SSLError("wrong version number"),
+                      xmlrpc.client.ProtocolError("localhost", 500, "Internal Server Error", {})):
+            attempts.clear()
+            with self.assertRaises(type(error)):
+                governor.call("sale.order", "read", failing(error))
+            self.assertEqual(len(attempts), 1)
+        attempts.clear()
+        with self.assertRaises(ConnectionResetError):
+            governor.call("sale.order", "read", failing(ConnectionResetError()))
+        self.assertEqual(len(attempts), governor.retries + 1)
+
+    def test_lazy_import(self):
+        # 本模块已经导入了 pandas，需要在新的解释器中检查
+        subprocess.run([sys.executable, "-c", "import rest, sys; assert 'pandas' not in sys.modules"],
+                       check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    def test_SessionRegistry(self):
+        with FakeOdooServer(Scale.for_rows(1000)) as server:
+            api_key = server.api_key()
+            # 其他测试可能已经在全局注册表中留下会话
+            SESSIONS.close()
+            try:
+                contacts = ContactClient(api_key)
+                orders = SalesOrderClient(api_key)
+                # 同一个 key 的客户端共用一个已登录的会话
+                self.assertIs(contacts.client, orders.client)
+                self.assertEqual(len(SESSIONS), 1)
+                self.assertIs(SESSIONS.get(api_key.model_copy()), contacts.client)
+                # 其他协议、其他用户或自带调用统计的客户端使用单独的会话
+                self.assertIsNot(ContactClient(server.api_key(protocol='jsonrpc')).client, contacts.client)
+                self.assertIsNot(ContactClient(api_key.model_copy(update={'username': 'other'})).client,
+                                 contacts.client)
+                self.assertIsNot(ContactClient(api_key, metrics=RpcMetrics()).client, contacts.client)
+                self.assertEqual(len(SESSIONS), 4)
+            finally:
+                SESSIONS.close()
+            self.assertEqual(len(SESSIONS), 0)
+            self.assertIsNot(ContactClient(api_key).client, contacts.client)
+            SESSIONS.close()
+
+    def test_ResponseCache(self):
+        cache = ResponseCache(ttls={'res.partner': 60, 'product.template': 0.2})
+        fields = {'fields': ['id', 'name']}
+        with FakeOdooServer(Scale.for_rows(1000)) as server:
+            client = OdooClient(server.api_key(), cache=cache)
+            client.search_read('res.partner', [[('id', '<=', 3)]], fields)
+            client.search_read('res.partner', [[('id', '<=', 3)]], fields)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            # 共用缓存的其他用户不会命中这个用户的结果
+            other = OdooClient(server.api_key().model_copy(update={'username': 'other'}), cache=cache)
+            other.search_read('res.partner', [[('id', '<=', 3)]], fields)
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+            other.close()
+            # 未在 ttls 中列出的模型不缓存
+            client.search_read('stock.quant', [[('id', '<=', 3)]], fields)
+            client.search_read('stock.quant', [[('id', '<=', 3)]], fields)
+            self.assertEqual(cache.hits, 1)
+            # write 和 create 清除该模型的缓存，之后读到新数据
+            client.write('res.partner', [[1], {'name': "Renamed"}])
+            self.assertEqual(client.search_read('res.partner', [[('id', '<=', 3)]], fields)[0]['name'], "Renamed")
+            client.create('res.partner', [{'name': "New"}])
+            client.search_read('res.partner', [[('id', '<=', 3)]], fields)
+            self.assertEqual(cache.hits, 1)
+            # 过期后重新请求
+            client.read('product.template', [[1], ['id', 'name']])
+            client.read('product.template', [[1], ['id', 'name']])
+            self.assertEqual(cache.hits, 2)
+            time.sleep(0.3)
+            client.read('product.template', [[1], ['id', 'name']])
+            self.assertEqual(cache.hits, 2)
+            client.close()
+
+    def test_ResponseCache_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite')
+            writer = ResponseCache(ttls={'product.template': 60}, path=path)
+            key = ResponseCache.make_key('http://odoo', 'db', 'admin', 'product.template', 'read', [[1]], {})
+            value = [{'id': 1, 'name': "x" * 10000}]
+            writer.set('product.template', key, value)
+            writer.close()
+            # 另一个进程用更小的 max_bytes 读取同一个文件：能命中，但超过上限的结果不放入内存
+            reader = ResponseCache(ttls={'product.template': 60}, path=path, max_bytes=1000)
+            self.assertEqual(reader.get('product.template', key), (True, value))
+            self.assertEqual(reader.get('product.template', key), (True, value))
+            self.assertEqual((reader.hits, reader._size), (2, 0))
+            reader.close()
+
+    def test_Pipeline(self):
+        with FakeOdooServer(Scale.for_rows(2000)) as server:
+            client = OdooClient(server.api_key())
+            order_ids, lines = [], []
+            batcher = IdBatcher(chunk_size=100)
+
+            def handle_orders(orders, emit):
+                order_ids.extend(order['id'] for order in orders)
+                batcher.add([line_id for order in orders for line_id in order['order_line']], emit)
+
+            def handle_lines(line_ids, emit):
+                lines.extend(client.read('sale.order.line', [line_ids, ['id', 'order_id']]))
+
+            stats = (Pipeline(queue_size=2)
+                     .stage('orders', handle_orders, flush=batcher.flush)
+                     .stage('lines', handle_lines, workers=3)
+                     .run(client.iter_search_read_chunks('sale.order', [], ['id', 'order_line'], chunk_size=50)))
+            # 单线程阶段按输入顺序处理，多线程阶段处理了全部 id
+            self.assertEqual(order_ids, sorted(order_ids))
+            self.assertEqual(len(order_ids), 500)
+            self.assertEqual(sorted(line['id'] for line in lines), list(range(1, 2001)))
+            self.assertEqual([stat.items for stat in stats], [10, 20])
+
+            # 某个阶段出错时 run() 抛出该错误，无限的输入也会停止，所有线程退出
+            def fail(item, emit):
+                if item == 5:
+                    raise ValueError("bad item")
+                emit(item)
+
+            with self.assertRaises(ValueError):
+                (Pipeline(queue_size=2)
+                 .stage('fail', fail)
+                 .stage('sink', lambda item, emit: time.sleep(0.01), workers=2)
+                 .run(itertools.count()))
+            self.assertFalse([thread for thread in threading.enumerate() if thread.name.startswith('pipeline-')])
+            client.close()
+
+    def test_DecodedResponse(self):
+        class Trickle(object):
+            """ 每次最多返回 step 个字节的响应体 """
+            def __init__(self, data, step):
+                self.data, self.step = data, step
+
+            def read(self, size=-1):
+                chunk, self.data = self.data[:self.step], self.data[self.step:]
+                return chunk
+
+        body = b"<value><int>42</int></value>" * 500
+        raw_deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        streams = {'gzip': ('gzip', gzip.compress(body)),
+                   'zlib': ('deflate', zlib.compress(body)),
+                   'raw deflate': ('deflate', raw_deflate.compress(body) + raw_deflate.flush())}
+        for name, (encoding, data) in streams.items():
+            for step in (1, 2, 3, 1000, len(data)):
+                with self.subTest(stream=name, step=step):
+                    counter = TrafficCounter()
+                    resp = _DecodedResponse(Trickle(data, step), encoding, counter)
+                    # 按不同大小读取，跨越压缩数据的分块边界
+                    parts = [resp.read(7), resp.read(4096), resp.read()]
+                    self.assertEqual(b''.join(parts), body)
+                    self.assertEqual(resp.read(), b'')
+                    self.assertEqual(counter.received_raw, len(body))
+
+    def test_compression_round_trip(self):
+        domain = [[('id', '<=', 500)]]
+        fields = {'fields': ['id', 'product_id', 'location_id', 'quantity', 'write_date']}
+        for protocol in ('xmlrpc', 'jsonrpc'):
+            with self.subTest(protocol=protocol):
+                with FakeOdooServer(Scale.for_rows(1000)) as plain, \
+                        FakeOdooServer(Scale.for_rows(1000), compress=True) as compressed:
+                    results, traffic = [], []
+                    for server in (plain, compressed):
+                        metrics = RpcMetrics()
+                        client = OdooClient(server.api_key(protocol=protocol), metrics=metrics)
+                        results.append(client.search_read('stock.quant', domain, fields))
+                        traffic.append(metrics.traffic())
+                        client.close()
+                self.assertEqual(len(results[0]), 500)
+                self.assertEqual(results[1], results[0])
+                # 未压缩时传输量等于解码后的大小；压缩后解码结果相同，节省了传输字节数
+                self.assertEqual(traffic[0]['saved_bytes'], 0)
+                self.assertEqual(traffic[1]['response_raw_bytes'], traffic[0]['response_raw_bytes'])
+                self.assertGreater(traffic[1]['saved_bytes'], 0)
+                self.assertLess(traffic[1]['response_bytes'], traffic[0]['response_bytes'] / 2)
+
+    def test_RecordDecoder(self):
+        decoder = RecordDecoder({'id': 'integer', 'partner_id': 'many2one', 'currency_id': 'many2one',
+                                 'note': 'char', 'date_order': 'datetime'})
+        records = [{'id': 1, 'partner_id': [7, "Customer 7"], 'currency_id': [1, "EUR"], 'note': "x",
+                    'date_order': '2024-01-01 10:00:00'},
+                   {'id': 2, 'partner_id': [8, "Customer 8"], 'currency_id': False, 'note': False,
+                    'date_order': False}]
+        df = decoder.decode(records)
+        # many2one 拆分为 Int64 的 id 列和名称列，False 为缺失值
+        self.assertEqual(list(df.columns), ['id', 'partner_id', 'partner_id_name', 'currency_id',
+                                            'currency_id_name', 'note', 'date_order'])
+        self.assertEqual(str(df['partner_id'].dtype), 'Int64')
+        self.assertEqual(df['partner_id'].tolist(), [7, 8])
+        self.assertEqual(df['partner_id_name'].tolist(), ["Customer 7", "Customer 8"])
+        self.assertTrue(pd.isna(df['currency_id'][1]))
+        self.assertTrue(pd.isna(df['currency_id_name'][1]))
+        self.assertTrue(pd.isna(df['note'][1]))
+        self.assertEqual(df['date_order'][0], pd.Timestamp('2024-01-01 10:00:00'))
+        self.assertTrue(pd.isna(df['date_order'][1]))
+
+    def test_RecordDecoder_categorical(self):
+        decoder = RecordDecoder({'id': 'integer', 'partner_id': 'many2one', 'invoice_partner_id': 'many2one',
+                                 'currency_id': 'many2one', 'state': 'selection', 'note': 'char'},
+                                {'partner_id': 'res.partner', 'invoice_partner_id': 'res.partner',
+                                 'currency_id': 'res.currency'},
+                                categorical=['currency_id', 'state'])
+
+        def record(i, partner, currency, state):
+            # 每条记录的名称都是新的字符串对象，与 XML/JSON 解析的结果相同
+            return {'id': i, 'partner_id': [partner, ''.join(["Customer ", str(partner)])],
+                    'invoice_partner_id': [partner, ''.join(["Customer ", str(partner)])],
+                    'currency_id': [currency, "EUR" if currency == 1 else "USD"] if currency else False,
+                    'state': state, 'note': False}
+
+        records = [record(1, 7, 1, 'draft'), record(2, 7, False, 'draft'),
+                   record(3, 8, 1, 'sale'), record(4, 7, 2, 'done')]
+        df = decoder.decode_iter(iter(records), chunk_size=2)
+        self.assertEqual(df['partner_id_name'].tolist(), ["Customer 7", "Customer 7", "Customer 8", "Customer 7"])
+        # 同一关联模型的名称只保留一个对象，不同字段之间也共用
+        self.assertIs(df['partner_id_name'][0], df['partner_id_name'][3])
+        self.assertIs(df['partner_id_name'][0], df['invoice_partner_id_name'][1])
+        # 两块的类别不同，拼接后仍为 category 列，类别取并集
+        self.assertIsInstance(df['state'].dtype, pd.CategoricalDtype)
+        self.assertEqual(set(df['state'].cat.categories), {'draft', 'sale', 'done'})
+        self.assertEqual(df['state'].tolist(), ['draft', 'draft', 'sale', 'done'])
+        self.assertIsInstance(df['currency_id_name'].dtype, pd.CategoricalDtype)
+        self.assertEqual(set(df['currency_id_name'].cat.categories), {'EUR', 'USD'})
+
+    def test_DataFrameExporter(self):
+        fields = ['id', 'product_id', 'location_id', 'quantity']
+        with FakeOdooServer(Scale.for_rows(1000)) as server:
+            client = OdooClient(server.api_key())
+            decoder = RecordDecoder.for_model(client, 'stock.quant', categorical=['location_id'])
+            records = [record for chunk in client.iter_search_read_chunks('stock.quant', [], fields)
+                       for record in chunk]
+            client.close()
+        frames = list(decoder.iter_frames(records, fields, chunk_size=40))
+        # 各块的类别不同
+        self.assertGreater(len(frames), 2)
+        self.assertNotEqual(list(frames[0]['location_id_name'].cat.categories),
+                            list(frames[-1]['location_id_name'].cat.categories))
+        expected = pd.concat(frames, ignore_index=True)
+        readers = {'csv': (None, pd.read_csv), 'parquet': ('pyarrow', pd.read_parquet),
+                   'xlsx': ('openpyxl', pd.read_excel)}
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt, (dependency, read) in readers.items():
+                for background in (False, True):
+                    with self.subTest(fmt=fmt, background=background):
+                        if dependency and importlib.util.find_spec(dependency) is None:
+                            self.skipTest(f"{dependency} is not installed")
+                        path = os.path.join(tmp, f"quants_{int(background)}.{fmt}")
+                        with DataFrameExporter(path, background=background) as exporter:
+                            for df in frames:
+                                exporter.append(df)
+                        self.assertEqual(exporter.rows, len(records))
+                        df = read(path)
+                        self.assertEqual(df['id'].tolist(), expected['id'].tolist())
+                        self.assertEqual(df['location_id_name'].astype(str).tolist(),
+                                         expected['location_id_name'].astype(str).tolist())
+                        self.assertEqual(df['quantity'].tolist(), expected['quantity'].tolist())
+                        if fmt == 'parquet':
+                            # 分块写入的 category 列读回时仍为 category
+                            self.assertIsInstance(df['location_id_name'].dtype, pd.CategoricalDtype)
+        with self.assertRaises(ValueError):
+            DataFrameExporter("quants.json")
+
+    def test_OdooVO(self):
+        with FakeOdooServer(Scale.for_rows(1000)) as server:
+            client = OdooClient(server.api_key())
+            operation = OdooWarehouseOperation.from_client(client)
+            # 不写 temp/ 下的文件
+            with mock.patch('rest.base.save_dataframe_to_temp') as save:
+                products = operation.list_products_to_show()
+                quants = operation.list_quants_to_show()
+            client.close()
+        self.assertEqual(len(products), Scale.for_rows(1000).products)
+        self.assertIsInstance(products[0], ProductVO)
+        self.assertEqual((products[0].id, products[0].default_code), (1, "P00001"))
+        self.assertEqual(products[3].barcode, "")
+        df_products = save.call_args_list[0].args[0]
+        self.assertEqual(list(df_products.columns), ProductVO.field_names())
+        self.assertEqual(df_products['id'].tolist(), [product.id for product in products])
+        df_quants = save.call_args_list[1].args[0]
+        self.assertEqual(len(df_quants), len(quants))
+        self.assertEqual(df_quants['product_name'].tolist(), sorted(quant.product_name for quant in quants))
+        self.assertIsInstance(df_quants['location_name'].dtype, pd.CategoricalDtype)
+
+        # construct_many 不校验，结果与 validate_many 相同；to_frame 接受 dict、对象和 VORecord
+        rows = [product.model_dump() for product in products[:5]]
+        self.assertEqual(ProductVO.construct_many(rows), ProductVO.validate_many(rows))
+        expected = ProductVO.to_frame(rows)
+        pd.testing.assert_frame_equal(ProductVO.to_frame(ProductVO.construct_many(rows)), expected)
+        pd.testing.assert_frame_equal(ProductVO.to_frame(ProductVO.records(rows)), expected)
+        self.assertEqual(list(ProductVO.to_frame([]).columns), ProductVO.field_names())
+        with self.assertRaises(ValidationError):
+            ProductVO.validate_many([dict(rows[0], list_price="n/a")])
+
+    def test_ProjectionRegistry(self):
+        registry = ProjectionRegistry()
+        registry.register('quants', 'stock.quant', ['id', 'quantity', 'quantity', 'no_such_field'])
+        with self.assertRaises(ValueError):
+            registry.register('empty', 'stock.quant', [])
+        with self.assertRaises(KeyError):
+            registry.get('orders')
+        with FakeOdooServer(Scale.for_rows(1000)) as server:
+            metrics = RpcMetrics()
+            client = OdooClient(server.api_key(), metrics=metrics)
+            # 服务器上不存在的字段只在第一次核对时警告一次，之后不再调用 fields_get
+            with self.assertWarns(UserWarning):
+                self.assertEqual(registry.fields('quants', client), ['id', 'quantity'])
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                self.assertEqual(registry.fields('quants', client), ['id', 'quantity'])
+                self.assertEqual(registry.validate(client), {'quants': ['no_such_field']})
+            self.assertEqual(sum(row['calls'] for row in metrics.stats() if row['method'] == 'fields_get'), 1)
+
+            # 不带 fields 的 read/search_read 给出警告，位置指向调用方而不是 rest 包内部
+            with self.assertWarns(FullRecordReadWarning) as cm:
+                client.read('stock.quant', [[1]])
+            self.assertEqual(cm.filename, __file__)
+            with self.assertWarns(FullRecordReadWarning) as cm:
+                list(client.iter_search_read_chunks('stock.quant', [('id', '<=', 3)], []))
+            self.assertEqual(cm.filename, __file__)
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                client.read('stock.quant', [[1], registry.fields('quants', client)])
+                client.search_read('stock.quant', [[('id', '<=', 3)]], {'fields': ['id']})
+            client.close()
+
+    def test_RpcMetrics(self):
+        metrics = RpcMetrics()
+        for ms in range(1, 101):
+            metrics.record('sale.order', 'read', ms / 1000, request_bytes=10, response_bytes=100, records=2)
+        metrics.record('res.partner', 'search', 0.001, error=True)
+        read, search = metrics.stats()
+        self.assertEqual((read['calls'], read['errors'], read['records']), (100, 0, 200))
+        self.assertEqual((read['p50_ms'], read['p95_ms'], read['p99_ms'], read['max_ms']), (50, 95, 99, 100))
+        self.assertEqual((read['request_bytes'], read['response_raw_bytes']), (1000, 10000))
+        self.assertEqual((search['model'], search['errors']), ('res.partner', 1))
+        metrics.reset()
+        self.assertEqual(metrics.stats(), [])
+
+        cache = ResponseCache(ttls={'res.partner': 60})
+        fields = {'fields': ['id', 'name']}
+        with FakeOdooServer(Scale.for_rows(1000)) as server:
+            for protocol in ('xmlrpc', 'jsonrpc'):
+                with self.subTest(protocol=protocol):
+                    metrics = RpcMetrics()
+                    cache.invalidate()
+                    client = OdooClient(server.api_key(protocol=protocol), metrics=metrics, cache=cache)
+                    client.search_read('res.partner', [[('id', '<=', 20)]], fields)
+                    # 命中缓存的调用没有发出请求，不记录
+                    client.search_read('res.partner', [[('id', '<=', 20)]], fields)
+                    with self.assertRaises(xmlrpc.client.Fault):
+                        client.execute_kw('res.partner', 'no_such_method', [])
+                    client.close()
+                    stats = {(row['model'], row['method']): row for row in metrics.stats()}
+                    row = stats[('res.partner', 'search_read')]
+                    self.assertEqual((row['calls'], row['records'], row['errors']), (1, 20, 0))
+                    self.assertGreater(row['request_bytes'], 0)
+                    self.assertGreater(row['response_bytes'], 0)
+                    self.assertEqual(stats[('res.partner', 'no_such_method')]['errors'], 1)
+                    with tempfile.TemporaryDirectory() as tmp:
+                        with open(metrics.dump(os.path.join(tmp, 'metrics.json')), encoding='utf-8') as f:
+                            dumped = json.load(f)
+                    self.assertEqual(len(dumped['calls']), 2)
+                    self.assertEqual(dumped['traffic'], metrics.traffic())
+
+    def test_AsyncOdooClient(self):
+        warnings.filterwarnings("ignore", category=ResourceWarning)
+
+        async def fetch():
+            aclient = await AsyncOdooClient(key, max_concurrency=4).login()
+            so = aclient.api(SalesOrderClient)
+            wh = aclient.api(OdooWarehouseClient)
+            order_ids, quant_ids = await asyncio.gather(so.fetch_ids(), wh.fetch_quant_ids())
+            orders, quants = await asyncio.gather(so.fetch_order_details(order_ids[0:5]),
+                                                  aclient.read_chunked("stock.quant", quant_ids[0:50],
+                                                                       ["id"], chunk_size=10))
+            return orders, quants, quant_ids[0:50]
+
+        orders, quants, quant_ids = asyncio.run(fetch())
+        self.assertIsInstance(orders, list)
+        self.assertIsInstance(orders[0]['id'], int)
+        self.assertEqual([q['id'] for q in quants], quant_ids)
+
+    def test_OdooMirror(self):
+        warnings.filterwarnings("ignore", category=ResourceWarning)
+        client = SalesOrderClient(key).client
+        ids = client.search("sale.order", [[]], {"limit": 20})
+        spec = SyncModel(model="sale.order", fields=["name", "state"], domain=[("id", "in", ids)])
+        with tempfile.TemporaryDirectory() as tmp:
+            mirror = OdooMirror(client, [spec], os.path.join(tmp, "mirror.sqlite3"))
+            first = mirror.sync_model("sale.order")
+            self.assertEqual(first.total, len(ids))
+            self.assertIsNotNone(mirror.high_water_mark("sale.order"))
+
+            second = mirror.sync_model("sale.order")
+            self.assertEqual(second.deleted, 0)
+            self.assertLessEqual(second.changed, first.changed)
+            self.assertEqual([r['id'] for r in mirror.read("sale.order", ids)], ids)
+            mirror.close()
+
     def test_ProductClient(self):
         warnings.filterwarnings("ignore", category=ResourceWarning)
         client = ProductTemplateClient(key)
@@ -115,6 +615,124 @@ class TestOdooAPI(unittest.TestCase):
             for line_detail in orderline_details:
                 print(line_detail)
 
+    def test_SalesOrderClient_aggregate(self):
+        client = SalesOrderClient(key)
+        df = client.aggregate_order_lines(['salesman_id', 'create_date:month'],
+                                          ['price_subtotal:sum', 'order_id:count_distinct', '__count'])
+        print(df)
+        self.assertEqual(list(df.columns), ['salesman_id', 'salesman_id_name', 'create_date_month',
+                                            'price_subtotal', 'order_id_count_distinct', 'count'])
+        self.assertGreater(len(df), 0)
+        self.assertTrue((df['count'] > 0).all())
+
+
+    def test_RFMEngine(self):
+        lines = pd.DataFrame({
+            'order_partner': ['A', 'A', 'B', 'C', 'C', 'C'],
+            'order_number': ['S1', 'S1', 'S2', 'S3', 'S4', 'S5'],
+            'price_subtotal': [10.0, 5.0, 100.0, 1.0, 2.0, 3.0],
+            'currency': ['EUR'] * 6,
+            'create_date': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-06-01',
+                                           '2024-03-01', '2024-04-01', '2024-05-01']),
+        })
+        reference_date = pd.Timestamp('2024-07-01')
+        df_rfm = compute_rfm(lines, reference_date)
+        print(df_rfm)
+        self.assertEqual(df_rfm['order_partner'].tolist(), ['B', 'A', 'C'])
+        self.assertEqual(df_rfm.set_index('order_partner')['order_count'].to_dict(), {'A': 1, 'B': 1, 'C': 3})
+
+        engine = RFMEngine(reference_date)
+        engine.update(lines.iloc[:3])
+        df_incremental = engine.update(lines.iloc[3:])
+        pd.testing.assert_frame_equal(df_incremental, df_rfm)
+
+    def test_OdooPricelistOperation_compare(self):
+        def item(item_id, code, fixed_price, min_quantity):
+            return {'id': item_id, 'pricelist_id': 1, 'pricelist_name': 'VIP 1', 'company_id': 1,
+                    'company_name': 'My Company', 'fixed_price': fixed_price, 'name': 'VIP 1', 'currency': 'EUR',
+                    'min_quantity': min_quantity, 'product_tmpl_id': item_id, 'product_tmpl_name': f"[{code}] P",
+                    'default_code': code, 'product_id': None, 'product_name': None}
+
+        def vip(rows):
+            df = pd.DataFrame(rows, columns=['group_name', 'internal_reference', 'custom_price', 'min_quantity'])
+            df['key'] = df['group_name'] + '_' + df['internal_reference']
+            return df
+
+        operation = OdooPricelistOperation.__new__(OdooPricelistOperation)
+        df_vip = vip([
+            ('VIP 1', 'A', 10.0 + PRICE_TOLERANCE - 0.001, 1),  # 误差内：不变
+            ('VIP 1', 'B', 10.5, 1),                           # 价格变化：更新
+            ('VIP 1', 'C', 10.0, 5),                           # 最小数量变化：新的阶梯，原阶梯过时
+            ('VIP 1', 'D', 3.0, 1),                            # Odoo 中没有：新建
+            ('VIP 1', 'G', 2.0, 1),                            # 同一参考号的两个价格阶梯，均与 Odoo 一致
+            ('VIP 1', 'G', 1.5, 10),
+            ('VIP 2', 'E', 1.0, 1),                            # 价格表不在 Odoo 中：忽略
+        ])
+        items = PricelistItem.validate_many([item(1, 'A', 10.0, 1), item(2, 'B', 10.0, 1),
+                                             item(3, 'C', 10.0, 1), item(4, 'Z', 7.0, 1),
+                                             item(5, 'G', 1.5, 10), item(6, 'G', 2.0, 1)])
+        df = operation._compare_vip_and_odoo_pricelist(df_vip, items, ['VIP 1'])
+        self.assertEqual(dict(zip(df['key'], df['action'])),
+                         {'VIP 1_A_1': 'unchanged', 'VIP 1_B_1': 'update', 'VIP 1_C_5': 'create',
+                          'VIP 1_C_1': 'stale', 'VIP 1_D_1': 'create', 'VIP 1_Z_1': 'stale',
+                          'VIP 1_G_1': 'unchanged', 'VIP 1_G_10': 'unchanged'})
+        self.assertEqual(len(df), 8)
+        # Odoo 中还没有任何 item 时全部新建
+        df = operation._compare_vip_and_odoo_pricelist(df_vip, [], ['VIP 1'])
+        self.assertEqual(df['action'].tolist(), ['create'] * 6)
+
+    def test_OdooPricelistOperation_batches(self):
+        def calls(metrics, method):
+            return sum(row['calls'] for row in metrics.stats()
+                       if (row['model'], row['method']) == ('product.pricelist.item', method))
+
+        columns = ['action', 'id', 'group_name', 'internal_reference', 'custom_price', 'min_quantity_vip']
+        df_compare = pd.DataFrame([
+            ('update', 1, 'VIP Group 1', 'A', 5.0, 1),
+            ('update', 2, 'VIP Group 1', 'B', 5.0, 1),
+            ('update', 3, 'VIP Group 1', 'C', 5.0, 1),
+            ('update', 4, 'VIP Group 1', 'D', 6.0, 1),
+            ('create', None, 'VIP Group 1', 'A', 7.0, 10),
+            ('create', None, 'VIP Group 1', 'B', 7.0, 10),
+            ('create', None, 'VIP Group 1', 'C', 7.0, 10),
+            ('create', None, 'VIP Group 1', 'X', 7.0, 10),  # 产品模版不存在
+            ('unchanged', 5, 'VIP Group 1', 'E', 9.0, 1),
+        ], columns=columns)
+        templates = {code: {'id': i, 'name': f"[{code}] P", 'default_code': code}
+                     for i, code in enumerate('ABC', start=1)}
+        pricelists = [{'id': 1, 'name': 'VIP Group 1'}]
+        with FakeOdooServer(Scale.for_rows(1000)) as server:
+            metrics = RpcMetrics()
+            client = OdooClient(server.api_key(), metrics=metrics)
+
+            # debug 模式：结果均为跳过，不发送任何写入
+            operation = OdooPricelistOperation.from_client(client, debug=True, batch_size=2)
+            operation._update_pricelist_items(df_compare)
+            operation._create_pricelist_items(df_compare, templates, pricelists)
+            self.assertTrue(all(result.success is None for result in operation.batch_results))
+            self.assertEqual(calls(metrics, 'write') + calls(metrics, 'create'), 0)
+
+            operation = OdooPricelistOperation.from_client(client, batch_size=2)
+            self.assertEqual(operation._update_pricelist_items(df_compare), [])
+            # 值相同的 1、2、3 合并写入并按 batch_size 拆成两批，4 单独一批
+            self.assertEqual([(result.action, result.ids) for result in operation.batch_results],
+                             [('write', [1, 2]), ('write', [3]), ('write', [4])])
+            self.assertEqual(calls(metrics, 'write'), 3)
+            items = client.read('product.pricelist.item', [[1, 3, 4], ['id', 'fixed_price']])
+            self.assertEqual({item['id']: item['fixed_price'] for item in items}, {1: 5.0, 3: 5.0, 4: 6.0})
+
+            operation.batch_results = []
+            self.assertEqual(operation._create_pricelist_items(df_compare, templates, pricelists), ['X'])
+            self.assertEqual([result.size for result in operation.batch_results], [2, 1])
+            self.assertEqual(calls(metrics, 'create'), 2)
+            # 新建记录的 id 来自 create 的返回值
+            created_ids = [i for result in operation.batch_results for i in result.ids]
+            self.assertEqual(len(set(created_ids)), 3)
+            items = client.read('product.pricelist.item', [created_ids, ['product_tmpl_id', 'min_quantity']])
+            self.assertEqual(sorted(item['product_tmpl_id'] for item in items), [1, 2, 3])
+            self.assertTrue(all(item['min_quantity'] == 10 for item in items))
+            self.assertTrue(all(result.success for result in operation.batch_results))
+            client.close()
 
     def test_OdooWarehouseClient(self):
         warnings.filterwarnings("ignore", category=ResourceWarning)
@@ -151,6 +769,69 @@ class TestOdooAPI(unittest.TestCase):
 
         operation.list_products_to_show()
 
+    def test_OdooWarehouseOperation_relocate(self):
+        def calls(metrics, model, method):
+            return sum(row['calls'] for row in metrics.stats() if (row['model'], row['method']) == (model, method))
+
+        moves = StockToMove.construct_many([{
+            'product_id': quant_id, 'product_name': f"Product {quant_id}", 'location_in_id': 1,
+            'location_in_name': "WH/Stock", 'location_out_id': location_out_id,
+            'location_out_name': f"WH/Stock/Shelf {location_out_id}", 'quant_id': quant_id, 'quant_quantity': 1.0,
+        } for quant_id, location_out_id in [(1, 3), (2, 3), (3, 3), (4, 4), (5, 4), (6, 5)]])
+        with FakeOdooServer(Scale.for_rows(1000)) as server:
+            metrics = RpcMetrics()
+            client = OdooClient(server.api_key(), metrics=metrics)
+            operation = OdooWarehouseOperation.from_client(client)
+
+            def location_of(quant_ids):
+                return {quant['id']: quant['location_id'][0]
+                        for quant in client.read('stock.quant', [quant_ids, ['id', 'location_id']])}
+
+            before = location_of([1, 2, 3, 4, 5, 6])
+            # debug 模式只分组，不写入
+            results = operation.relocate_quants_to_putaway_location(moves, debug=True)
+            self.assertTrue(all(result.skipped for result in results))
+            self.assertEqual(calls(metrics, 'stock.quant', 'write'), 0)
+            self.assertEqual(location_of([1, 2, 3, 4, 5, 6]), before)
+
+            # 同一目标库位一次 write；库位 5 写入失败，不影响其他库位
+            relocate = operation.wh_client.relocate_quants
+
+            def relocate_or_fail(quant_ids, location_id):
+                if location_id == 5:
+                    raise xmlrpc.client.Fault(2, "Access denied")
+                relocate(quant_ids, location_id)
+
+            operation.wh_client.relocate_quants = relocate_or_fail
+            results = operation.relocate_quants_to_putaway_location(moves)
+            self.assertEqual(calls(metrics, 'stock.quant', 'write'), 2)
+            by_location = {result.location_out_id: result for result in results}
+            self.assertEqual(by_location[3].quant_ids, [1, 2, 3])
+            self.assertTrue(by_location[3].success and by_location[4].success)
+            self.assertIs(by_location[5].success, False)
+            self.assertIn("Access denied", by_location[5].error)
+            self.assertEqual(location_of([1, 2, 3, 4, 5, 6]), {1: 3, 2: 3, 3: 3, 4: 4, 5: 4, 6: before[6]})
+            # 超过 chunk_size 时按批写入，每批单独记录结果
+            client.chunk_size = 2
+            results = operation.relocate_quants_to_putaway_location(moves[:3])
+            self.assertEqual([result.quant_ids for result in results], [[1, 2], [3]])
+            self.assertEqual(calls(metrics, 'stock.quant', 'write'), 4)
+            client.close()
+
+    def test_PutawayIndex(self):
+        warnings.filterwarnings("ignore", category=ResourceWarning)
+        index = PutawayIndex(OdooClient(key))
+        index.refresh()
+        rows = index.violations()
+        for row in rows:
+            location_id = index.quants[row['quant_id']]['location_id'][0]
+            self.assertEqual(row['location_in_id'], location_id)
+            self.assertIsNotNone(index.rule_for(row['product_id'], location_id))
+            self.assertFalse(index.tree.is_child_of(location_id, row['location_out_id']))
+        # 没有变化时增量刷新的结果不变
+        index.refresh()
+        self.assertEqual(index.violations(), rows)
+
 
 
 